@@ -0,0 +1,137 @@
+"""Benchmark dos alertas em streaming (`alerting.py`) contra a ordenação exata.
+
+Gera `--rows` scores sintéticos com o formato dos scores do projeto e mede:
+
+* erro do `QuantileSketch` contra `np.quantile` exato: erro relativo no valor
+  do quantil e taxa real de alertas (fração >= threshold do sketch) contra a
+  taxa-alvo, para várias taxas;
+* merge exato: o sketch de `--workers` partes juntado é igual, bucket a
+  bucket, ao sketch único sobre todos os scores;
+* throughput e memória do `QuantileSketch.update` e da `AlertQueue` (janelas
+  de `--window-rows`), com a taxa de alertas por janela em um fluxo com drift.
+
+Distribuições: `gmm` (-log-verossimilhança: chi-quadrado de 29 graus deslocado,
+com negativos, e 0,2% de cauda pesada) e `mse` (erro de reconstrução
+log-normal, sempre positivo, com a mesma cauda).
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_alerting.py [--rows 10000000] [--workers 8]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+from alerting import AlertQueue, QuantileSketch, TopK, WINDOW_ROWS
+
+RATES = [0.0005, 0.001, 0.002, 0.01, 0.05]
+ANOMALY_FRACTION = 0.002
+BATCH_ROWS = 10_000
+
+
+def synthetic_scores(kind, n, rng):
+    n_tail = int(n * ANOMALY_FRACTION)
+    if kind == 'gmm':
+        normal = 0.5 * rng.chisquare(29, n - n_tail) - 20.0
+        tail = rng.lognormal(4.0, 1.5, n_tail)
+    else:
+        normal = rng.lognormal(-1.0, 0.8, n - n_tail)
+        tail = rng.lognormal(2.0, 1.5, n_tail)
+    scores = np.concatenate([normal, tail])
+    rng.shuffle(scores)
+    return scores
+
+
+def quantile_report(scores, sketch):
+    rows = []
+    for rate in RATES:
+        exact = np.quantile(scores, 1 - rate)
+        approx = float(sketch.quantile(1 - rate))
+        rows.append({
+            'taxa_alvo': rate,
+            'quantil_exato': exact,
+            'quantil_sketch': approx,
+            'erro_rel_valor': abs(approx - exact) / abs(exact),
+            'taxa_real': float(np.mean(scores >= approx)),
+        })
+    return pd.DataFrame(rows).set_index('taxa_alvo')
+
+
+def exact_merge(scores, workers):
+    single = QuantileSketch().update(scores).state()
+    merged = QuantileSketch()
+    for part in np.array_split(scores, workers)[::-1]:
+        merged.merge(QuantileSketch().update(part))
+    merged = merged.state()
+    return all(np.array_equal(single[key], merged[key]) for key in single)
+
+
+def exact_top_k(scores, workers, k):
+    ids = np.arange(len(scores))
+    merged = TopK(k)
+    for part_ids, part in zip(np.array_split(ids, workers), np.array_split(scores, workers)):
+        merged.merge(TopK(k).push(part_ids, part))
+    top = np.sort(scores)[::-1][:k]
+    return np.array_equal([score for _, score in merged.items()], top)
+
+
+def stream_report(scores, window_rows):
+    # drift lento: o nível dos scores sobe 20% ao longo do fluxo
+    drifted = scores * np.linspace(1.0, 1.2, len(scores))
+    queue = AlertQueue(window_rows=window_rows)
+    start = time.perf_counter()
+    for begin in range(0, len(drifted), BATCH_ROWS):
+        queue.update(drifted[begin:begin + BATCH_ROWS])
+    queue.flush()
+    seconds = time.perf_counter() - start
+    windows = pd.DataFrame(queue.pop_closed_windows())
+    return seconds, queue, windows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--window-rows', type=int, default=WINDOW_ROWS)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    for kind in ['gmm', 'mse']:
+        scores = synthetic_scores(kind, args.rows, rng)
+
+        start = time.perf_counter()
+        sketch = QuantileSketch().update(scores)
+        sketch_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        np.sort(scores)
+        sort_seconds = time.perf_counter() - start
+
+        print(f"\n=== {kind}: {args.rows:,} scores ===")
+        print(f"sketch: {args.rows / sketch_seconds:,.0f} scores/s, {sketch.nbytes / 1024:.0f} KB | "
+              f"np.sort: {sort_seconds:.2f}s, {scores.nbytes / 2**20:.0f} MB")
+        print(quantile_report(scores, sketch).to_string(formatters={
+            'quantil_exato': '{:.6g}'.format,
+            'quantil_sketch': '{:.6g}'.format,
+            'erro_rel_valor': '{:.2e}'.format,
+            'taxa_real': '{:.5f}'.format,
+        }))
+        print(f"merge de {args.workers} partes == sketch único: {exact_merge(scores, args.workers)} | "
+              f"top-200 juntado == top-200 exato: {exact_top_k(scores, args.workers, 200)}")
+
+        seconds, queue, windows = stream_report(scores, args.window_rows)
+        rates = windows['alert_rate'].iloc[1:]  # a 1ª janela ainda não tem histórico
+        print(f"AlertQueue: {args.rows / seconds:,.0f} scores/s em lotes de {BATCH_ROWS:,}, "
+              f"{len(windows)} janelas de {args.window_rows:,}, sketches {queue.nbytes / 1024:.0f} KB | "
+              f"taxa por janela (com drift): média {rates.mean():.5f}, "
+              f"p5-p95 {rates.quantile(0.05):.5f}-{rates.quantile(0.95):.5f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark de cold start dos artefatos salvos (modo --score-only).
+
+Para cada tipo de artefato, abre um processo Python novo e mede:
+
+* import: importar o módulo que reconstrói o artefato (bibliotecas incluídas);
+* carga: ler `manifest.json` + `arrays.npz` e reconstruir o modelo;
+* 1ª pontuação: pontuar `--rows` linhas de `X_test_processed` (inclui o
+  aquecimento, p.ex. o traçado do grafo do TensorFlow);
+* tamanho do artefato em disco.
+
+Uso (a partir da raiz do repositório, depois de treinar os modelos):
+    python benchmarks/bench_artifact_load.py [data_path] [--rows 1000] [--repeats 3]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'src', 'models')]
+from artifacts import ARTIFACTS_PATH, latest_version
+
+CHILD = '''
+import json, sys, time
+t0 = time.perf_counter()
+sys.path[:0] = {paths!r}
+{imports}
+import numpy as np
+from artifacts import load_artifact
+t1 = time.perf_counter()
+manifest, arrays = load_artifact({name!r})
+{load}
+t2 = time.perf_counter()
+X = np.load({sample!r})
+{score}
+t3 = time.perf_counter()
+print(json.dumps({{'import_s': t1 - t0, 'carga_s': t2 - t1, 'primeira_pontuacao_s': t3 - t2}}))
+'''
+
+ARTIFACT_TYPES = {
+    'scaler': ('from artifacts import scaler_from_artifact',
+               'model = scaler_from_artifact(manifest, arrays)',
+               'model.transform(X)'),
+    'gmm': ('import gmm\nfrom gmm_kernel import GMMKernel',
+            'model = GMMKernel.from_artifact(manifest, arrays, gmm.SCORE_DTYPE)',
+            'model.score_samples(X)'),
+    'dbscan': ('import dbscan',
+               'model = dbscan.DBSCANDetector.from_artifact(manifest, arrays)',
+               'model.score(X)'),
+    'autoencoder': ('import autoencoder',
+                    'model = autoencoder.autoencoder_from_artifact(manifest, arrays)',
+                    'model.predict(X, verbose=0)'),
+}
+
+
+def artifact_size_mb(name, version):
+    path = os.path.join(ARTIFACTS_PATH, name, version)
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default='data/processed')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    X = np.load(os.path.join(args.data_path, 'X_test_processed.npy'), mmap_mode='r')
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        sample_path = os.path.join(tmp, 'sample.npy')
+        np.save(sample_path, np.asarray(X[:args.rows], dtype=np.float32))
+
+        for name, (imports, load, score) in ARTIFACT_TYPES.items():
+            version = latest_version(name)
+            if version is None:
+                print(f"Artefato '{name}' não encontrado; pulando.")
+                continue
+            code = CHILD.format(paths=sys.path[:2], imports=imports, name=name, load=load,
+                                sample=sample_path, score=score)
+            runs = []
+            for _ in range(args.repeats):
+                out = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                                     text=True, check=True, env=dict(os.environ, MPLBACKEND='Agg'))
+                runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+            timing = pd.DataFrame(runs).median()
+            rows.append({'artefato': name, 'versão': version,
+                         'disco_MB': artifact_size_mb(name, version), **timing,
+                         'total_s': timing.sum()})
+
+    print(f"\nCold start (mediana de {args.repeats} processos, {args.rows} linhas):")
+    print(pd.DataFrame(rows).set_index('artefato').to_string(float_format=lambda v: f'{v:.3f}'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark da tunagem do autoencoder: grid exaustivo vs Successive Halving.
+
+Roda o grid de tunagem do `autoencoder.py` das duas formas sobre os mesmos
+dados e compara épocas treinadas, tempo e a melhor configuração escolhida.
+
+Uso (a partir da raiz do repositório, com dados processados ou mocks):
+    python benchmarks/bench_autoencoder_halving.py [data_path] [--epochs 50]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+from sklearn.model_selection import ParameterGrid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'src', 'models')]
+import autoencoder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default='data/processed')
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--min-epochs', type=int, default=autoencoder.HALVING_MIN_EPOCHS)
+    parser.add_argument('--eta', type=int, default=autoencoder.HALVING_ETA)
+    args = parser.parse_args()
+
+    data = autoencoder.load_and_split_data(args.data_path)
+    grid = list(ParameterGrid({
+        'encoding_dim': [4, 8],
+        'learning_rate': [0.01, 0.001],
+        'batch_size': [64, 128],
+        'epochs': [args.epochs]
+    }))
+
+    print(f"\n=== Grid exaustivo ({len(grid)} combinações) ===")
+    start = time.perf_counter()
+    best = (-1, None)
+    grid_epochs = 0
+    for params in grid:
+        auc_pr, model = autoencoder.train_and_evaluate_run(params, *data)
+        # épocas efetivas (com EarlyStopping) a partir dos passos do otimizador
+        epochs = int(model.optimizer.iterations.numpy()) // math.ceil(len(data[0]) / params['batch_size'])
+        grid_epochs += epochs
+        print(f"{params} | épocas: {epochs} | AUC-PR: {auc_pr:.4f}")
+        if auc_pr > best[0]:
+            best = (auc_pr, params)
+    grid_seconds = time.perf_counter() - start
+
+    print("\n=== Successive Halving ===")
+    start = time.perf_counter()
+    sh_auc, _, sh_params, sh_epochs = autoencoder.successive_halving_search(
+        grid, *data, min_epochs=args.min_epochs, eta=args.eta
+    )
+    sh_seconds = time.perf_counter() - start
+
+    print("\n=== Resumo ===")
+    print(f"Grid exaustivo:      {grid_epochs:4d} épocas, {grid_seconds:7.1f}s, "
+          f"melhor {best[1]} (AUC-PR {best[0]:.4f})")
+    print(f"Successive Halving:  {sh_epochs:4d} épocas, {sh_seconds:7.1f}s, "
+          f"melhor {sh_params} (AUC-PR {sh_auc:.4f})")
+    print(f"Épocas: {sh_epochs / grid_epochs:.0%} do grid exaustivo | "
+          f"Mesma configuração: {'sim' if sh_params == best[1] else 'NÃO'}")
+
+
+if __name__ == '__main__':
+    main()
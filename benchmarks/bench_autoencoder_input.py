@@ -0,0 +1,70 @@
+"""Benchmark de throughput do treino do autoencoder por pipeline de entrada.
+
+Treina o autoencoder algumas épocas em cada modo de `INPUT_PIPELINE`
+('numpy', 'tfdata', 'stream'), com e sem XLA (`jit_compile`), e reporta as
+amostras/s de treino de cada época.
+
+As threads do TensorFlow só podem ser definidas antes da inicialização do
+runtime, por isso são passadas por argumento (uma configuração por execução).
+
+Uso (a partir da raiz do repositório, depois de rodar o preprocessing):
+    python benchmarks/bench_autoencoder_input.py [data_path] [--epochs 3]
+        [--intra N] [--inter N] [--modes numpy tfdata stream] [--no-jit]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'src', 'models')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default='data/processed')
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=128)
+    parser.add_argument('--intra', type=int, default=0)
+    parser.add_argument('--inter', type=int, default=0)
+    parser.add_argument('--modes', nargs='+', default=['numpy', 'tfdata', 'stream'],
+                        choices=['numpy', 'tfdata', 'stream'])
+    parser.add_argument('--no-jit', action='store_true')
+    args = parser.parse_args()
+
+    import autoencoder
+    autoencoder.configure_tf_threads(args.intra, args.inter)
+
+    params = {'encoding_dim': 8, 'learning_rate': 0.001,
+              'batch_size': args.batch_size, 'epochs': args.epochs}
+    data = {
+        'memoria': autoencoder.load_and_split_data(args.data_path),
+        'disco': autoencoder.load_and_split_data(args.data_path, lazy_train=True),
+    }
+
+    print(f"\nThreads intra/inter: {args.intra or 'padrão'}/{args.inter or 'padrão'}")
+    for mode in args.modes:
+        X_train, X_val = data['disco' if mode == 'stream' else 'memoria'][:2]
+        if mode == 'stream' and not isinstance(X_train, autoencoder.RowSubset):
+            print("Modo 'stream' requer o feature store; pulando.")
+            continue
+
+        for jit in ([False] if args.no_jit else [False, True]):
+            autoencoder.JIT_COMPILE = jit
+            model = autoencoder.compile_autoencoder(params, X_train.shape[1])
+            history = autoencoder.fit_autoencoder(
+                model, X_train, X_val, args.batch_size, args.epochs, callbacks=[],
+                pipeline=mode
+            )
+            per_epoch = history.history['samples_per_sec']
+            # a primeira época inclui a compilação do grafo / XLA
+            steady = np.mean(per_epoch[1:]) if len(per_epoch) > 1 else per_epoch[0]
+            print(f"{mode:7s} | jit={str(jit):5s} | por época: "
+                  f"{', '.join(f'{v:,.0f}' for v in per_epoch)} amostras/s | "
+                  f"regime: {steady:,.0f} amostras/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Benchmark do kernel NumPy do autoencoder (`autoencoder_kernel.py`) contra o Keras.
+
+Carrega o artefato do autoencoder (padrão: LATEST) e compara, no conjunto de
+teste, o MSE de reconstrução calculado por:
+
+* `keras predict`: `model.predict` + MSE (motor original);
+* `keras tf.function`: grafo único chamado direto (como o servidor);
+* `AutoencoderKernel` com pesos float64, float32, float16 e int8.
+
+Para cada um: latência de uma única linha (mediana de `--calls` chamadas),
+throughput em `--rows` linhas (o teste repetido até o tamanho pedido), erro
+relativo máximo contra o `predict` (conferido com `TOLERANCE`), AUC-PR no
+teste e bytes dos pesos.
+
+Uso (a partir da raiz do repositório, depois de treinar o autoencoder):
+    python benchmarks/bench_autoencoder_kernel.py [data_path] [--rows 1000000] [--version V]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'src', 'models')]
+import autoencoder
+import gmm
+from artifacts import load_artifact
+from autoencoder_kernel import AutoencoderKernel, TOLERANCE
+from metrics import RankedScores
+
+
+def single_row_latency_us(score_fn, X, calls):
+    times = []
+    for i in range(calls):
+        row = X[i % len(X)][None, :]
+        start = time.perf_counter()
+        score_fn(row)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1e6
+
+
+def throughput(score_fn, X):
+    start = time.perf_counter()
+    score_fn(X)
+    return len(X) / (time.perf_counter() - start)
+
+
+def keras_scorers(model):
+    tf = autoencoder.import_tensorflow()
+
+    @tf.function(input_signature=[tf.TensorSpec([None, model.input_shape[1]], tf.float32)])
+    def reconstruct(X):
+        return model(X, training=False)
+
+    def predict(X):
+        return autoencoder.reconstruction_error(model, X, engine='keras')
+
+    def graph(X):
+        return np.concatenate([
+            np.mean(np.square(X[i:i + autoencoder.PREDICT_BATCH_SIZE]
+                              - reconstruct(X[i:i + autoencoder.PREDICT_BATCH_SIZE]).numpy()), axis=1)
+            for i in range(0, len(X), autoencoder.PREDICT_BATCH_SIZE)
+        ])
+    return predict, graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default='data/processed')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--version', default=None, help='versão do artefato (padrão: LATEST)')
+    args = parser.parse_args()
+
+    _, X_test, y_test, _ = gmm.load_data(args.data_path)
+    X_test = np.asarray(X_test, dtype=np.float32)
+    y_test = np.asarray(y_test)
+    reps = -(-args.rows // len(X_test))
+    X_big = np.tile(X_test, (reps, 1))[:args.rows]
+
+    manifest, arrays = load_artifact('autoencoder', args.version)
+    model = autoencoder.autoencoder_from_artifact(manifest, arrays)
+    predict, graph = keras_scorers(model)
+    reference = predict(X_test)
+
+    candidates = {'keras predict': (predict, None), 'keras tf.function': (graph, None)}
+    for dtype in ['float64', 'float32', 'float16', 'int8']:
+        kernel = AutoencoderKernel.from_artifact(manifest, arrays, dtype)
+        candidates[f'kernel {dtype}'] = (kernel.score_samples, kernel)
+
+    rows = []
+    for name, (score_fn, kernel) in candidates.items():
+        scores = score_fn(X_test)
+        error = float((np.abs(scores.astype(np.float64) - reference) / (1 + np.abs(reference))).max())
+        if kernel is not None:
+            assert error <= TOLERANCE[kernel.weights_dtype], f"{name}: erro {error:.2e}"
+        rows.append({
+            'implementação': name,
+            'latência_1_linha_us': single_row_latency_us(score_fn, X_big, args.calls),
+            'linhas/s': throughput(score_fn, X_big),
+            'erro_rel_max': error,
+            'auc_pr': RankedScores(y_test, scores).curve_metrics()[1],
+            'bytes_pesos': (sum(w.nbytes for w in model.get_weights())
+                            if kernel is None else kernel.weights_nbytes),
+        })
+
+    report = pd.DataFrame(rows).set_index('implementação')
+    print(f"\nautoencoder/{manifest['version']} | {args.rows:,} linhas, {X_test.shape[1]} features")
+    print(report.to_string(formatters={
+        'latência_1_linha_us': '{:,.1f}'.format,
+        'linhas/s': '{:,.0f}'.format,
+        'erro_rel_max': '{:.1e}'.format,
+        'auc_pr': '{:.4f}'.format,
+        'bytes_pesos': '{:,}'.format,
+    }))
+
+
+if __name__ == '__main__':
+    main()
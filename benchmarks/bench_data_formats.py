@@ -0,0 +1,73 @@
+"""Benchmark do contrato de dados: CSV vs binário (.npy + schema.json).
+
+Compara, para cada tabela de `data/processed/`, o tamanho em disco e o tempo
+de carga de cada formato.
+
+Uso (a partir da raiz do repositório, depois de rodar o preprocessing):
+    python benchmarks/bench_data_formats.py [data_path] [--repeats N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from data_contract import TABLE_DTYPES, binary_entry, load_table
+
+
+def time_load(fn, repeats):
+    """Mediana do tempo (s) de `repeats` execuções de `fn`."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default='data/processed')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = []
+    for name in TABLE_DTYPES:
+        csv_path = os.path.join(args.data_path, f'{name}.csv')
+        entry = binary_entry(args.data_path, name)
+        if not os.path.exists(csv_path) or entry is None:
+            print(f"Pulando '{name}': CSV ou binário ausente em {args.data_path}")
+            continue
+
+        npy_path = os.path.join(args.data_path, entry['file'])
+        csv_s = time_load(lambda: pd.read_csv(csv_path), args.repeats)
+        npy_s = time_load(lambda: load_table(args.data_path, name), args.repeats)
+        rows.append({
+            'tabela': name,
+            'linhas': entry['shape'][0],
+            'csv_MB': os.path.getsize(csv_path) / 1e6,
+            'npy_MB': os.path.getsize(npy_path) / 1e6,
+            'csv_s': csv_s,
+            'npy_s': npy_s,
+            'speedup': csv_s / npy_s if npy_s > 0 else float('inf'),
+        })
+
+    if not rows:
+        print("Nada para comparar. Rode src/preprocessing.py primeiro.")
+        return
+
+    report = pd.DataFrame(rows).set_index('tabela')
+    total = report[['csv_MB', 'npy_MB', 'csv_s', 'npy_s']].sum()
+    print(report.to_string(float_format=lambda v: f'{v:.4f}'))
+    print(f"\nTotal: {total['csv_MB']:.1f} MB / {total['csv_s']:.3f} s (CSV) vs "
+          f"{total['npy_MB']:.1f} MB / {total['npy_s']:.3f} s (binário) "
+          f"-> {total['csv_s'] / total['npy_s']:.1f}x mais rápido, "
+          f"{total['csv_MB'] / total['npy_MB']:.1f}x menor")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark do DBSCAN indexado (`DBSCANDetector`) contra o modo original.
+
+Para cada tamanho em `--sizes`, gera N linhas reamostrando os normais de
+treino (ajuste) e o teste (pontuação) com um pequeno ruído gaussiano, e roda
+cada abordagem em um processo separado, com limite de memória (`--mem-limit-gb`)
+e de tempo (`--timeout`):
+
+* original (`transductive`): PCA + `DBSCAN.fit_predict` nas N linhas de teste;
+* indexado (`index`): PCA + pontos núcleo nas N linhas normais, KD-tree e
+  pontuação das N linhas de teste.
+
+Reporta tempo de ajuste, pico de RSS e throughput da pontuação (linhas/s).
+
+Uso (a partir da raiz do repositório, depois de rodar o preprocessing):
+    python benchmarks/bench_dbscan_index.py [data_path] [--sizes 100000 300000 1000000]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'src', 'models')]
+
+JITTER = 0.05
+
+
+def resample(X, n_rows, seed):
+    rng = np.random.default_rng(seed)
+    X = np.asarray(X, dtype=np.float32)
+    out = X[rng.integers(0, len(X), n_rows)]
+    out += rng.normal(0, JITTER, out.shape).astype(np.float32)
+    return out
+
+
+def run_child(method, n_rows, data_path):
+    """Executa uma abordagem neste processo e imprime as medidas em JSON."""
+    import dbscan
+    from sklearn.cluster import DBSCAN
+    from sklearn.decomposition import PCA
+    from telemetry import peak_rss_mb
+
+    X_test = resample(dbscan.load_data(data_path)[0], n_rows, seed=1)
+    result = {}
+    if method == 'transductive':
+        start = time.perf_counter()
+        X_pca = PCA(n_components=dbscan.N_COMPONENTS).fit(X_test).transform(X_test)
+        DBSCAN(eps=dbscan.EPS_OTIMO, min_samples=dbscan.MIN_SAMPLES).fit_predict(X_pca)
+        # o ajuste já rotula as N linhas: não há etapa de pontuação separada
+        result['ajuste_s'] = time.perf_counter() - start
+        result['linhas/s'] = n_rows / result['ajuste_s']
+    else:
+        X_train = resample(dbscan.load_train_normal(data_path), n_rows, seed=0)
+        start = time.perf_counter()
+        detector = dbscan.DBSCANDetector(fit_sample_rows=None).fit(X_train)
+        result['ajuste_s'] = time.perf_counter() - start
+        del X_train
+        start = time.perf_counter()
+        detector.score(X_test)
+        result['linhas/s'] = n_rows / (time.perf_counter() - start)
+        result['pontos_nucleo'] = len(detector.core_points_)
+    result['pico_MB'] = peak_rss_mb()
+    print(json.dumps(result))
+
+
+def run(method, n_rows, args):
+    def limit_memory():
+        limit = int(args.mem_limit_gb * 1024 ** 3)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    cmd = [sys.executable, os.path.abspath(__file__), args.data_path,
+           '--child', method, str(n_rows)]
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=args.timeout,
+                              preexec_fn=limit_memory, env=dict(os.environ, MPLBACKEND='Agg'))
+    except subprocess.TimeoutExpired:
+        return {'status': f'timeout ({args.timeout}s)'}
+    if proc.returncode != 0:
+        error = 'MemoryError' if 'MemoryError' in proc.stderr else proc.stderr.strip().splitlines()[-1]
+        return {'status': f'falhou: {error}', 'total_s': time.perf_counter() - start}
+    return {'status': 'ok', **json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default='data/processed')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 300_000, 1_000_000])
+    parser.add_argument('--methods', nargs='+', default=['transductive', 'index'],
+                        choices=['transductive', 'index'])
+    parser.add_argument('--mem-limit-gb', type=float, default=4.0)
+    parser.add_argument('--timeout', type=int, default=3600)
+    parser.add_argument('--child', nargs=2, metavar=('METHOD', 'ROWS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]), args.data_path)
+        return
+
+    rows = []
+    for n_rows in args.sizes:
+        for method in args.methods:
+            result = run(method, n_rows, args)
+            print(f"{n_rows:>9,} | {method:12s} | {result}", flush=True)
+            rows.append({'linhas': n_rows, 'modo': method, **result})
+
+    report = pd.DataFrame(rows).set_index(['linhas', 'modo'])
+    print(f"\nLimite de memória: {args.mem_limit_gb} GB")
+    print(report.to_string(float_format=lambda v: f'{v:,.1f}'))
+
+
+if __name__ == '__main__':
+    main()
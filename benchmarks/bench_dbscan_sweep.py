@@ -0,0 +1,78 @@
+"""Benchmark da varredura eps x min_samples do DBSCAN com grafo em cache.
+
+Compara, no conjunto usado pela tunagem do `dbscan.py`:
+
+* um `DBSCAN.fit` (EPS_OTIMO / MIN_SAMPLES), a unidade de custo;
+* a varredura completa (`EPS_GRID` x `MIN_SAMPLES_GRID`) com o grafo de
+  vizinhança calculado do zero e lido do cache;
+* o custo estimado da varredura ingênua (um `fit` por combinação).
+
+Confere, em `--check` combinações sorteadas, que o ruído obtido pelo grafo é
+idêntico ao do `DBSCAN.fit`.
+
+Uso (a partir da raiz do repositório, depois de rodar o preprocessing):
+    python benchmarks/bench_dbscan_sweep.py [data_path] [--check 6]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+from sklearn.decomposition import PCA
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'src', 'models')]
+import dbscan
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default='data/processed')
+    parser.add_argument('--check', type=int, default=6)
+    args = parser.parse_args()
+
+    X, _, split = dbscan.load_tuning_data(args.data_path)
+    X_pca = PCA(n_components=dbscan.N_COMPONENTS, random_state=dbscan.RANDOM_SEED).fit(X).transform(X)
+    n_settings = len(set(dbscan.EPS_GRID)) * len(dbscan.MIN_SAMPLES_GRID)
+    print(f"{split}: {len(X_pca)} linhas, {n_settings} combinações")
+
+    _, fit_seconds = timed(DBSCAN(eps=dbscan.EPS_OTIMO, min_samples=dbscan.MIN_SAMPLES).fit, X_pca)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        sweeps = {}
+        for label in ('grafo calculado', 'grafo do cache'):
+            start = time.perf_counter()
+            graph, _ = dbscan.radius_graph(X_pca, max(dbscan.EPS_GRID), cache_dir)
+            noise = {(eps, ms): mask for eps, ms, mask in
+                     dbscan.NeighborGraph(graph).sweep(dbscan.EPS_GRID, dbscan.MIN_SAMPLES_GRID)}
+            sweeps[label] = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    pairs = list(noise)
+    check_seconds = []
+    for i in rng.choice(len(pairs), min(args.check, len(pairs)), replace=False):
+        eps, ms = pairs[i]
+        labels, seconds = timed(DBSCAN(eps=eps, min_samples=ms).fit_predict, X_pca)
+        check_seconds.append(seconds)
+        same = np.array_equal(labels == -1, noise[(eps, ms)])
+        print(f"eps={eps:<7} min_samples={ms:<3} ruído idêntico ao DBSCAN.fit: {'sim' if same else 'NÃO'}")
+
+    naive = np.mean(check_seconds) * n_settings
+    print(f"\n1 DBSCAN.fit (eps={dbscan.EPS_OTIMO}, min_samples={dbscan.MIN_SAMPLES}): {fit_seconds:.2f}s")
+    for label, seconds in sweeps.items():
+        print(f"Varredura ({label}): {seconds:.2f}s = {seconds / fit_seconds:.1f}x um fit")
+    print(f"Varredura ingênua (estimada): {naive:.1f}s = {naive / fit_seconds:.1f}x um fit")
+
+
+if __name__ == '__main__':
+    main()
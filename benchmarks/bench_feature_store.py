@@ -0,0 +1,101 @@
+"""Benchmark de memória do carregamento de dados dos modelos.
+
+Para cada modelo (gmm, autoencoder, dbscan) roda o loader em um processo
+separado, antes (DataFrames via data_contract: CSV/.npy) e depois (views do
+feature store via np.memmap), e reporta:
+
+* pico_MB: pico de RSS durante o carregamento (descontados os imports);
+* anon_MB: memória privada do processo ao final (não compartilhável);
+* file_MB: páginas do feature store mapeadas (compartilhadas via page cache
+  entre todos os processos que abrem o mesmo arquivo).
+
+Uso (a partir da raiz do repositório, depois de rodar o preprocessing):
+    python benchmarks/bench_feature_store.py [data_path] [--models gmm dbscan]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOADERS = {
+    'gmm': 'gmm.load_data(DATA_PATH, use_store=USE_STORE)',
+    'autoencoder': 'autoencoder.load_and_split_data(DATA_PATH, use_store=USE_STORE)',
+    'dbscan': 'dbscan.load_data(DATA_PATH, use_store=USE_STORE)',
+}
+
+CHILD_CODE = """
+import json, sys
+import numpy as np
+sys.path[:0] = [{src!r}, {models!r}]
+import {model}
+from telemetry import memory_status_mb
+
+DATA_PATH, USE_STORE = {data_path!r}, {use_store!r}
+
+# zera o pico de RSS (Linux >= 4.0) para medir só o carregamento
+try:
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+except OSError:
+    pass
+before = memory_status_mb()
+
+data = {loader}
+# toca todas as páginas (como o treino faria)
+for part in data:
+    np.asarray(part).sum()
+
+after = memory_status_mb()
+print(json.dumps({{'before': before, 'after': after}}))
+"""
+
+
+def run_loader(model, data_path, use_store):
+    code = CHILD_CODE.format(
+        src=os.path.join(ROOT, 'src'),
+        models=os.path.join(ROOT, 'src', 'models'),
+        model=model,
+        data_path=data_path,
+        use_store=use_store,
+        loader=LOADERS[model],
+    )
+    result = subprocess.run([sys.executable, '-c', code],
+                            capture_output=True, text=True, check=True)
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    before, after = stats['before'], stats['after']
+    return {
+        'modelo': model,
+        'modo': 'memmap' if use_store else 'DataFrame',
+        'pico_MB': after['VmHWM'] - before['VmRSS'],
+        'anon_MB': after['RssAnon'] - before['RssAnon'],
+        'file_MB': after['RssFile'] - before['RssFile'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default='data/processed')
+    parser.add_argument('--models', nargs='+', default=list(LOADERS), choices=list(LOADERS))
+    args = parser.parse_args()
+
+    if not os.path.exists('/proc/self/status'):
+        print("Este benchmark depende de /proc/self/status (Linux).")
+        return
+
+    rows = []
+    for model in args.models:
+        for use_store in (False, True):
+            rows.append(run_loader(model, os.path.abspath(args.data_path), use_store))
+
+    report = pd.DataFrame(rows).set_index(['modelo', 'modo'])
+    print(report.to_string(float_format=lambda v: f'{v:.1f}'))
+
+
+if __name__ == '__main__':
+    main()
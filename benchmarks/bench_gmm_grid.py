@@ -0,0 +1,70 @@
+"""Benchmark do Grid Search do GMM: sequencial vs pool de processos.
+
+Usa um grid maior que o do `gmm.py` (n_components x covariance_type) e mede:
+o tempo de uma única configuração, o grid sequencial (1 processo) e o grid
+paralelo (`--workers` processos), conferindo que os dois escolhem o mesmo
+melhor modelo.
+
+Uso (a partir da raiz do repositório, depois de rodar o preprocessing):
+    python benchmarks/bench_gmm_grid.py [data_path] [--max-components 8] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from sklearn.model_selection import ParameterGrid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'src', 'models')]
+import gmm
+
+
+def best_of(results):
+    best = (-1, None)
+    for params, auc_pr, _, error in results:
+        if error is None and auc_pr > best[0]:
+            best = (auc_pr, params)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default='data/processed')
+    parser.add_argument('--max-components', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--skip-sequential', action='store_true')
+    args = parser.parse_args()
+
+    X_train, X_test, y_test, _ = gmm.load_data(args.data_path)
+    grid = list(ParameterGrid({
+        'n_components': list(range(1, args.max_components + 1)),
+        'covariance_type': ['full', 'diag', 'spherical', 'tied'],
+    }))
+    print(f"Grid com {len(grid)} combinações, treino {X_train.shape}, "
+          f"{os.cpu_count()} núcleos")
+
+    start = time.perf_counter()
+    gmm.train_and_evaluate_gmm({'n_components': 3, 'covariance_type': 'full'},
+                               X_train, X_test, y_test)
+    print(f"1 configuração (3, full): {time.perf_counter() - start:.2f}s")
+
+    if not args.skip_sequential:
+        start = time.perf_counter()
+        sequential = best_of(gmm.run_grid_search(grid, args.data_path, X_train, X_test,
+                                                 y_test, n_workers=1))
+        print(f"Sequencial: {time.perf_counter() - start:.2f}s -> {sequential}")
+
+    start = time.perf_counter()
+    parallel = best_of(gmm.run_grid_search(grid, args.data_path, X_train, X_test,
+                                           y_test, n_workers=args.workers))
+    print(f"Paralelo:   {time.perf_counter() - start:.2f}s -> {parallel}")
+
+    if not args.skip_sequential:
+        same = sequential[1] == parallel[1]
+        print(f"Mesmo melhor modelo: {'sim' if same else 'NÃO'}")
+
+
+if __name__ == '__main__':
+    main()
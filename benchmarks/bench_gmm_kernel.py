@@ -0,0 +1,91 @@
+"""Benchmark do kernel NumPy do GMM (`gmm_kernel.py`) contra o scikit-learn.
+
+Para cada `covariance_type`, ajusta um GMM nos normais de treino e compara
+`GaussianMixture.score_samples` com o `GMMKernel` em float64 e float32:
+
+* latência de uma única linha (mediana de `--calls` chamadas);
+* throughput em `--rows` linhas (o teste repetido até o tamanho pedido);
+* erro relativo máximo contra o scikit-learn, conferido com `TOLERANCE`.
+
+Uso (a partir da raiz do repositório, depois de rodar o preprocessing):
+    python benchmarks/bench_gmm_kernel.py [data_path] [--rows 1000000] [--n-components 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.mixture import GaussianMixture
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'src', 'models')]
+import gmm
+from gmm_kernel import GMMKernel, TOLERANCE
+
+
+def single_row_latency_us(score_fn, X, calls):
+    times = []
+    for i in range(calls):
+        row = X[i % len(X)][None, :]
+        start = time.perf_counter()
+        score_fn(row)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1e6
+
+
+def throughput(score_fn, X):
+    start = time.perf_counter()
+    score_fn(X)
+    return len(X) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default='data/processed')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--n-components', type=int, default=3)
+    args = parser.parse_args()
+
+    X_train, X_test, _, _ = gmm.load_data(args.data_path)
+    X_test64 = np.asarray(X_test, dtype=np.float64)
+    reps = -(-args.rows // len(X_test64))
+    X_big64 = np.tile(X_test64, (reps, 1))[:args.rows]
+    X_big32 = X_big64.astype(np.float32)
+
+    rows = []
+    for covariance_type in ['full', 'tied', 'diag', 'spherical']:
+        model = GaussianMixture(args.n_components, covariance_type=covariance_type,
+                                random_state=gmm.RANDOM_SEED).fit(X_train)
+        candidates = {
+            'sklearn': (model.score_samples, X_big64, None),
+            'kernel float64': (GMMKernel.from_sklearn(model, np.float64).score_samples, X_big64, 'float64'),
+            'kernel float32': (GMMKernel.from_sklearn(model, np.float32).score_samples, X_big32, 'float32'),
+        }
+        for name, (score_fn, X_big, dtype) in candidates.items():
+            error = 0.0
+            if dtype is not None:
+                error = GMMKernel.from_sklearn(model, dtype).max_relative_error(model, X_test)
+                assert error <= TOLERANCE[dtype], f"{covariance_type}/{name}: erro {error:.2e}"
+            rows.append({
+                'covariance_type': covariance_type,
+                'implementação': name,
+                'latência_1_linha_us': single_row_latency_us(score_fn, X_big, args.calls),
+                'linhas/s': throughput(score_fn, X_big),
+                'erro_rel_max': error,
+            })
+
+    report = pd.DataFrame(rows).set_index(['covariance_type', 'implementação'])
+    print(f"\n{args.rows:,} linhas, {args.n_components} componentes, {X_test.shape[1]} features")
+    print(report.to_string(formatters={
+        'latência_1_linha_us': '{:,.1f}'.format,
+        'linhas/s': '{:,.0f}'.format,
+        'erro_rel_max': '{:.1e}'.format,
+    }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""Benchmark do GMM online (`gmm_online.py`) contra o refit completo.
+
+Simula um histórico que cresce em blocos: o modelo base é ajustado na fração
+inicial (`--base-fraction`) dos normais de treino, e o resto dos normais de
+treino + os normais da validação chegam em blocos de `--chunk-rows` linhas.
+A cada bloco:
+
+* online: um `partial_fit` por fator de esquecimento em `--forgetting`;
+* refit: `GaussianMixture.fit` do zero em todo o histórico até o bloco.
+
+Com `--drift D`, cada bloco é deslocado progressivamente até D desvios-padrão
+por feature (direção aleatória fixa), e os normais do teste são avaliados já
+deslocados, simulando a mudança do comportamento normal ao longo dos dias.
+
+Antes dos blocos, confere que o warm start sem nenhuma atualização reproduz o
+modelo base (covariâncias e log-verossimilhança iguais até o arredondamento;
+o base é ajustado em float32, então a log-verossimilhança é comparada em termos
+relativos). Um reg_covar contado duas vezes aparece como diferença de reg_covar
+nas covariâncias.
+
+Reporta o custo por bloco (ms), a memória alocada na atualização (tracemalloc,
+no último bloco), o AUC-PR final no teste e a log-verossimilhança média dos
+normais do teste (quanto o modelo acompanha o comportamento normal atual).
+
+Uso (a partir da raiz do repositório, depois de rodar o preprocessing):
+    python benchmarks/bench_gmm_online.py [data_path] [--drift 0 1] [--forgetting 1.0 0.95 0.8]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import average_precision_score
+from sklearn.mixture import GaussianMixture
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'src', 'models')]
+import gmm
+from feature_store import open_feature_store
+from gmm_online import OnlineGMM
+
+PARAMS = {'n_components': 3, 'covariance_type': 'full'}
+
+
+def fit_gmm(X):
+    return GaussianMixture(**PARAMS, random_state=gmm.RANDOM_SEED).fit(X)
+
+
+def traced_peak_mb(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 ** 2
+
+
+def warm_start_error(base, X):
+    """Maior diferença entre o base e o OnlineGMM sem blocos (covariâncias; score relativo)."""
+    online = OnlineGMM(base.weights_, base.means_, base.covariances_,
+                       PARAMS['covariance_type'], 1, reg_covar=base.reg_covar)
+    expected = base.score_samples(X)
+    return (np.abs(online.covariances_ - base.covariances_).max(),
+            (np.abs(online.score_samples(X) - expected) / np.abs(expected)).max())
+
+
+def run_scenario(X_base, stream, X_test, y_test, drift, forgetting_values, seed):
+    n_features = X_base.shape[1]
+    direction = np.random.default_rng(seed).normal(size=n_features)
+    shifts = [drift * (i + 1) / len(stream) * direction for i in range(len(stream))]
+    chunks = [np.asarray(X, dtype=np.float64) + shift for X, shift in zip(stream, shifts)]
+    # Só o comportamento normal muda; as fraudes do teste ficam onde estavam
+    X_test = np.array(X_test, dtype=np.float64)
+    X_test[y_test == 0] += drift * direction
+
+    base = fit_gmm(X_base)
+    cov_error, score_error = warm_start_error(base, X_test)
+    print(f"Warm start sem blocos (drift {drift}): dif. máx. covariâncias {cov_error:.1e}, "
+          f"log-verossimilhança {score_error:.1e}")
+    assert cov_error < base.reg_covar / 100 and score_error < 1e-5, "warm start não reproduz o modelo base"
+    online = {lam: OnlineGMM(base.weights_, base.means_, base.covariances_,
+                             PARAMS['covariance_type'], len(X_base), lam)
+              for lam in forgetting_values}
+
+    times = {name: [] for name in ['refit'] + [f'online λ={lam}' for lam in forgetting_values]}
+    history = [np.asarray(X_base, dtype=np.float64)]
+    for X_chunk in chunks:
+        history.append(X_chunk)
+        for lam, model in online.items():
+            start = time.perf_counter()
+            model.partial_fit(X_chunk)
+            times[f'online λ={lam}'].append(time.perf_counter() - start)
+        X_history = np.concatenate(history)
+        start = time.perf_counter()
+        refit = fit_gmm(X_history)
+        times['refit'].append(time.perf_counter() - start)
+
+    # Memória da atualização no último bloco
+    peak = {'refit': traced_peak_mb(lambda: fit_gmm(X_history))}
+    for lam in forgetting_values:
+        copy = OnlineGMM(base.weights_, base.means_, base.covariances_,
+                         PARAMS['covariance_type'], len(X_base), lam)
+        peak[f'online λ={lam}'] = traced_peak_mb(lambda: copy.partial_fit(chunks[-1]))
+
+    models = {'base (sem atualizar)': base, 'refit': refit,
+              **{f'online λ={lam}': model for lam, model in online.items()}}
+    rows = []
+    for name, model in models.items():
+        rows.append({
+            'drift': drift,
+            'modelo': name,
+            'auc_pr': average_precision_score(y_test, -model.score_samples(X_test)),
+            # ajuste aos normais atuais (deslocados), independente das fraudes
+            'loglik_normais': model.score_samples(X_test[y_test == 0]).mean(),
+            'ms/bloco (1º)': times[name][0] * 1000 if name in times else np.nan,
+            'ms/bloco (último)': times[name][-1] * 1000 if name in times else np.nan,
+            'alocado_MB': peak.get(name, np.nan),
+        })
+    return rows, len(X_history)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default='data/processed')
+    parser.add_argument('--base-fraction', type=float, default=0.3)
+    parser.add_argument('--chunk-rows', type=int, default=5000)
+    parser.add_argument('--drift', type=float, nargs='+', default=[0.0, 1.0])
+    parser.add_argument('--forgetting', type=float, nargs='+', default=[1.0, 0.95, 0.8])
+    args = parser.parse_args()
+
+    store = open_feature_store(args.data_path)
+    X_train = np.asarray(store.segment('train_normal'))
+    X_val = np.asarray(store.segment('val'))[store.labels('val') == 0]
+    X_test, y_test = np.asarray(store.segment('test')), np.asarray(store.labels('test'))
+
+    n_base = int(len(X_train) * args.base_fraction)
+    X_stream = np.concatenate([X_train[n_base:], X_val])
+    stream = [X_stream[i:i + args.chunk_rows] for i in range(0, len(X_stream), args.chunk_rows)]
+    print(f"Base: {n_base:,} linhas | fluxo: {len(X_stream):,} linhas em {len(stream)} blocos")
+
+    rows = []
+    for drift in args.drift:
+        scenario, n_history = run_scenario(X_train[:n_base], stream, X_test, y_test,
+                                           drift, args.forgetting, gmm.RANDOM_SEED)
+        rows += scenario
+    print(f"Histórico final do refit: {n_history:,} linhas")
+
+    report = pd.DataFrame(rows).set_index(['drift', 'modelo'])
+    print(report.to_string(float_format=lambda v: f'{v:,.4f}' if abs(v) < 1 else f'{v:,.1f}'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark do motor de métricas (`metrics.py`) contra o scikit-learn.
+
+Gera um arquivo de predições sintético com `--rows` linhas (fraudes na taxa do
+creditcard.csv, score contínuo com empates) e mede:
+
+* métricas pontuais: as 5 funções do scikit-learn + `confusion_matrix` (como
+  no `evaluate_model` original) contra o `metrics.evaluate`, conferindo que os
+  valores são iguais (diferença < `TOLERANCE`);
+* bootstrap: `--resamples` reamostragens de Poisson, com o tempo total, e uma
+  estimativa do bootstrap ingênuo (uma reamostragem com o scikit-learn,
+  multiplicada por `--resamples`);
+* com `--check-ci`, os intervalos contra um bootstrap ingênuo de verdade em
+  `--check-rows` linhas (reamostragem com reposição + scikit-learn).
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_metrics.py [--rows 10000000] [--resamples 1000] [--check-ci]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import (average_precision_score, confusion_matrix, f1_score,
+                             precision_score, recall_score, roc_auc_score)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+import metrics
+
+FRAUD_RATE = 0.00172
+TOLERANCE = 1e-9
+
+
+def make_predictions(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    y_true = rng.random(n_rows) < FRAUD_RATE
+    # score arredondado: empates como em scores reais exportados em CSV
+    y_score = np.round(rng.normal(size=n_rows) + 2.5 * y_true, 3)
+    y_pred = y_score >= np.quantile(y_score, 0.995)
+    return y_true, y_score, y_pred
+
+
+def sklearn_metrics(y_true, y_score, y_pred):
+    return {
+        'Precision': precision_score(y_true, y_pred, zero_division=0),
+        'Recall': recall_score(y_true, y_pred, zero_division=0),
+        'F1-score': f1_score(y_true, y_pred, zero_division=0),
+        'ROC-AUC': roc_auc_score(y_true, y_score),
+        'PR-AUC': average_precision_score(y_true, y_score),
+        'TN_FP_FN_TP': confusion_matrix(y_true, y_pred).ravel().tolist(),
+    }
+
+
+def naive_bootstrap(y_true, y_score, y_pred, n_resamples, seed):
+    rng = np.random.default_rng(seed)
+    samples = []
+    for _ in range(n_resamples):
+        idx = rng.integers(0, len(y_true), len(y_true))
+        values = sklearn_metrics(y_true[idx], y_score[idx], y_pred[idx])
+        samples.append([values[name] for name in metrics.METRICS])
+    return dict(zip(metrics.METRICS, np.array(samples).T))
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--resamples', type=int, default=metrics.N_BOOTSTRAP)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--check-ci', action='store_true')
+    parser.add_argument('--check-rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    y_true, y_score, y_pred = make_predictions(args.rows, seed=0)
+    print(f"{args.rows:,} linhas, {y_true.sum():,} fraudes")
+
+    reference, sklearn_s = timed(sklearn_metrics, y_true, y_score, y_pred)
+    result, engine_s = timed(metrics.evaluate, y_true, y_score, y_pred)
+    diff = max(abs(result[name] - reference[name]) for name in metrics.METRICS)
+    assert diff < TOLERANCE and result['TN_FP_FN_TP'] == reference['TN_FP_FN_TP'], diff
+    print(f"Métricas pontuais: scikit-learn {sklearn_s:.2f}s | motor {engine_s:.2f}s "
+          f"({sklearn_s / engine_s:.1f}x) | diferença máxima {diff:.1e}")
+
+    ranked = metrics.RankedScores(y_true, y_score)
+    counts = metrics.confusion_counts(y_true, y_pred)
+    _, bootstrap_s = timed(metrics.bootstrap, ranked, counts, args.resamples,
+                           metrics.BOOTSTRAP_SEED, args.workers)
+    _, one_naive_s = timed(naive_bootstrap, y_true, y_score, y_pred, 1, 0)
+    print(f"Bootstrap ({args.resamples} reamostragens, {len(ranked.pos):,} blocos): "
+          f"{bootstrap_s:.2f}s | ingênuo estimado: {one_naive_s * args.resamples:,.0f}s")
+
+    if args.check_ci:
+        y_true, y_score, y_pred = make_predictions(args.check_rows, seed=1)
+        engine = metrics.evaluate(y_true, y_score, y_pred, n_bootstrap=args.resamples,
+                                  n_workers=args.workers)
+        naive = naive_bootstrap(y_true, y_score, y_pred, args.resamples, seed=1)
+        alpha = (1 - metrics.CI_LEVEL) / 2
+        rows = [{'métrica': name,
+                 'valor': engine[name],
+                 'IC Poisson': '[{:.4f}, {:.4f}]'.format(*engine[f'{name} IC']),
+                 'IC ingênuo': '[{:.4f}, {:.4f}]'.format(
+                     *np.nanquantile(naive[name], [alpha, 1 - alpha]))}
+                for name in metrics.METRICS]
+        print(f"\nIntervalos de {metrics.CI_LEVEL:.0%} em {args.check_rows:,} linhas:")
+        print(pd.DataFrame(rows).set_index('métrica').to_string(float_format='{:.4f}'.format))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,530 @@
+"""Benchmark de escala de todas as etapas, de 10 mil a 10 milhões de linhas.
+
+Para cada tamanho em `--rows`, gera um `creditcard.csv` sintético com o mesmo
+layout do original (Time, V1-V28, Amount, Class), na taxa de fraude do
+dataset real, e o pré-processa com o `preprocessing_streaming.py`. As linhas
+vêm do mesmo gerador do `generate_mocks.py` (`build_distribution`,
+`chunk_labels`, `chunk_features`), com a padronização desfeita: a mesma
+distribuição dos mocks, antes do StandardScaler. Os dados processados têm o
+mesmo contrato dos mocks e do `preprocessing.py` e ficam em
+`--workdir/<linhas>/`, reaproveitados entre execuções. Se a preparação de um
+tamanho falhar, todas as etapas desse tamanho entram no resultado como
+falhas (e contam como regressão contra o baseline) e os demais tamanhos
+continuam.
+
+Cada etapa roda em um processo separado (pico de RSS isolado, limite de tempo
+em `--timeout`) com as mesmas funções e configurações dos scripts:
+
+* preprocessing: o caminho em memória do `preprocessing.py` (leitura, split
+  estratificado, StandardScaler, tabelas + feature store);
+* gmm: `GaussianMixture` com os melhores parâmetros do gmm.py e pontuação com
+  o `GMMKernel`;
+* dbscan: `DBSCANDetector` (modo index);
+* autoencoder: `--ae-epochs` épocas do modelo de produção e `predict`;
+* evaluation: leitura das predições das etapas acima (sintéticas para os
+  modelos pulados) e `evaluate_model` com o bootstrap do evaluation.py.
+
+Medidas por etapa: `fit_s` (ajuste), `score_rows_per_s` (throughput da
+pontuação / transformação / métricas), `write_s` (predições, artefatos e
+tabelas), `peak_rss_mb` e `wall_s` do processo. Quando uma etapa falha ou
+passa de `--max-seconds`, os tamanhos maiores dela são pulados.
+
+O resultado vai para `outputs/benchmarks/scale_<UTC>.json` e é comparado com
+o baseline (`--baseline`, gravado com `--save-baseline`): tempos e memória
+acima de `1 + --tolerance` vezes o baseline, throughput abaixo de
+`1 / (1 + --tolerance)` ou etapas que deixaram de rodar são regressões, e o
+script sai com código 1.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_scale.py [--rows 10000 100000 1000000 10000000]
+        [--stages gmm dbscan] [--baseline benchmarks/baselines/scale.json]
+        [--save-baseline] [--tolerance 0.25]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'src', 'models')]
+
+STAGES = ['preprocessing', 'gmm', 'dbscan', 'autoencoder', 'evaluation']
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_BASELINE = os.path.join('benchmarks', 'baselines', 'scale.json')
+RESULTS_DIR = os.path.join('outputs', 'benchmarks')
+
+# Dados sintéticos (gerador do generate_mocks.py, taxa de fraude do creditcard.csv)
+FRAUD_RATE = 0.00172
+SECONDS_SPAN = 172_800  # 2 dias, como no dataset original
+DATA_SEED = 42
+
+# Caminhos dentro de cada --workdir/<linhas>/ (os scripts usam caminhos relativos)
+RAW_FILE = 'data/raw/creditcard.csv'
+PROCESSED_PATH = 'data/processed'
+PREPROCESSING_OUTPUT = 'data/bench_preprocessing'
+SETUP_FILE = 'bench_setup.json'
+
+# Melhores parâmetros usados no modo normal dos scripts
+GMM_PARAMS = {'n_components': 3, 'covariance_type': 'full'}
+AE_PARAMS = {'encoding_dim': 8, 'learning_rate': 0.001, 'batch_size': 128, 'epochs': 50}
+
+# Medidas comparadas com o baseline: True = maior é melhor
+COMPARED_METRICS = {'fit_s': False, 'score_rows_per_s': True, 'write_s': False,
+                    'peak_rss_mb': False, 'wall_s': False}
+# Tempos abaixo disso são ruído de medida e não contam como regressão
+MIN_COMPARED_SECONDS = 0.05
+
+
+# =========================================================
+# 1. DADOS SINTÉTICOS
+# =========================================================
+
+def raw_columns():
+    from generate_mocks import FEATURE_COLUMNS
+    return ['Time'] + FEATURE_COLUMNS + ['Class']
+
+
+def write_raw_csv(path, n_rows, seed=DATA_SEED):
+    """Grava o CSV em blocos (memória limitada a um bloco), com os blocos do generate_mocks.py.
+
+    Mesmos blocos, sementes e rótulos que o `generate_mocks.generate` usaria
+    com `n_rows`, `FRAUD_RATE` e `seed`; o split sorteado pelo gerador é
+    ignorado (quem divide é o preprocessing).
+    """
+    import generate_mocks
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    dist = generate_mocks.build_distribution(seed)
+    chunk_rows = generate_mocks.CHUNK_ROWS
+    starts = range(0, n_rows, chunk_rows)
+    streams = generate_mocks.chunk_streams(seed, len(starts))
+
+    tmp_path = path + '.tmp'
+    for i, (start, (label_seq, feature_seq)) in enumerate(zip(starts, streams)):
+        n = min(chunk_rows, n_rows - start)
+        y, _ = generate_mocks.chunk_labels(label_seq, n, FRAUD_RATE)
+        # features na escala bruta (antes da padronização do gerador)
+        X = generate_mocks.chunk_features(feature_seq, y, dist) * dist['scale'] + dist['center']
+        time_s = np.floor(np.arange(start, start + n) * SECONDS_SPAN / n_rows)
+        chunk = pd.DataFrame(np.column_stack([time_s, X]), columns=raw_columns()[:-1])
+        chunk['Class'] = y
+        chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=i == 0,
+                     index=False, float_format='%.6f')
+    os.replace(tmp_path, path)
+
+
+def prepare_size(size_dir, n_rows):
+    """CSV bruto + dados processados de um tamanho (reaproveitados se já existem)."""
+    setup_path = os.path.join(size_dir, SETUP_FILE)
+    expected = {'rows': n_rows, 'seed': DATA_SEED, 'fraud_rate': FRAUD_RATE,
+                'generator': 'generate_mocks'}
+    if os.path.exists(setup_path):
+        with open(setup_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == expected:
+                return 0.0
+
+    start = time.perf_counter()
+    os.makedirs(size_dir, exist_ok=True)
+    write_raw_csv(os.path.join(size_dir, RAW_FILE), n_rows)
+    log_path = os.path.join(size_dir, 'setup.log')
+    with open(log_path, 'w', encoding='utf-8') as log:
+        proc = subprocess.run([sys.executable, os.path.join(ROOT, 'src', 'preprocessing_streaming.py'),
+                               '--input', RAW_FILE, '--output', PROCESSED_PATH],
+                              cwd=size_dir, stdout=log, stderr=subprocess.STDOUT,
+                              env=dict(os.environ, MPLBACKEND='Agg'))
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha ao preparar {n_rows} linhas (log: {log_path})")
+    with open(setup_path, 'w', encoding='utf-8') as f:
+        json.dump(expected, f)
+    return time.perf_counter() - start
+
+
+# =========================================================
+# 2. ETAPAS (EXECUTADAS NO PROCESSO FILHO)
+# =========================================================
+
+def bench_preprocessing():
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from artifacts import save_scaler
+    from data_contract import save_table
+    from feature_store import write_feature_store
+
+    start = time.perf_counter()
+    df = pd.read_csv(RAW_FILE)
+    read_s = time.perf_counter() - start
+
+    # Mesmo split 70/15/15 estratificado e scaler do preprocessing.py
+    start = time.perf_counter()
+    df['id'] = df.index
+    y = df['Class']
+    X = df.drop(columns=['Class', 'id', 'Time'])
+    X_train, X_temp, y_train, y_temp = train_test_split(
+        X, y, test_size=0.30, random_state=42, stratify=y)
+    X_val, X_test, y_val, y_test = train_test_split(
+        X_temp, y_temp, test_size=0.50, random_state=42, stratify=y_temp)
+    scaler = StandardScaler().fit(X_train)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scaled = {name: pd.DataFrame(scaler.transform(part), columns=X.columns, index=part.index)
+              for name, part in (('train', X_train), ('val', X_val), ('test', X_test))}
+    score_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    save_scaler(scaler, X_train.columns)
+    save_table(scaled['train'], PREPROCESSING_OUTPUT, 'X_train_processed')
+    save_table(scaled['test'], PREPROCESSING_OUTPUT, 'X_test_processed')
+    save_table(y_train, PREPROCESSING_OUTPUT, 'y_train')
+    save_table(y_test, PREPROCESSING_OUTPUT, 'y_test')
+    save_table(df.loc[X_test.index, 'id'], PREPROCESSING_OUTPUT, 'ids_test')
+    mask = (y_train == 0).values
+    write_feature_store(PREPROCESSING_OUTPUT, X_train.columns, [
+        ('train_normal', scaled['train'].values[mask], y_train.values[mask],
+         df.loc[X_train.index[mask], 'id']),
+        ('train_anomaly', scaled['train'].values[~mask], y_train.values[~mask],
+         df.loc[X_train.index[~mask], 'id']),
+        ('val', scaled['val'], y_val, df.loc[X_val.index, 'id']),
+        ('test', scaled['test'], y_test, df.loc[X_test.index, 'id']),
+    ])
+    write_s = time.perf_counter() - start
+    return {'fit_s': fit_s, 'score_rows': len(df), 'score_s': score_s, 'write_s': write_s,
+            'extra': {'read_s': read_s}}
+
+
+def bench_gmm():
+    from sklearn.mixture import GaussianMixture
+    import gmm
+    from artifacts import write_predictions
+    from gmm_kernel import GMMKernel
+    from thresholds import flag_anomalies, select_threshold
+
+    X_train, X_test, y_test, ids_test = gmm.load_data(PROCESSED_PATH)
+
+    start = time.perf_counter()
+    model = GaussianMixture(random_state=gmm.RANDOM_SEED, **GMM_PARAMS).fit(X_train)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = -GMMKernel.from_sklearn(model).score_samples(X_test)
+    score_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    threshold = select_threshold(y_test, scores, gmm.THRESHOLD_POLICY)
+    write_predictions(os.path.join(gmm.OUTPUT_PATH, 'gmm_predictions.csv'),
+                      ids_test, scores, flag_anomalies(scores, threshold))
+    gmm.save_gmm_artifact(model, GMM_PARAMS, threshold, 0.0, len(X_train))
+    write_s = time.perf_counter() - start
+    return {'fit_s': fit_s, 'score_rows': len(X_test), 'score_s': score_s, 'write_s': write_s,
+            'extra': {'fit_rows': len(X_train), 'em_iterations': int(model.n_iter_)}}
+
+
+def bench_dbscan():
+    import dbscan
+    from artifacts import write_predictions
+    from thresholds import flag_anomalies
+
+    X_test, ids_test = dbscan.load_data(PROCESSED_PATH)
+    X_train = dbscan.load_train_normal(PROCESSED_PATH)
+
+    # Mesma amostra de ajuste do main() do dbscan.py
+    start = time.perf_counter()
+    detector = dbscan.DBSCANDetector(fit_sample_rows=dbscan.FIT_SAMPLE_ROWS or len(X_test))
+    detector.fit(X_train)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = detector.score(X_test)
+    score_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    write_predictions(os.path.join(dbscan.OUTPUT_DIR, dbscan.OUTPUT_FILE), ids_test, scores,
+                      flag_anomalies(scores, {'threshold': dbscan.EPS_THRESHOLD}))
+    dbscan.save_dbscan_artifact(detector.pca_mean_, detector.pca_components_,
+                                detector.core_points_, 'index', detector.n_fit_rows_)
+    write_s = time.perf_counter() - start
+    return {'fit_s': fit_s, 'score_rows': len(X_test), 'score_s': score_s, 'write_s': write_s,
+            'extra': {'fit_rows': detector.n_fit_rows_,
+                      'core_points': len(detector.core_points_)}}
+
+
+def bench_autoencoder(epochs):
+    import autoencoder
+    from artifacts import write_predictions
+    from feature_store import open_feature_store
+    from thresholds import flag_anomalies, select_threshold
+
+    X_train, X_val, _, _ = autoencoder.load_and_split_data(PROCESSED_PATH)
+    store = open_feature_store(PROCESSED_PATH)
+    X_test, y_test, ids_test = store.segment('test'), store.labels('test'), store.ids('test')
+
+    start = time.perf_counter()
+    model = autoencoder.compile_autoencoder(AE_PARAMS, X_train.shape[1])
+    autoencoder.fit_autoencoder(model, X_train, X_val, AE_PARAMS['batch_size'], epochs, [])
+    fit_s = time.perf_counter() - start
+
+    # Primeira chamada compila o grafo de inferência: fora da medida
+    model.predict(X_test[:autoencoder.PREDICT_BATCH_SIZE], verbose=0)
+    start = time.perf_counter()
+    reconstructions = model.predict(X_test, batch_size=autoencoder.PREDICT_BATCH_SIZE, verbose=0)
+    scores = np.mean(np.square(X_test - reconstructions), axis=1)
+    score_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    threshold = select_threshold(y_test, scores, autoencoder.THRESHOLD_POLICY)
+    write_predictions(os.path.join(autoencoder.OUTPUT_PATH, 'autoencoder_predictions.csv'),
+                      ids_test, scores, flag_anomalies(scores, threshold))
+    autoencoder.save_autoencoder_artifact(model, AE_PARAMS, threshold, 0.0)
+    write_s = time.perf_counter() - start
+    return {'fit_s': fit_s, 'score_rows': len(X_test), 'score_s': score_s, 'write_s': write_s,
+            'extra': {'fit_rows': len(X_train), 'epochs': epochs,
+                      'fit_s_per_epoch': fit_s / epochs}}
+
+
+def bench_evaluation():
+    import evaluation
+    from data_contract import load_table
+
+    prediction_files = {'GMM': 'gmm_predictions.csv', 'DBSCAN': 'dbscan_predictions.csv',
+                        'Autoencoder': 'autoencoder_predictions.csv'}
+    start = time.perf_counter()
+    y_test = load_table(PROCESSED_PATH, 'y_test')
+    ids_test = load_table(PROCESSED_PATH, 'ids_test')
+    y_df = pd.DataFrame({'id': ids_test['id'], 'Class': y_test['Class']})
+    predictions, synthetic = {}, []
+    for name, filename in prediction_files.items():
+        path = os.path.join(evaluation.OUTPUT_PATH, filename)
+        if os.path.exists(path):
+            predictions[name] = pd.read_csv(path)
+        else:
+            # Modelo pulado neste tamanho: scores sintéticos com o mesmo formato
+            rng = np.random.default_rng(len(synthetic))
+            scores = rng.standard_normal(len(y_df)) + 2.0 * y_df['Class'].to_numpy()
+            predictions[name] = pd.DataFrame({'id': y_df['id'], 'anomaly_score': scores,
+                                              'is_anomaly': (scores >= 2.0).astype(int)})
+            synthetic.append(name)
+    read_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [evaluation.evaluate_model(df, y_df, name) for name, df in predictions.items()]
+    score_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    os.makedirs(evaluation.OUTPUT_PATH, exist_ok=True)
+    pd.DataFrame(results).to_csv(os.path.join(evaluation.OUTPUT_PATH, 'evaluation_metrics.csv'),
+                                 index=False)
+    write_s = time.perf_counter() - start
+    return {'fit_s': None, 'score_rows': len(y_df) * len(predictions), 'score_s': score_s,
+            'write_s': write_s,
+            'extra': {'read_s': read_s, 'n_bootstrap': evaluation.N_BOOTSTRAP,
+                      'synthetic_predictions': synthetic}}
+
+
+def run_child(stage, args):
+    """Executa uma etapa no diretório do tamanho e imprime as medidas em JSON."""
+    from telemetry import peak_rss_mb
+
+    start = time.perf_counter()
+    if stage == 'autoencoder':
+        measures = bench_autoencoder(args.ae_epochs)
+    else:
+        measures = globals()[f'bench_{stage}']()
+    score_s = measures.pop('score_s')
+    result = {
+        'fit_s': measures['fit_s'],
+        'score_rows': measures['score_rows'],
+        'score_rows_per_s': measures['score_rows'] / score_s if score_s > 0 else None,
+        'write_s': measures['write_s'],
+        'peak_rss_mb': peak_rss_mb(),
+        'child_s': time.perf_counter() - start,
+        'extra': measures['extra'],
+    }
+    print(json.dumps(result))
+
+
+# =========================================================
+# 3. EXECUÇÃO E COMPARAÇÃO
+# =========================================================
+
+def run_stage(stage, n_rows, size_dir, args):
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', stage,
+           '--ae-epochs', str(args.ae_epochs)]
+    log_path = os.path.join(size_dir, 'logs', f'{stage}.log')
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    record = {'stage': stage, 'rows': n_rows}
+    start = time.perf_counter()
+    try:
+        with open(log_path, 'w', encoding='utf-8') as log:
+            proc = subprocess.run(cmd, cwd=size_dir, stdout=subprocess.PIPE, stderr=log,
+                                  text=True, timeout=args.timeout,
+                                  env=dict(os.environ, MPLBACKEND='Agg', PYTHONHASHSEED='0'))
+            log.write(proc.stdout)
+    except subprocess.TimeoutExpired:
+        return {**record, 'status': 'timeout', 'wall_s': time.perf_counter() - start,
+                'detail': f'mais de {args.timeout}s (log: {log_path})'}
+    record['wall_s'] = time.perf_counter() - start
+
+    if proc.returncode != 0:
+        # -9: morto pelo sistema, em geral por falta de memória
+        reason = ('SIGKILL (memória?)' if proc.returncode == -9
+                  else f'código de saída {proc.returncode}')
+        return {**record, 'status': 'falhou', 'detail': f'{reason} (log: {log_path})'}
+    return {**record, 'status': 'ok', **json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def machine_info():
+    packages = {}
+    for name in ('numpy', 'pandas', 'scikit-learn', 'scipy', 'tensorflow'):
+        try:
+            packages[name] = version(name)
+        except PackageNotFoundError:
+            packages[name] = None
+    return {'platform': platform.platform(), 'python': platform.python_version(),
+            'cpu_count': os.cpu_count(), 'packages': packages}
+
+
+def compare(results, baseline, tolerance):
+    """Linhas do relatório contra o baseline e a lista de regressões."""
+    base = {(r['stage'], r['rows']): r for r in baseline['results']}
+    rows, regressions = [], []
+    for result in results:
+        previous = base.get((result['stage'], result['rows']))
+        if previous is None or previous['status'] != 'ok':
+            continue
+        key = f"{result['stage']} {result['rows']:,}"
+        if result['status'] != 'ok':
+            regressions.append(f"{key}: {result['status']} (baseline: ok)")
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = previous.get(metric), result.get(metric)
+            if old is None or new is None or old <= 0:
+                continue
+            ratio = new / old
+            if higher_is_better:
+                seconds = result['score_rows'] / min(old, new)
+                regressed = ratio < 1 / (1 + tolerance)
+            else:
+                seconds = max(old, new) if metric.endswith('_s') else float('inf')
+                regressed = ratio > 1 + tolerance
+            regressed = regressed and seconds >= MIN_COMPARED_SECONDS
+            rows.append({'etapa': result['stage'], 'linhas': result['rows'], 'medida': metric,
+                         'baseline': old, 'atual': new, 'razão': ratio,
+                         '': 'REGRESSÃO' if regressed else ''})
+            if regressed:
+                regressions.append(f"{key}: {metric} {old:,.3f} -> {new:,.3f} ({ratio:.2f}x)")
+    return pd.DataFrame(rows), regressions
+
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--workdir', default='.bench_scale',
+                        help='dados sintéticos e saídas por tamanho (reaproveitados)')
+    parser.add_argument('--ae-epochs', type=int, default=1,
+                        help='épocas do autoencoder por tamanho (o treino completo usa até 50)')
+    parser.add_argument('--max-seconds', type=float, default=900,
+                        help='acima disso, os tamanhos maiores da etapa são pulados')
+    parser.add_argument('--timeout', type=int, default=3600, help='limite por etapa (s)')
+    parser.add_argument('--output', default=None,
+                        help=f'JSON de resultados (padrão: {RESULTS_DIR}/scale_<UTC>.json)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='grava este resultado como o novo baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='variação aceita em relação ao baseline (0.25 = 25%%)')
+    parser.add_argument('--child', choices=STAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args)
+        return
+
+    created_at = datetime.now(timezone.utc)
+    stages = [s for s in STAGES if s in args.stages]
+    results, stopped = [], {}
+    for n_rows in sorted(args.rows):
+        size_dir = os.path.abspath(os.path.join(args.workdir, str(n_rows)))
+        try:
+            setup_s = prepare_size(size_dir, n_rows)
+        except Exception as e:
+            # Falha na preparação: todas as etapas do tamanho falham, os demais continuam
+            setup_error = f"preparação dos dados: {type(e).__name__}: {e}"
+            print(f"{n_rows:>11,} linhas: {setup_error}", flush=True)
+        else:
+            setup_error = None
+            if setup_s:
+                print(f"{n_rows:>11,} linhas: dados sintéticos preparados em {setup_s:.1f}s",
+                      flush=True)
+        for stage in stages:
+            if setup_error:
+                result = {'stage': stage, 'rows': n_rows, 'status': 'falhou',
+                          'detail': setup_error}
+            elif stage in stopped:
+                result = {'stage': stage, 'rows': n_rows, 'status': 'pulado',
+                          'detail': stopped[stage]}
+            else:
+                result = run_stage(stage, n_rows, size_dir, args)
+                if result['status'] != 'ok':
+                    stopped[stage] = f"{result['status']} com {n_rows:,} linhas"
+                elif result['wall_s'] > args.max_seconds:
+                    stopped[stage] = f"{result['wall_s']:.0f}s com {n_rows:,} linhas"
+            results.append(result)
+            print(f"{n_rows:>11,} | {stage:<13s} | {result['status']:<7s} "
+                  f"{result.get('wall_s', 0):8.2f}s  {result.get('detail', '')}", flush=True)
+
+    payload = {
+        'created_at': created_at.isoformat(timespec='seconds'),
+        'machine': machine_info(),
+        'config': {'rows': sorted(args.rows), 'stages': stages, 'ae_epochs': args.ae_epochs,
+                   'fraud_rate': FRAUD_RATE, 'seed': DATA_SEED, 'gmm_params': GMM_PARAMS,
+                   'ae_params': AE_PARAMS},
+        'results': results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"scale_{created_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+    write_json(output, payload)
+
+    columns = ['fit_s', 'score_rows_per_s', 'write_s', 'peak_rss_mb', 'wall_s', 'status']
+    report = pd.DataFrame(results).set_index(['stage', 'rows']).reindex(columns=columns)
+    print('\n' + report.to_string(float_format=lambda v: f'{v:,.2f}', na_rep='-'))
+    print(f"\nResultados salvos em: {output}")
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        table, regressions = compare(results, baseline, args.tolerance)
+        print(f"\nComparação com o baseline ({args.baseline}, {baseline['created_at']}, "
+              f"tolerância {args.tolerance:.0%}):")
+        if baseline['machine'] != payload['machine']:
+            print("Atenção: baseline gravado em outra máquina/versões de pacotes.")
+        if not table.empty:
+            print(table.to_string(index=False, float_format=lambda v: f'{v:,.3f}'))
+        print(f"{len(regressions)} regressões" + ''.join(f"\n  - {r}" for r in regressions))
+    else:
+        print(f"\nSem baseline em {args.baseline} (use --save-baseline para gravar este).")
+
+    if args.save_baseline:
+        write_json(args.baseline, payload)
+        print(f"Baseline salvo em: {args.baseline}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
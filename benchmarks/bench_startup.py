@@ -0,0 +1,120 @@
+"""Benchmark de import e de inicialização dos pontos de entrada.
+
+Para cada módulo, abre um processo Python novo e mede:
+
+* import: tempo de `import <módulo>` (bibliotecas incluídas), e quais
+  bibliotecas pesadas (TensorFlow, matplotlib, seaborn, scikit-learn) ficaram
+  carregadas depois do import;
+* CLI: tempo total do processo em `--help` e, com `--input`, no
+  `--score-only` de cada modelo (import + artefato + pontuação + escrita).
+
+Importar um módulo não deve executar nada além de definições: se o import
+de um script rodar o pipeline inteiro, o tempo medido inclui essa execução.
+
+Uso (a partir da raiz do repositório, depois de treinar os modelos):
+    python benchmarks/bench_startup.py [--input novas.csv] [--repeats 3] [--json saida.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATHS = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'src', 'models')]
+
+HEAVY_MODULES = ['tensorflow', 'matplotlib', 'seaborn', 'sklearn']
+
+MODULES = ['metrics', 'thresholds', 'evaluation', 'preprocessing', 'gmm', 'dbscan',
+           'autoencoder', 'gmm_online', 'cascade', 'serving', 'pipeline']
+
+# Scripts com argparse: o --help mede só a inicialização
+CLI_SCRIPTS = {
+    'gmm': 'src/models/gmm.py',
+    'dbscan': 'src/models/dbscan.py',
+    'autoencoder': 'src/models/autoencoder.py',
+    'gmm_online': 'src/models/gmm_online.py',
+    'cascade': 'src/models/cascade.py',
+    'serving': 'src/serving.py',
+    'pipeline': 'src/pipeline.py',
+}
+
+SCORE_ONLY_MODELS = ['gmm', 'dbscan', 'autoencoder', 'cascade']
+
+CHILD = '''
+import json, sys, time
+sys.path[:0] = {paths!r}
+t0 = time.perf_counter()
+import {module}
+t1 = time.perf_counter()
+print(json.dumps({{'import_s': t1 - t0,
+                   'carregados': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def run_child(args):
+    # MPLBACKEND=Agg: um plt.show() no import não bloqueia o benchmark
+    env = dict(os.environ, MPLBACKEND='Agg', TF_CPP_MIN_LOG_LEVEL='3')
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env)
+    elapsed = time.perf_counter() - start
+    if out.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} falhou:\n{out.stderr[-2000:]}")
+    return elapsed, out.stdout
+
+
+def measure_import(module, repeats):
+    code = CHILD.format(paths=PATHS, module=module, heavy=HEAVY_MODULES)
+    runs = []
+    for _ in range(repeats):
+        _, stdout = run_child(['-c', code])
+        runs.append(json.loads(stdout.strip().splitlines()[-1]))
+    return {
+        'import_s': float(pd.Series([r['import_s'] for r in runs]).median()),
+        'bibliotecas_carregadas': ','.join(runs[-1]['carregados']) or '-',
+    }
+
+
+def measure_cli(args, repeats):
+    return float(pd.Series([run_child(args)[0] for _ in range(repeats)]).median())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--input', help='CSV bruto pontuado no --score-only de cada modelo')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--json', help='grava os resultados neste arquivo')
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for module in args.modules:
+            print(f"Medindo {module}...", flush=True)
+            row = {'módulo': module, **measure_import(module, args.repeats)}
+            script = CLI_SCRIPTS.get(module)
+            if script:
+                row['help_s'] = measure_cli([os.path.join(ROOT, script), '--help'], args.repeats)
+            if args.input and module in SCORE_ONLY_MODELS:
+                row['score_only_s'] = measure_cli(
+                    [os.path.join(ROOT, script), '--score-only', '--input', args.input,
+                     '--output', os.path.join(tmp, f'{module}.csv')], args.repeats)
+            rows.append(row)
+
+    table = pd.DataFrame(rows).set_index('módulo')
+    print(f"\nImport e inicialização (mediana de {args.repeats} processos):")
+    print(table.to_string(float_format=lambda v: f'{v:.3f}', na_rep='-'))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados salvos em: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
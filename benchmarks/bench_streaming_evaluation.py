@@ -0,0 +1,217 @@
+"""Benchmark da avaliação em streaming (`evaluation_streaming.py`) contra a exata.
+
+Duas partes:
+
+* validação: nas predições de `outputs/` (dos modelos treinados), compara a
+  ROC-AUC e a PR-AUC dos histogramas, para cada `--relative-accuracy`, com o
+  `roc_auc_score` e o `average_precision_score` do scikit-learn sobre o merge
+  em memória, e confere que o valor exato fica dentro dos limites calculados;
+* escala: para cada tamanho em `--sizes`, gera três arquivos de predições
+  sintéticos (scores no formato do GMM, do autoencoder e do DBSCAN, 0,17% de
+  fraudes) e roda o `evaluation.py` (em memória, sem bootstrap) e o
+  `evaluation_streaming.py` em processos separados, com limite de memória
+  (`--mem-limit-gb`). Reporta tempo, pico de RSS e a maior diferença de
+  ROC-AUC/PR-AUC entre os dois.
+
+Uso (a partir da raiz do repositório, depois de rodar os modelos):
+    python benchmarks/bench_streaming_evaluation.py [--sizes 1000000 10000000]
+        [--relative-accuracy 1e-2 1e-3 1e-4] [--workers N] [--skip-validation]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'src', 'models')]
+import evaluation
+from evaluation_streaming import evaluate_histogram, stream_histograms
+
+BENCH_DIR = os.path.join(ROOT, '.bench_streaming_evaluation')
+FRAUD_RATE = 0.0017
+WRITE_CHUNK_ROWS = 1_000_000
+
+
+# =========================================================
+# VALIDAÇÃO (scikit-learn)
+# =========================================================
+
+def validate(output_path, data_path, accuracies, n_workers):
+    from sklearn.metrics import average_precision_score, roc_auc_score
+
+    y_df = evaluation.load_ground_truth(data_path)
+    exact = {}
+    for model_name, pred_df in evaluation.load_predictions(output_path).items():
+        df = pred_df.merge(y_df, on="id", how="inner")
+        exact[model_name] = (roc_auc_score(df["Class"], df["anomaly_score"]),
+                             average_precision_score(df["Class"], df["anomaly_score"]))
+
+    rows = []
+    for accuracy in accuracies:
+        histograms = stream_histograms(output_path, data_path, relative_accuracy=accuracy,
+                                       n_workers=n_workers)
+        for model_name, (histogram, counts) in histograms.items():
+            roc_auc, pr_auc = histogram.ranked().curve_metrics()
+            (roc_low, roc_high), (pr_low, pr_high) = histogram.curve_bounds()
+            roc_exact, pr_exact = exact[model_name]
+            assert roc_low - 1e-12 <= roc_exact <= roc_high + 1e-12, model_name
+            assert pr_low - 1e-12 <= pr_exact <= pr_high + 1e-12, model_name
+            rows.append({
+                'modelo': model_name,
+                'precisão_rel': accuracy,
+                'bins': histogram.n_bins,
+                'roc_auc_sklearn': roc_exact,
+                'dif_roc_auc': abs(roc_auc - roc_exact),
+                'largura_limites_roc': roc_high - roc_low,
+                'pr_auc_sklearn': pr_exact,
+                'dif_pr_auc': abs(pr_auc - pr_exact),
+                'largura_limites_pr': pr_high - pr_low,
+            })
+    return pd.DataFrame(rows).set_index(['modelo', 'precisão_rel'])
+
+
+# =========================================================
+# ESCALA (dados sintéticos)
+# =========================================================
+
+def synthetic_scores(kind, y, rng):
+    n_fraud = int(y.sum())
+    scores = np.empty(len(y))
+    if kind == 'gmm':
+        scores[y == 0] = 0.5 * rng.chisquare(29, len(y) - n_fraud) - 20.0
+        scores[y == 1] = rng.lognormal(3.0, 1.5, n_fraud)
+    elif kind == 'autoencoder':
+        scores[y == 0] = rng.lognormal(-1.0, 0.8, len(y) - n_fraud)
+        scores[y == 1] = rng.lognormal(1.0, 1.5, n_fraud)
+    else:
+        # distância ao ponto núcleo / eps, com muitos empates em 0
+        scores[y == 0] = np.maximum(rng.normal(0.2, 0.3, len(y) - n_fraud), 0)
+        scores[y == 1] = np.maximum(rng.normal(1.0, 0.6, n_fraud), 0)
+    return scores
+
+
+def generate(n_rows, seed=0):
+    """Pasta com data/ (ids_test, y_test) e outputs/ (predições dos três modelos)."""
+    from data_contract import save_table
+
+    root = os.path.join(BENCH_DIR, str(n_rows))
+    data_path, output_path = os.path.join(root, 'data'), os.path.join(root, 'outputs')
+    if os.path.exists(os.path.join(root, '_SUCCESS')):
+        return data_path, output_path
+    os.makedirs(output_path, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    ids = np.arange(n_rows, dtype=np.int64)
+    y = (rng.random(n_rows) < FRAUD_RATE).astype(np.int8)
+    save_table(pd.DataFrame({'id': ids}), data_path, 'ids_test', write_csv=False)
+    save_table(pd.DataFrame({'Class': y}), data_path, 'y_test', write_csv=False)
+
+    for prefix in evaluation.MODELS.values():
+        scores = synthetic_scores(prefix, y, rng)
+        threshold = np.quantile(scores, 0.995)
+        path = os.path.join(output_path, f'{prefix}_predictions.csv')
+        for start in range(0, n_rows, WRITE_CHUNK_ROWS):
+            stop = start + WRITE_CHUNK_ROWS
+            pd.DataFrame({
+                'id': ids[start:stop],
+                'anomaly_score': scores[start:stop],
+                'is_anomaly': (scores[start:stop] >= threshold).astype(int),
+            }).to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    open(os.path.join(root, '_SUCCESS'), 'w').close()
+    return data_path, output_path
+
+
+def run_child(mode, n_rows, n_workers):
+    """Avalia os três modelos neste processo e imprime as medidas em JSON."""
+    from telemetry import peak_rss_mb
+
+    data_path, output_path = generate(n_rows)
+    start = time.perf_counter()
+    if mode == 'memory':
+        predictions = evaluation.load_predictions(output_path)
+        y_test = evaluation.load_ground_truth(data_path)
+        evaluation.N_BOOTSTRAP = 0
+        results = [evaluation.evaluate_model(pred_df, y_test, model_name)
+                   for model_name, pred_df in predictions.items()]
+    else:
+        histograms = stream_histograms(output_path, data_path, n_workers=n_workers)
+        results = [evaluate_histogram(histogram, counts, model_name, n_bootstrap=0)
+                   for model_name, (histogram, counts) in histograms.items()]
+    seconds = time.perf_counter() - start
+    print(json.dumps({
+        'total_s': seconds,
+        'pico_MB': peak_rss_mb(),
+        'metrics': {r['Modelo']: [r['ROC-AUC'], r['PR-AUC']] for r in results},
+    }))
+
+
+def run(mode, n_rows, args):
+    def limit_memory():
+        limit = int(args.mem_limit_gb * 1024 ** 3)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', mode, str(n_rows)]
+    if args.workers:
+        cmd += ['--workers', str(args.workers)]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=args.timeout,
+                              preexec_fn=limit_memory, env=dict(os.environ, MPLBACKEND='Agg'))
+    except subprocess.TimeoutExpired:
+        return {'status': f'timeout ({args.timeout}s)'}
+    if proc.returncode != 0:
+        error = 'MemoryError' if 'MemoryError' in proc.stderr else proc.stderr.strip().splitlines()[-1]
+        return {'status': f'falhou: {error}'}
+    return {'status': 'ok', **json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output-path', default=evaluation.OUTPUT_PATH)
+    parser.add_argument('--data-path', default=evaluation.DATA_PATH)
+    parser.add_argument('--relative-accuracy', type=float, nargs='+', default=[1e-2, 1e-3, 1e-4])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--mem-limit-gb', type=float, default=4.0)
+    parser.add_argument('--timeout', type=int, default=3600)
+    parser.add_argument('--skip-validation', action='store_true')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'ROWS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]), args.workers)
+        return
+
+    if not args.skip_validation:
+        report = validate(args.output_path, args.data_path, args.relative_accuracy, args.workers)
+        print("Validação contra o scikit-learn (predições de outputs/):")
+        print(report.to_string(float_format=lambda v: f'{v:.2e}' if abs(v) < 1e-2 else f'{v:.4f}'))
+
+    rows = []
+    for n_rows in args.sizes:
+        print(f"\nGerando {n_rows:,} linhas x {len(evaluation.MODELS)} modelos...", flush=True)
+        generate(n_rows)
+        results = {mode: run(mode, n_rows, args) for mode in ['memory', 'streaming']}
+        diff = None
+        if all(r['status'] == 'ok' for r in results.values()):
+            diff = max(abs(a - b)
+                       for model_name, values in results['memory']['metrics'].items()
+                       for a, b in zip(values, results['streaming']['metrics'][model_name]))
+        for mode, result in results.items():
+            result.pop('metrics', None)
+            rows.append({'linhas': n_rows, 'modo': mode, **result, 'dif_max_auc': diff})
+            print(f"{n_rows:>11,} | {mode:9s} | {result}", flush=True)
+
+    report = pd.DataFrame(rows).set_index(['linhas', 'modo'])
+    print(f"\nLimite de memória: {args.mem_limit_gb} GB")
+    print(report.to_string(float_format=lambda v: f'{v:.1e}' if abs(v) < 1e-2 else f'{v:,.1f}'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark e validação do pré-processamento em streaming.
+
+Roda o `preprocessing.py` (em memória) e o `preprocessing_streaming.py` nos
+modos `exact` e `hash`, cada um em um processo e diretório temporário, e
+reporta tempo, pico de RSS e a comparação das saídas com o caminho em memória:
+
+* exact: diferença máxima das tabelas .npy e do feature store (deve ser 0);
+* hash: proporção de cada split, taxa de fraude por split e média/desvio das
+  features de treino após o escalonamento.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_streaming_preprocessing.py [data/raw/creditcard.csv] [--chunksize N]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+TABLES = ['X_train_processed', 'X_test_processed', 'y_train', 'y_test', 'ids_test']
+
+
+def run(cmd, cwd):
+    """Executa o comando e retorna (segundos, pico de RSS em MB) do processo filho."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.DEVNULL,
+                            env=dict(os.environ, MPLBACKEND='Agg'))
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"Falha ao executar: {' '.join(cmd)}")
+    peak = usage.ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+    return elapsed, peak
+
+
+def max_abs_diff(ref_path, other_path):
+    diffs = [np.abs(np.load(os.path.join(ref_path, f'{n}.npy')).astype(np.float64)
+                    - np.load(os.path.join(other_path, f'{n}.npy'))).max()
+             for n in TABLES]
+    store = [np.fromfile(os.path.join(p, 'feature_store', 'features.f32'), dtype=np.float32)
+             for p in (ref_path, other_path)]
+    return max(diffs + [np.abs(store[0] - store[1]).max()])
+
+
+def split_summary(path):
+    with open(os.path.join(path, 'feature_store', 'manifest.json')) as f:
+        segments = json.load(f)['segments']
+    sizes = {name: stop - start for name, (start, stop) in segments.items()}
+    n_total = sum(sizes.values())
+    X_train = np.load(os.path.join(path, 'X_train_processed.npy'), mmap_mode='r')
+    return {
+        'treino_%': 100 * (sizes['train_normal'] + sizes['train_anomaly']) / n_total,
+        'val_%': 100 * sizes['val'] / n_total,
+        'teste_%': 100 * sizes['test'] / n_total,
+        'fraude_treino': np.load(os.path.join(path, 'y_train.npy')).mean(),
+        'fraude_teste': np.load(os.path.join(path, 'y_test.npy')).mean(),
+        'max|media|': float(np.abs(X_train.mean(axis=0)).max()),
+        'max|std-1|': float(np.abs(X_train.std(axis=0) - 1).max()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('raw_path', nargs='?', default='data/raw/creditcard.csv')
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    args = parser.parse_args()
+    raw_path = os.path.abspath(args.raw_path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # o preprocessing.py usa caminhos relativos a partir da raiz do projeto
+        os.makedirs(os.path.join(tmp, 'data', 'raw'))
+        os.symlink(raw_path, os.path.join(tmp, 'data', 'raw', 'creditcard.csv'))
+        ref_path = os.path.join(tmp, 'data', 'processed')
+
+        rows = []
+        seconds, peak = run([sys.executable, os.path.join(SRC, 'preprocessing.py')], tmp)
+        rows.append({'modo': 'em memória', 'tempo_s': seconds, 'pico_MB': peak,
+                     **split_summary(ref_path)})
+
+        for mode in ('exact', 'hash'):
+            out_path = os.path.join(tmp, f'stream_{mode}')
+            seconds, peak = run([sys.executable, os.path.join(SRC, 'preprocessing_streaming.py'),
+                                 '--input', raw_path, '--output', out_path,
+                                 '--chunksize', str(args.chunksize), '--split', mode], tmp)
+            row = {'modo': f'streaming ({mode})', 'tempo_s': seconds, 'pico_MB': peak,
+                   **split_summary(out_path)}
+            if mode == 'exact':
+                row['max_diff_vs_memoria'] = max_abs_diff(ref_path, out_path)
+            rows.append(row)
+
+    report = pd.DataFrame(rows).set_index('modo')
+    print(report.to_string(float_format=lambda v: f'{v:.4g}'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark da escolha de threshold (`thresholds.py`) contra o `precision_recall_curve`.
+
+Para cada tamanho em `--rows` (scores sintéticos na taxa de fraude do
+creditcard.csv), mede:
+
+* a regra antiga do gmm.py (`precision_recall_curve` + `argmin(|recall - alvo|)`);
+* a primeira chamada do `select_threshold` (ordenação + hash para o cache);
+* a troca de política sobre os mesmos scores (curva em cache), para cada
+  política de `POLICIES_TO_TIME`.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_thresholds.py [--rows 9000 1000000 10000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import precision_recall_curve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+import thresholds
+
+FRAUD_RATE = 0.00172
+# creditcard.csv: 284.807 transações em ~2 dias (daily_volume da coluna Time)
+TRANSACTIONS_PER_DAY = 142_404
+
+POLICIES_TO_TIME = [
+    {'name': 'target_recall', 'recall': 0.80},
+    {'name': 'target_precision', 'precision': 0.50},
+    {'name': 'alert_budget', 'alerts_per_day': 500, 'transactions_per_day': TRANSACTIONS_PER_DAY},
+    {'name': 'min_cost', 'fn_cost': 100, 'fp_cost': 1},
+]
+
+
+def old_rule(y_true, y_score, target_recall=0.80):
+    precision, recall, values = precision_recall_curve(y_true, y_score)
+    return values[np.abs(recall - target_recall).argmin()]
+
+
+def timed_ms(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[9_000, 1_000_000, 10_000_000])
+    args = parser.parse_args()
+
+    rows = []
+    for n_rows in args.rows:
+        rng = np.random.default_rng(0)
+        y_true = rng.random(n_rows) < FRAUD_RATE
+        y_score = rng.normal(size=n_rows) + 2.5 * y_true
+
+        row = {'linhas': n_rows}
+        _, row['precision_recall_curve (ms)'] = timed_ms(old_rule, y_true, y_score)
+        thresholds._curve_cache.clear()
+        _, row['1ª política (ms)'] = timed_ms(thresholds.select_threshold, y_true, y_score)
+        for policy in POLICIES_TO_TIME:
+            _, row[f"{policy['name']} em cache (ms)"] = timed_ms(
+                thresholds.select_threshold, y_true, y_score, policy)
+        rows.append(row)
+        print(f"{n_rows:>11,} linhas ok", flush=True)
+
+    print(pd.DataFrame(rows).set_index('linhas').T.to_string(float_format='{:,.2f}'.format))
+
+
+if __name__ == '__main__':
+    main()
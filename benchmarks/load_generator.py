@@ -0,0 +1,108 @@
+"""Gerador de carga para o servidor de pontuação (`src/serving.py`).
+
+Reenvia as linhas de `X_test_processed` (com os ids de `ids_test`) para o
+`POST /score` a partir de `--concurrency` clientes em paralelo, cada um com
+uma conexão keep-alive, e reporta a latência p50/p99 vista pelo cliente, as
+requisições/s e as métricas do próprio servidor (`GET /stats`).
+
+Como as linhas já estão normalizadas, o servidor deve ser iniciado com
+`--processed`:
+    python src/serving.py --models gmm --processed
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/load_generator.py [data_path] [--url http://127.0.0.1:8000]
+        [--concurrency 8] [--requests 5000] [--batch-size 1]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+from data_contract import load_table
+
+
+def build_payloads(data_path, n_requests, batch_size):
+    X = load_table(data_path, 'X_test_processed')
+    ids = load_table(data_path, 'ids_test')['id'].tolist()
+    columns = list(X.columns)
+    rows = X.to_numpy(dtype=np.float64).tolist()
+
+    payloads = []
+    for r in range(n_requests):
+        start = (r * batch_size) % len(rows)
+        batch = [dict(zip(columns, rows[i % len(rows)]), id=ids[i % len(rows)])
+                 for i in range(start, start + batch_size)]
+        payloads.append(json.dumps(batch[0] if batch_size == 1 else {'transactions': batch}))
+    return payloads
+
+
+def client(url, payloads, latencies, errors):
+    conn = http.client.HTTPConnection(url.hostname, url.port)
+    headers = {'Content-Type': 'application/json'}
+    for body in payloads:
+        start = time.perf_counter()
+        conn.request('POST', '/score', body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            errors.append(response.status)
+    conn.close()
+
+
+def get_stats(url):
+    conn = http.client.HTTPConnection(url.hostname, url.port)
+    conn.request('GET', '/stats')
+    stats = json.loads(conn.getresponse().read())
+    conn.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default='data/processed')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='transações por requisição')
+    args = parser.parse_args()
+    url = urlparse(args.url)
+
+    payloads = build_payloads(args.data_path, args.requests, args.batch_size)
+    latencies, errors = [], []
+    threads = [threading.Thread(target=client,
+                                args=(url, payloads[i::args.concurrency], latencies, errors))
+               for i in range(args.concurrency)]
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"\n{len(latencies)} requisições ({args.batch_size} transação(ões) cada), "
+          f"{args.concurrency} clientes, {elapsed:.2f}s, {len(errors)} erros")
+    print(f"Cliente:  {len(latencies) / elapsed:,.0f} req/s | "
+          f"{len(latencies) * args.batch_size / elapsed:,.0f} transações/s | "
+          f"p50 {p50:.2f} ms | p99 {p99:.2f} ms")
+
+    s = get_stats(url)
+    print(f"Servidor: {s['rps_recent']:,.0f} req/s (últimos segundos) | "
+          f"p50 {s['latency_p50_ms']:.2f} ms | p99 {s['latency_p99_ms']:.2f} ms | "
+          f"lote médio {s['mean_batch_transactions']:.1f} transações")
+
+
+if __name__ == '__main__':
+    main()
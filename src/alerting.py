@@ -0,0 +1,397 @@
+"""Alertas em streaming: taxa-alvo de alertas por janela, sem rótulos e com memória constante.
+
+Em produção não há rótulos para o `select_threshold`: a regra é "alertar as
+`TARGET_ALERT_RATE` transações de maior `anomaly_score`" (ex.: 0,2%) em um
+fluxo sem fim. Três peças:
+
+* `QuantileSketch`: sketch de quantis com buckets logarítmicos fixos (como o
+  DDSketch). Cada valor em [`min_value`, `max_value`] (em módulo) cai em um
+  bucket `ceil(log_γ |x|)`, e o quantil devolvido tem erro relativo <=
+  `relative_accuracy` no valor. O número de buckets é fixo, então a memória
+  não depende de quantos scores passaram. Como cada score sempre cai no mesmo
+  bucket, juntar os sketches de processos diferentes é somar contagens: o
+  `merge` dá exatamente o sketch de um processo único sobre todos os scores;
+* `TopK`: min-heap com os K maiores scores (e ids) de uma janela; também
+  pode ser juntado (os K maiores da união);
+* `AlertQueue`: aplica `is_anomaly = anomaly_score >= threshold`, com o
+  threshold no quantil `1 - target_rate` das últimas `history_windows`
+  janelas fechadas mais a janela atual. Ao fechar, cada janela (de
+  `window_rows` linhas ou `window_seconds` segundos) gera um resumo com a
+  taxa de alertas e os K maiores scores, a fila para os analistas. Antes de
+  `min_history` scores, vale o threshold do artefato (`initial_threshold`);
+  o threshold é recalculado a cada `THRESHOLD_REFRESH_ROWS` linhas.
+
+Uso (a partir da raiz do repositório), sobre predições no contrato de `outputs/`:
+    python src/alerting.py --input outputs/historico_gmm.csv [--rate 0.002]
+        [--window-rows 100000] [--top-k 200] [--model gmm]
+"""
+
+import argparse
+import heapq
+import math
+import os
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from artifacts import load_artifact
+from telemetry import RunTelemetry, peak_rss_mb
+
+OUTPUT_PATH = 'outputs'
+
+# Fração das transações de cada janela que vira alerta
+TARGET_ALERT_RATE = 0.002
+# Tamanho da janela em linhas (ou em segundos, com timestamps)
+WINDOW_ROWS = 100_000
+# Janelas fechadas usadas no threshold (adapta-se a drift nos scores)
+HISTORY_WINDOWS = 24
+# Scores necessários antes de trocar o threshold do artefato pelo do sketch
+MIN_HISTORY_ROWS = 10_000
+# Linhas de um lote pontuadas com o mesmo threshold antes de recalculá-lo
+THRESHOLD_REFRESH_ROWS = 10_000
+
+# Erro relativo máximo do quantil e faixa de |score| coberta pelos buckets;
+# fora da faixa, o valor é contado no bucket da borda
+SKETCH_RELATIVE_ACCURACY = 0.005
+SKETCH_MIN_VALUE = 1e-6
+SKETCH_MAX_VALUE = 1e9
+
+CHUNK_ROWS = 200_000
+
+
+# =========================================================
+# 1. SKETCH DE QUANTIS
+# =========================================================
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY, min_value=SKETCH_MIN_VALUE,
+                 max_value=SKETCH_MAX_VALUE):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_key = math.floor(math.log(min_value) / self.log_gamma)
+        self.max_key = math.ceil(math.log(max_value) / self.log_gamma)
+        n_buckets = self.max_key - self.min_key + 1
+        # contagens por bucket de |x|: positivos, negativos e |x| < min_value
+        self.positive = np.zeros(n_buckets, dtype=np.int64)
+        self.negative = np.zeros(n_buckets, dtype=np.int64)
+        self.zero = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def params(self):
+        return (self.relative_accuracy, self.min_value, self.max_value)
+
+    @property
+    def nbytes(self):
+        return self.positive.nbytes + self.negative.nbytes
+
+    def _bucket_counts(self, magnitudes):
+        keys = np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64)
+        np.clip(keys, self.min_key, self.max_key, out=keys)
+        return np.bincount(keys - self.min_key, minlength=len(self.positive))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        positive = values >= self.min_value
+        negative = values <= -self.min_value
+        if positive.any():
+            self.positive += self._bucket_counts(values[positive])
+        if negative.any():
+            self.negative += self._bucket_counts(-values[negative])
+        self.zero += int(len(values) - positive.sum() - negative.sum())
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        return self
+
+    def merge(self, other):
+        """Soma `other` a este sketch (mesmos parâmetros); o resultado não depende da ordem."""
+        if other.params != self.params:
+            raise ValueError(f"Sketches incompatíveis: {self.params} != {other.params}")
+        self.positive += other.positive
+        self.negative += other.negative
+        self.zero += other.zero
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def subtract(self, other):
+        """Remove `other`, que precisa ter sido somado antes (janela que saiu do histórico).
+
+        O min/max não é refeito: continua sendo um limite válido para o quantil.
+        """
+        self.positive -= other.positive
+        self.negative -= other.negative
+        self.zero -= other.zero
+        self.count -= other.count
+        return self
+
+    def copy(self):
+        sketch = QuantileSketch(*self.params)
+        return sketch.merge(self)
+
+    def state(self):
+        """Estado completo (arrays + contagens), para gravar ou comparar."""
+        return {'params': self.params, 'positive': self.positive, 'negative': self.negative,
+                'zero': self.zero, 'count': self.count, 'min': self.min, 'max': self.max}
+
+    def bucket_counts(self):
+        """Contagens de todos os buckets em ordem crescente de valor.
+
+        Negativos (do maior |x| ao menor), zero e positivos; o índice é o mesmo
+        para qualquer sketch com os mesmos parâmetros.
+        """
+        return np.concatenate([self.negative[::-1], [self.zero], self.positive])
+
+    def bucket_values(self, idx):
+        """Valor representativo dos buckets `idx` (índices de `bucket_counts`)."""
+        idx = np.asarray(idx)
+        n_buckets = len(self.positive)
+        keys = np.where(idx < n_buckets, self.max_key - idx, idx - n_buckets - 1 + self.min_key)
+        magnitude = 2 * self.gamma ** keys.astype(np.float64) / (self.gamma + 1)
+        return np.where(idx < n_buckets, -magnitude, np.where(idx == n_buckets, 0.0, magnitude))
+
+    def quantile(self, q):
+        """Quantil(is) `q` em [0, 1]; NaN se o sketch está vazio."""
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)[()]
+        idx = np.searchsorted(np.cumsum(self.bucket_counts()), q * (self.count - 1), side='right')
+        return np.clip(self.bucket_values(idx), self.min, self.max)[()]
+
+
+# =========================================================
+# 2. TOP-K POR JANELA
+# =========================================================
+
+class TopK:
+    """Os K maiores scores vistos, em um min-heap de (score, id)."""
+
+    def __init__(self, k):
+        self.k = k
+        self.heap = []
+
+    def push(self, ids, scores):
+        scores = np.asarray(scores, dtype=np.float64)
+        ids = np.asarray(ids)
+        if self.k <= 0 or not len(scores):
+            return self
+        # só os candidatos que podem entrar no heap passam pelo heapq
+        if len(self.heap) == self.k:
+            keep = np.flatnonzero(scores > self.heap[0][0])
+        else:
+            keep = np.arange(len(scores))
+        if len(keep) > self.k:
+            keep = keep[np.argpartition(scores[keep], -self.k)[-self.k:]]
+        for score, tx_id in zip(scores[keep].tolist(), ids[keep].tolist()):
+            if len(self.heap) < self.k:
+                heapq.heappush(self.heap, (score, tx_id))
+            elif score > self.heap[0][0]:
+                heapq.heapreplace(self.heap, (score, tx_id))
+        return self
+
+    def merge(self, other):
+        if other.heap:
+            ids, scores = zip(*[(tx_id, score) for score, tx_id in other.heap])
+            self.push(np.asarray(ids), np.asarray(scores))
+        return self
+
+    def items(self):
+        """[(id, score)] do maior para o menor score."""
+        return [(tx_id, score) for score, tx_id in sorted(self.heap, reverse=True)]
+
+
+# =========================================================
+# 3. FILA DE ALERTAS
+# =========================================================
+
+class AlertQueue:
+    def __init__(self, target_rate=TARGET_ALERT_RATE, window_rows=WINDOW_ROWS,
+                 window_seconds=None, top_k=None, history_windows=HISTORY_WINDOWS,
+                 min_history=MIN_HISTORY_ROWS, initial_threshold=None,
+                 relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        self.target_rate = target_rate
+        self.window_rows = window_rows
+        self.window_seconds = window_seconds
+        if top_k is None:
+            top_k = math.ceil(target_rate * window_rows) if window_seconds is None else 1000
+        self.top_k = top_k
+        self.min_history = min_history
+        self.initial_threshold = initial_threshold
+        self.relative_accuracy = relative_accuracy
+
+        self.history = deque(maxlen=history_windows)
+        self.history_sketch = QuantileSketch(relative_accuracy)
+        self.rows_seen = 0
+        self._closed = []
+        self._open_window(0)
+
+    def _open_window(self, window_id):
+        self.window_id = window_id
+        self.window_sketch = QuantileSketch(self.relative_accuracy)
+        self.window_top = TopK(self.top_k)
+        self.window_alerts = 0
+
+    def _close_window(self):
+        sketch = self.window_sketch
+        if sketch.count:
+            self._closed.append({
+                'window': self.window_id,
+                'rows': sketch.count,
+                'alerts': self.window_alerts,
+                'alert_rate': self.window_alerts / sketch.count,
+                'threshold': self.threshold(),
+                # threshold que teria dado exatamente a taxa-alvo nesta janela
+                'window_quantile': float(sketch.quantile(1 - self.target_rate)),
+                'top': self.window_top.items(),
+            })
+            if len(self.history) == self.history.maxlen:
+                self.history_sketch.subtract(self.history[0])
+            self.history.append(sketch)
+            self.history_sketch.merge(sketch)
+
+    def threshold(self):
+        """Quantil 1 - target_rate do histórico + janela atual (ou o threshold inicial)."""
+        n = self.history_sketch.count + self.window_sketch.count
+        if n < self.min_history:
+            return self.initial_threshold if self.initial_threshold is not None else math.inf
+        combined = self.history_sketch.copy().merge(self.window_sketch)
+        return float(combined.quantile(1 - self.target_rate))
+
+    def _window_ids(self, n, timestamps):
+        if timestamps is not None:
+            return np.floor_divide(np.asarray(timestamps, dtype=np.float64),
+                                   self.window_seconds).astype(np.int64)
+        return (self.rows_seen + np.arange(n)) // self.window_rows
+
+    def update(self, scores, ids=None, timestamps=None):
+        """is_anomaly (0/1) de um lote; os timestamps, se houver, não podem voltar no tempo."""
+        scores = np.asarray(scores, dtype=np.float64)
+        if ids is None:
+            ids = self.rows_seen + np.arange(len(scores))
+        ids = np.asarray(ids)
+        window_ids = self._window_ids(len(scores), timestamps)
+        is_anomaly = np.zeros(len(scores), dtype=int)
+
+        # trechos de uma só janela e de até THRESHOLD_REFRESH_ROWS linhas: o
+        # threshold é recalculado no início de cada trecho
+        cuts = np.union1d(np.flatnonzero(np.diff(window_ids)) + 1,
+                          np.arange(THRESHOLD_REFRESH_ROWS, len(scores), THRESHOLD_REFRESH_ROWS))
+        for start, stop in zip(np.r_[0, cuts], np.r_[cuts, len(scores)]):
+            if window_ids[start] != self.window_id:
+                self._close_window()
+                self._open_window(int(window_ids[start]))
+            segment = scores[start:stop]
+            flags = segment >= self.threshold()
+            is_anomaly[start:stop] = flags
+            self.window_alerts += int(flags.sum())
+            self.window_sketch.update(segment)
+            self.window_top.push(ids[start:stop], segment)
+        self.rows_seen += len(scores)
+        return is_anomaly
+
+    def flush(self):
+        """Fecha a janela atual (fim do fluxo)."""
+        self._close_window()
+        self._open_window(self.window_id + 1)
+
+    def pop_closed_windows(self):
+        """Resumos das janelas fechadas desde a última chamada."""
+        closed, self._closed = self._closed, []
+        return closed
+
+    @property
+    def nbytes(self):
+        """Memória dos sketches (constante: HISTORY_WINDOWS + 2 sketches)."""
+        return self.history_sketch.nbytes * (len(self.history) + 2)
+
+
+# =========================================================
+# 4. EXECUÇÃO PRINCIPAL
+# =========================================================
+
+def stream_alerts(input_path, output_path, windows_path, queue, chunk_rows=CHUNK_ROWS):
+    """Lê predições em blocos e grava o is_anomaly em streaming e os top-K de cada janela."""
+    rows = alerts = 0
+    with open(output_path, 'w', encoding='utf-8', newline='') as out, \
+            open(windows_path, 'w', encoding='utf-8', newline='') as windows_out:
+        windows_out.write('window,rank,id,anomaly_score,window_alert_rate,threshold\n')
+
+        def write_windows():
+            for window in queue.pop_closed_windows():
+                pd.DataFrame({
+                    'window': window['window'],
+                    'rank': np.arange(1, len(window['top']) + 1),
+                    'id': [tx_id for tx_id, _ in window['top']],
+                    'anomaly_score': [score for _, score in window['top']],
+                    'window_alert_rate': window['alert_rate'],
+                    'threshold': window['threshold'],
+                }).to_csv(windows_out, header=False, index=False)
+                print(f"Janela {window['window']}: {window['rows']:,} linhas | "
+                      f"{window['alert_rate']:.3%} alertas | threshold {window['threshold']:.6g}",
+                      flush=True)
+
+        for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunk_rows,
+                                              usecols=['id', 'anomaly_score'])):
+            is_anomaly = queue.update(chunk['anomaly_score'].to_numpy(), chunk['id'].to_numpy())
+            chunk['is_anomaly'] = is_anomaly
+            chunk.to_csv(out, header=i == 0, index=False)
+            rows += len(chunk)
+            alerts += int(is_anomaly.sum())
+            write_windows()
+        queue.flush()
+        write_windows()
+    return rows, alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--input', required=True,
+                        help='predições no contrato de outputs/ (id, anomaly_score, ...)')
+    parser.add_argument('--output', default=os.path.join(OUTPUT_PATH, 'alerts.csv'),
+                        help='id, anomaly_score, is_anomaly pela taxa-alvo')
+    parser.add_argument('--windows-output', default=os.path.join(OUTPUT_PATH, 'alert_windows.csv'),
+                        help='top-K de cada janela')
+    parser.add_argument('--rate', type=float, default=TARGET_ALERT_RATE)
+    parser.add_argument('--window-rows', type=int, default=WINDOW_ROWS)
+    parser.add_argument('--top-k', type=int, default=None,
+                        help='alertas guardados por janela (padrão: taxa x janela)')
+    parser.add_argument('--history-windows', type=int, default=HISTORY_WINDOWS)
+    parser.add_argument('--model', default=None,
+                        help='artefato cujo threshold vale até haver MIN_HISTORY_ROWS scores')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    initial_threshold = load_artifact(args.model)[0]['threshold'] if args.model else None
+    queue = AlertQueue(args.rate, args.window_rows, top_k=args.top_k,
+                       history_windows=args.history_windows, initial_threshold=initial_threshold)
+    run = RunTelemetry('alerting', OUTPUT_PATH, target_rate=args.rate,
+                       window_rows=args.window_rows, top_k=queue.top_k)
+
+    start = time.perf_counter()
+    with run.stage('score') as stage:
+        rows, alerts = stream_alerts(args.input, args.output, args.windows_output, queue,
+                                     args.chunk_rows)
+        stage.rows = rows
+    seconds = time.perf_counter() - start
+    run.finish(alerts=alerts)
+
+    print(f"\n{rows:,} linhas em {seconds:.1f}s ({rows / max(seconds, 1e-9):,.0f} linhas/s) | "
+          f"{alerts:,} alertas ({alerts / max(rows, 1):.3%}, alvo {args.rate:.3%})")
+    print(f"Sketches: {queue.nbytes / 1024:.0f} KB | pico de memória (RSS): {peak_rss_mb():.1f} MB")
+    print(f"-> {args.output}, {args.windows_output}")
+
+
+if __name__ == '__main__':
+    main()
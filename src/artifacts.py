@@ -0,0 +1,171 @@
+"""Artefatos versionados dos modelos (scaler, GMM, autoencoder, DBSCAN).
+
+Cada artefato é gravado em `artifacts/<nome>/<versão>/` com:
+
+* `arrays.npz` — parâmetros numéricos (médias, covariâncias, pesos, ...);
+* `manifest.json` — metadados: tipo, versão, data, hiperparâmetros, colunas,
+  threshold escolhido, métricas e versões das bibliotecas.
+
+O arquivo `artifacts/<nome>/LATEST` aponta para a versão mais recente, que é
+a usada por padrão pelos modos `--score-only` dos modelos.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+ARTIFACTS_PATH = 'artifacts'
+ARRAYS_FILE = 'arrays.npz'
+MANIFEST_FILE = 'manifest.json'
+LATEST_FILE = 'LATEST'
+
+
+# =========================================================
+# GRAVAÇÃO / LEITURA
+# =========================================================
+
+def _write_text(path, text):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def save_artifact(name, kind, arrays, metadata=None, root=ARTIFACTS_PATH):
+    """Grava uma nova versão do artefato e atualiza o LATEST. Retorna o caminho."""
+    import sklearn  # só para registrar a versão (a pontuação não importa o sklearn)
+    base = os.path.join(root, name)
+    version = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+    path = os.path.join(base, version)
+    suffix = 1
+    while os.path.exists(path):
+        path = os.path.join(base, f'{version}-{suffix}')
+        suffix += 1
+    version = os.path.basename(path)
+    os.makedirs(path)
+
+    np.savez(os.path.join(path, ARRAYS_FILE), **arrays)
+
+    manifest = {
+        'name': name,
+        'kind': kind,
+        'version': version,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'arrays': {key: {'dtype': np.asarray(value).dtype.str, 'shape': list(np.shape(value))}
+                   for key, value in arrays.items()},
+        'library_versions': {'numpy': np.__version__, 'scikit-learn': sklearn.__version__},
+        **(metadata or {}),
+    }
+    _write_text(os.path.join(path, MANIFEST_FILE), json.dumps(manifest, indent=2))
+    _write_text(os.path.join(base, LATEST_FILE), version)
+    return path
+
+
+def latest_version(name, root=ARTIFACTS_PATH):
+    """Versão apontada pelo LATEST (None se o artefato ainda não existe)."""
+    latest = os.path.join(root, name, LATEST_FILE)
+    if not os.path.exists(latest):
+        return None
+    with open(latest, 'r', encoding='utf-8') as f:
+        return f.read().strip()
+
+
+def load_artifact(name, version=None, root=ARTIFACTS_PATH):
+    """Carrega (manifest, arrays) de uma versão do artefato (padrão: LATEST)."""
+    base = os.path.join(root, name)
+    version = version or latest_version(name, root)
+    if version is None:
+        raise FileNotFoundError(
+            f"Nenhum artefato '{name}' em {root}/. Rode o treinamento antes do --score-only."
+        )
+
+    path = os.path.join(base, version)
+    with open(os.path.join(path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    with np.load(os.path.join(path, ARRAYS_FILE)) as npz:
+        arrays = {key: npz[key] for key in npz.files}
+    return manifest, arrays
+
+
+# =========================================================
+# SCALER (PRÉ-PROCESSAMENTO)
+# =========================================================
+
+def save_scaler(scaler, feature_columns, dropped_columns=('Time',), root=ARTIFACTS_PATH):
+    """Salva o StandardScaler ajustado no preprocessing."""
+    return save_artifact('scaler', 'standard_scaler', {
+        'mean': scaler.mean_,
+        'var': scaler.var_,
+        'scale': scaler.scale_,
+        'n_samples_seen': np.asarray(scaler.n_samples_seen_),
+    }, {
+        'feature_columns': [str(c) for c in feature_columns],
+        'dropped_columns': list(dropped_columns),
+    }, root=root)
+
+
+def scaler_from_artifact(manifest, arrays):
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler()
+    scaler.mean_ = arrays['mean']
+    scaler.var_ = arrays['var']
+    scaler.scale_ = arrays['scale']
+    scaler.n_samples_seen_ = arrays['n_samples_seen']
+    scaler.n_features_in_ = len(manifest['feature_columns'])
+    return scaler
+
+
+def load_scoring_input(input_path, processed=False, version=None, root=ARTIFACTS_PATH):
+    """Lê novas transações para pontuação: retorna (ids, X float32).
+
+    O CSV pode ter uma coluna `id` (senão, o número da linha é usado). Com
+    `processed=False` as features brutas são normalizadas com o scaler salvo;
+    com `processed=True` o arquivo já está no formato de `X_*_processed`.
+    A normalização é a do `StandardScaler.transform`, feita direto em NumPy
+    para que a pontuação não importe o scikit-learn.
+    """
+    manifest, arrays = load_artifact('scaler', version, root)
+    columns = manifest['feature_columns']
+
+    df = pd.read_csv(input_path)
+    ids = df['id'].to_numpy() if 'id' in df.columns else np.arange(len(df))
+    X = df[columns].to_numpy(dtype=np.float64)
+    if not processed:
+        X = (X - arrays['mean']) / arrays['scale']
+    return ids, X.astype(np.float32)
+
+
+def write_predictions(output_path, ids, scores, is_anomaly):
+    """Grava as predições no contrato de saída (id, anomaly_score, is_anomaly)."""
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    pd.DataFrame({
+        'id': ids,
+        'anomaly_score': scores,
+        'is_anomaly': is_anomaly
+    }).to_csv(output_path, index=False)
+
+
+def score_only_parser(description, default_output):
+    """Argumentos de linha de comando comuns aos modelos (treino ou --score-only)."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--score-only', action='store_true',
+                        help='pontua --input com o artefato salvo, sem retreinar')
+    parser.add_argument('--input', help='CSV com as transações a pontuar')
+    parser.add_argument('--output', default=default_output,
+                        help=f'CSV de predições do --score-only (padrão: {default_output})')
+    parser.add_argument('--processed', action='store_true',
+                        help='o --input já está normalizado (formato X_*_processed)')
+    parser.add_argument('--version', default=None,
+                        help='versão do artefato (padrão: LATEST)')
+    return parser
+
+
+def parse_score_only_args(parser):
+    args = parser.parse_args()
+    if args.score_only and not args.input:
+        parser.error('--score-only requer --input')
+    return args
@@ -0,0 +1,196 @@
+"""Kernel NumPy de pontuação do autoencoder (erro de reconstrução por amostra).
+
+Equivalente a `np.mean(np.square(X - model.predict(X)), axis=1)`, sem o
+TensorFlow. Na construção, os pesos treinados viram uma sequência de camadas
+densas prontas para o produto matricial:
+
+* o `Dropout` só atua no treino e é descartado;
+* cada `BatchNormalization` (estatísticas móveis, modo de inferência) é uma
+  transformação afim por feature, `h·g + c`, e é dobrada na `Dense` seguinte:
+  `W' = g[:, None]·W` e `b' = b + c @ W`;
+* a regularização L1 do gargalo não muda a saída e também some.
+
+A pontuação é feita em blocos de `SCORE_CHUNK_ROWS` linhas: cada bloco passa
+pelas camadas (operações in-place) e é reduzido direto ao MSE por linha, sem
+manter a matriz de reconstruções.
+
+`weights_dtype` escolhe como os pesos são guardados: `float32`, `float16` ou
+`int8` (quantização simétrica por coluna de saída, com uma escala float32 por
+neurônio). As contas são sempre feitas em `compute_dtype` (float32 por padrão):
+o NumPy não tem produto matricial rápido em float16/int8, então esses formatos
+reduzem o tamanho dos pesos e medem a perda de precisão da quantização, não o
+tempo. O erro relativo máximo contra o Keras fica abaixo de
+`TOLERANCE[weights_dtype]`.
+"""
+
+import numpy as np
+
+# Erro relativo máximo tolerado, |kernel - keras| / (1 + |keras|)
+TOLERANCE = {'float64': 1e-5, 'float32': 1e-5, 'float16': 1e-3, 'int8': 5e-2}
+
+# Linhas por bloco (limita a memória intermediária n x maior camada)
+SCORE_CHUNK_ROWS = 16_384
+
+# Épsilon padrão da BatchNormalization do Keras (artefatos sem `layers`)
+BATCH_NORM_EPSILON = 1e-3
+
+
+def _relu(h):
+    np.maximum(h, 0, out=h)
+
+def _sigmoid(h):
+    with np.errstate(over='ignore'):
+        np.negative(h, out=h)
+        np.exp(h, out=h)
+    h += 1
+    np.reciprocal(h, out=h)
+
+def _tanh(h):
+    np.tanh(h, out=h)
+
+ACTIVATIONS = {'relu': _relu, 'sigmoid': _sigmoid, 'tanh': _tanh, 'linear': None}
+
+
+def layer_spec(model):
+    """Descrição das camadas de um modelo Keras (tipo, ativação, épsilon), em JSON.
+
+    Só as camadas com pesos entram, na ordem do `model.get_weights()`.
+    """
+    spec = []
+    for layer in model.layers:
+        config = layer.get_config()
+        kind = type(layer).__name__
+        if kind == 'Dense':
+            spec.append({'type': 'dense', 'activation': config['activation']})
+        elif kind == 'BatchNormalization':
+            if not (config.get('center', True) and config.get('scale', True)):
+                raise ValueError("BatchNormalization sem center/scale não é suportada")
+            spec.append({'type': 'batch_normalization', 'epsilon': float(config['epsilon'])})
+        elif layer.get_weights():
+            raise ValueError(f"Camada não suportada pelo kernel: {kind}")
+    return spec
+
+def _infer_spec(weights):
+    """Camadas a partir só dos shapes (arquitetura do build_deep_autoencoder).
+
+    Matriz 2D + bias = Dense; quatro vetores seguidos = BatchNormalization.
+    Ativação relu nas camadas ocultas e sigmoid na saída.
+    """
+    spec = []
+    i = 0
+    while i < len(weights):
+        if np.ndim(weights[i]) == 2:
+            spec.append({'type': 'dense', 'activation': 'relu'})
+            i += 2
+        else:
+            spec.append({'type': 'batch_normalization', 'epsilon': BATCH_NORM_EPSILON})
+            i += 4
+    dense = [layer for layer in spec if layer['type'] == 'dense']
+    dense[-1]['activation'] = 'sigmoid'
+    return spec
+
+
+def fold_layers(spec, weights):
+    """Lista de (W, b, ativação) em float64, com as BatchNormalization dobradas."""
+    layers = []
+    pending = None  # (g, c) da última BatchNormalization, à espera da próxima Dense
+    weights = iter(weights)
+    for layer in spec:
+        if layer['type'] == 'dense':
+            W = np.asarray(next(weights), dtype=np.float64)
+            b = np.asarray(next(weights), dtype=np.float64)
+            if pending is not None:
+                g, c = pending
+                b = b + c @ W
+                W = g[:, None] * W
+                pending = None
+            layers.append((W, b, layer['activation']))
+        else:
+            gamma, beta, mean, var = (np.asarray(next(weights), dtype=np.float64)
+                                      for _ in range(4))
+            g = gamma / np.sqrt(var + layer['epsilon'])
+            c = beta - mean * g
+            if pending is not None:
+                g, c = pending[0] * g, pending[1] * g + c
+            pending = (g, c)
+    if pending is not None:
+        raise ValueError("BatchNormalization depois da última Dense não pode ser dobrada")
+    return layers
+
+
+def _quantize(W, weights_dtype):
+    """(pesos guardados, escala por coluna ou None)."""
+    if weights_dtype == 'int8':
+        scale = np.abs(W).max(axis=0) / 127
+        scale[scale == 0] = 1.0
+        return np.round(W / scale).astype(np.int8), scale.astype(np.float32)
+    return W.astype(weights_dtype), None
+
+
+class AutoencoderKernel:
+    def __init__(self, spec, weights, weights_dtype='float32', compute_dtype=np.float32):
+        if weights_dtype not in TOLERANCE:
+            raise ValueError(f"weights_dtype não suportado: {weights_dtype}")
+        self.weights_dtype = weights_dtype
+        self.dtype = np.dtype(np.float64 if weights_dtype == 'float64' else compute_dtype)
+        self.spec = spec
+
+        self.stored = []   # (W guardado, escala, b) no formato de weights_dtype
+        self.layers = []   # (W, b, ativação) em compute_dtype, usados no forward
+        for W, b, activation in fold_layers(spec, weights):
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Ativação não suportada pelo kernel: {activation}")
+            W_stored, scale = _quantize(W, weights_dtype)
+            self.stored.append((W_stored, scale, b.astype(np.float32)))
+            W = W_stored.astype(self.dtype)
+            if scale is not None:
+                W *= scale.astype(self.dtype)
+            self.layers.append((W, b.astype(self.dtype), ACTIVATIONS[activation]))
+        self.n_features = self.layers[0][0].shape[0]
+
+    @classmethod
+    def from_keras(cls, model, weights_dtype='float32', compute_dtype=np.float32):
+        return cls(layer_spec(model), model.get_weights(), weights_dtype, compute_dtype)
+
+    @classmethod
+    def from_artifact(cls, manifest, arrays, weights_dtype='float32', compute_dtype=np.float32):
+        weights = [arrays[f'w{i}'] for i in range(len(arrays))]
+        spec = manifest.get('layers') or _infer_spec(weights)
+        return cls(spec, weights, weights_dtype, compute_dtype)
+
+    @property
+    def weights_nbytes(self):
+        """Bytes dos pesos no formato guardado (matrizes, escalas e bias)."""
+        return sum(W.nbytes + (0 if scale is None else scale.nbytes) + b.nbytes
+                   for W, scale, b in self.stored)
+
+    def _score_block(self, X):
+        h = X
+        for W, b, activation in self.layers:
+            h = h @ W
+            h += b
+            if activation is not None:
+                activation(h)
+        h -= X
+        return np.einsum('ij,ij->i', h, h) / self.n_features
+
+    def score_samples(self, X):
+        """Erro de reconstrução (MSE) de cada linha."""
+        X = np.asarray(X, dtype=self.dtype)
+        if X.ndim == 1:
+            X = X[None, :]
+        if len(X) <= SCORE_CHUNK_ROWS:
+            return self._score_block(X)
+        out = np.empty(len(X), dtype=self.dtype)
+        for start in range(0, len(X), SCORE_CHUNK_ROWS):
+            stop = start + SCORE_CHUNK_ROWS
+            out[start:stop] = self._score_block(X[start:stop])
+        return out
+
+    def max_relative_error(self, model, X):
+        """Erro relativo máximo contra o MSE do `model.predict` do Keras."""
+        X = np.asarray(X, dtype=np.float32)
+        reference = np.mean(np.square(X - model.predict(X, verbose=0)), axis=1)
+        reference = reference.astype(np.float64)
+        diff = np.abs(self.score_samples(X).astype(np.float64) - reference)
+        return float((diff / (1 + np.abs(reference))).max())
@@ -0,0 +1,430 @@
+"""Pontuação em lote de arquivos de transações de qualquer tamanho.
+
+Pontua um CSV (formato do `creditcard.csv`, ou de `X_*_processed` com
+`--processed`) com o artefato salvo de um modelo, sem carregar o arquivo
+inteiro em memória:
+
+1. plano: o arquivo é dividido em blocos de ~`--chunk-rows` linhas por
+   posição em bytes (cada fronteira alinhada ao início de uma linha). Sem
+   coluna `id`, uma passada rápida conta as linhas de cada bloco para numerar
+   as transações como no `--score-only` (número da linha);
+2. pontuação: um pool de processos lê, normaliza (scaler do artefato),
+   pontua e aplica o threshold de cada bloco, gravando o resultado em um
+   arquivo de parte. No máximo `2 x --workers` blocos ficam em andamento;
+3. saída: com `--partitioned`, `--output` é uma pasta com uma parte por
+   bloco (`part-000000.csv`, ..., cada uma com cabeçalho) e um `_SUCCESS` ao
+   final. Sem ela, as partes são anexadas em ordem a um único CSV à medida
+   que ficam prontas.
+
+A saída segue o contrato de `outputs/` (`id, anomaly_score, is_anomaly`),
+igual à do `--score-only` do modelo.
+
+Retomada: o plano (blocos, versão do artefato, tamanho e data do arquivo de
+entrada) fica em `<output>.parts/plan.json`, ou em `<output>/plan.json` com
+`--partitioned`. Cada parte é gravada em um `.tmp` e renomeada ao final, e o
+CSV único guarda em `progress.json` quantos blocos e bytes já foram anexados.
+Rodar o mesmo comando de novo depois de uma interrupção pontua só os blocos
+que faltam, com a mesma versão do artefato. `--restart` descarta o progresso.
+
+Os blocos são lidos por fronteira de linha: campos com quebra de linha entre
+aspas não são suportados, o que não acontece no formato do creditcard.csv.
+
+Uso (a partir da raiz do repositório, depois de treinar o modelo):
+    python src/batch_scoring.py --model gmm --input historico.csv --output outputs/historico_gmm.csv
+        [--partitioned] [--workers N] [--chunk-rows 200000] [--processed] [--version V] [--restart]
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+from artifacts import load_artifact
+from telemetry import RunTelemetry, peak_rss_mb
+from thresholds import flag_anomalies
+
+OUTPUT_PATH = 'outputs'
+
+MODELS = ['gmm', 'dbscan', 'autoencoder', 'cascade']
+
+CHUNK_ROWS = 200_000      # Linhas por bloco (memória de cada processo)
+N_WORKERS = None          # None = todos os núcleos
+THREADS_PER_WORKER = 1    # Threads BLAS por processo (evita disputa entre processos)
+REPORT_EVERY_S = 5.0      # Intervalo do relatório de progresso
+
+# Bytes lidos por vez na contagem de linhas do plano
+COUNT_BLOCK_BYTES = 1 << 24
+# Linhas usadas para estimar os bytes por linha
+SAMPLE_LINES = 1000
+
+PLAN_FILE = 'plan.json'
+PROGRESS_FILE = 'progress.json'
+SUCCESS_FILE = '_SUCCESS'
+OUTPUT_COLUMNS = ['id', 'anomaly_score', 'is_anomaly']
+
+
+# =========================================================
+# 1. MODELOS
+# =========================================================
+
+def _gmm_scorer(version):
+    import gmm
+    from gmm_kernel import GMMKernel
+    manifest, arrays = load_artifact('gmm', version)
+    kernel = GMMKernel.from_artifact(manifest, arrays, gmm.SCORE_DTYPE)
+    return manifest, lambda X: -kernel.score_samples(X)
+
+def _dbscan_scorer(version):
+    import dbscan
+    manifest, arrays = load_artifact('dbscan', version)
+    return manifest, dbscan.DBSCANDetector.from_artifact(manifest, arrays).score
+
+def _autoencoder_scorer(version, scorer):
+    import autoencoder
+    return autoencoder.production_scorer(version, scorer)
+
+def _cascade_scorer(version):
+    import cascade
+    manifest, arrays = load_artifact('cascade', version)
+    detector = cascade.cascade_from_artifact(manifest, arrays)
+    return manifest, lambda X: detector.score(X)[0]
+
+# Nome do artefato -> função (versão) -> (manifest, X -> anomaly_score)
+ARTIFACT_SCORERS = {
+    'gmm': _gmm_scorer,
+    'dbscan': _dbscan_scorer,
+    'autoencoder': lambda version: _autoencoder_scorer(version, 'teacher'),
+    'autoencoder_student': lambda version: _autoencoder_scorer(version, 'student'),
+    'cascade': _cascade_scorer,
+}
+
+def resolve_artifact(model, version=None):
+    """(artefato, versão) que pontua o modelo; fixados no plano para a retomada.
+
+    No autoencoder, o PRODUCTION_SCORER pode escolher o aluno destilado.
+    """
+    if model == 'autoencoder':
+        import autoencoder
+        manifest, _ = autoencoder.production_scorer(version)
+    else:
+        manifest, _ = load_artifact(model, version)
+    return manifest['name'], manifest['version']
+
+
+# =========================================================
+# 2. PLANO (BLOCOS POR POSIÇÃO EM BYTES)
+# =========================================================
+
+def read_header(input_path):
+    """(colunas, posição em bytes do fim do cabeçalho)."""
+    with open(input_path, 'rb') as f:
+        line = f.readline()
+    return pd.read_csv(io.BytesIO(line), nrows=0).columns.tolist(), len(line)
+
+def _count_lines(f, start, stop):
+    f.seek(start)
+    count, remaining, last = 0, stop - start, b'\n'
+    while remaining > 0:
+        block = f.read(min(COUNT_BLOCK_BYTES, remaining))
+        if not block:
+            break
+        count += block.count(b'\n')
+        remaining -= len(block)
+        last = block[-1:]
+    # última linha do arquivo sem quebra de linha
+    return count + (last != b'\n')
+
+def plan_chunks(input_path, chunk_rows=CHUNK_ROWS, count_rows=True):
+    """Blocos (início, fim) em bytes e a primeira linha de cada bloco.
+
+    O tamanho do bloco em bytes vem da média de bytes por linha das primeiras
+    SAMPLE_LINES linhas. `count_rows=False` pula a contagem (arquivo com `id`).
+    """
+    _, data_start = read_header(input_path)
+    size = os.path.getsize(input_path)
+    with open(input_path, 'rb') as f:
+        f.seek(data_start)
+        sample = [f.readline() for _ in range(SAMPLE_LINES)]
+        sample = [line for line in sample if line]
+        line_bytes = sum(map(len, sample)) / max(len(sample), 1)
+        chunk_bytes = max(int(chunk_rows * line_bytes), 1)
+
+        boundaries = [data_start]
+        while boundaries[-1] + chunk_bytes < size:
+            f.seek(boundaries[-1] + chunk_bytes - 1)
+            f.readline()  # avança até o início da próxima linha
+            if f.tell() >= size:
+                break
+            boundaries.append(f.tell())
+        boundaries.append(size)
+
+        chunks = [[start, stop] for start, stop in zip(boundaries[:-1], boundaries[1:])
+                  if stop > start]
+        first_rows = None
+        if count_rows:
+            counts = [_count_lines(f, start, stop) for start, stop in chunks]
+            first_rows = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(int).tolist()
+    return chunks, first_rows
+
+def _write_json(path, payload):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_or_create_plan(work_dir, input_path, model, version, chunk_rows, processed, restart):
+    """Plano do trabalho: reaproveita o de uma execução interrompida, se for o mesmo."""
+    stat = os.stat(input_path)
+    job = {
+        'input': os.path.abspath(input_path),
+        'input_bytes': stat.st_size,
+        'input_mtime': stat.st_mtime,
+        'model': model,
+        'processed': processed,
+    }
+    plan_path = os.path.join(work_dir, PLAN_FILE)
+    if restart and os.path.exists(plan_path):
+        shutil.rmtree(work_dir)
+    if os.path.isdir(work_dir) and os.listdir(work_dir) and not os.path.exists(plan_path):
+        # nunca apaga nem mistura arquivos de uma pasta que não é deste comando
+        raise SystemExit(f"{work_dir} já existe e não é a saída de um batch_scoring.")
+    if os.path.exists(plan_path):
+        plan = _read_json(plan_path)
+        if {key: plan[key] for key in job} != job or (version and plan['version'] != version):
+            raise SystemExit(f"{work_dir} tem o progresso de outro trabalho (entrada, modelo ou "
+                             f"versão diferentes). Use --restart para descartá-lo.")
+        print(f"Retomando: plano de {plan['created_at']} ({plan['artifact']}/{plan['version']})")
+        return plan
+
+    artifact, version = resolve_artifact(model, version)
+    columns, _ = read_header(input_path)
+    chunks, first_rows = plan_chunks(input_path, chunk_rows, count_rows='id' not in columns)
+    plan = {
+        **job,
+        'artifact': artifact,
+        'version': version,
+        'chunk_rows': chunk_rows,
+        'chunks': chunks,
+        'first_rows': first_rows,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+    os.makedirs(work_dir, exist_ok=True)
+    _write_json(plan_path, plan)
+    return plan
+
+
+# =========================================================
+# 3. PONTUAÇÃO EM PARALELO
+# =========================================================
+
+_worker = None
+
+def _init_worker(plan, scaler_arrays, feature_columns, n_threads):
+    global _worker
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=n_threads)
+    manifest, score = ARTIFACT_SCORERS[plan['artifact']](plan['version'])
+    columns, _ = read_header(plan['input'])
+    _worker = {
+        'plan': plan, 'manifest': manifest, 'score': score, 'columns': columns,
+        'feature_columns': feature_columns, 'scaler': scaler_arrays,
+    }
+
+def part_path(work_dir, index):
+    return os.path.join(work_dir, f'part-{index:06d}.csv')
+
+def _score_chunk(index, work_dir, header):
+    """Pontua o bloco `index` e grava a parte; retorna (índice, linhas, anomalias)."""
+    w = _worker
+    plan = w['plan']
+    start, stop = plan['chunks'][index]
+    with open(plan['input'], 'rb') as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    usecols = w['feature_columns'] + (['id'] if 'id' in w['columns'] else [])
+    df = pd.read_csv(io.BytesIO(data), header=None, names=w['columns'], usecols=usecols)
+    del data
+
+    if 'id' in df.columns:
+        ids = df['id'].to_numpy()
+    else:
+        first = plan['first_rows'][index]
+        ids = np.arange(first, first + len(df))
+    X = df[w['feature_columns']].to_numpy(dtype=np.float64)
+    if not plan['processed']:
+        X = (X - w['scaler']['mean']) / w['scaler']['scale']
+    scores = w['score'](X.astype(np.float32))
+    is_anomaly = flag_anomalies(scores, w['manifest'])
+
+    path = part_path(work_dir, index)
+    pd.DataFrame({'id': ids, 'anomaly_score': scores, 'is_anomaly': is_anomaly}).to_csv(
+        path + '.tmp', header=header, index=False)
+    os.replace(path + '.tmp', path)
+    return index, len(ids), int(is_anomaly.sum())
+
+
+class OrderedMerger:
+    """Anexa as partes ao CSV único na ordem dos blocos, à medida que ficam prontas."""
+
+    def __init__(self, output_path, work_dir, n_chunks):
+        self.output_path = output_path
+        self.work_dir = work_dir
+        self.n_chunks = n_chunks
+        self.progress_path = os.path.join(work_dir, PROGRESS_FILE)
+        progress = (_read_json(self.progress_path) if os.path.exists(self.progress_path)
+                    else {'merged_chunks': 0, 'output_bytes': None})
+        self.next_index = progress['merged_chunks']
+
+        if progress['output_bytes'] is None:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(','.join(OUTPUT_COLUMNS) + '\n')
+            self._save_progress()
+        else:
+            # descarta o que foi anexado depois do último progresso salvo
+            with open(output_path, 'r+b') as f:
+                f.truncate(progress['output_bytes'])
+
+    def _save_progress(self):
+        _write_json(self.progress_path, {'merged_chunks': self.next_index,
+                                         'output_bytes': os.path.getsize(self.output_path)})
+
+    def merge_ready(self):
+        with open(self.output_path, 'ab') as out:
+            while (self.next_index < self.n_chunks
+                   and os.path.exists(part_path(self.work_dir, self.next_index))):
+                part = part_path(self.work_dir, self.next_index)
+                with open(part, 'rb') as f:
+                    shutil.copyfileobj(f, out, 1 << 20)
+                out.flush()
+                self.next_index += 1
+                self._save_progress()
+                os.remove(part)
+
+    def pending(self):
+        """Blocos que ainda precisam ser pontuados."""
+        return [i for i in range(self.next_index, self.n_chunks)
+                if not os.path.exists(part_path(self.work_dir, i))]
+
+
+def score_file(input_path, output_path, model, partitioned=False, n_workers=N_WORKERS,
+               chunk_rows=CHUNK_ROWS, processed=False, version=None, restart=False):
+    """Pontua `input_path` em blocos paralelos; retorna (linhas, anomalias, segundos)."""
+    work_dir = output_path if partitioned else output_path + '.parts'
+    run = RunTelemetry('batch_scoring', OUTPUT_PATH, mode='partitioned' if partitioned else 'ordered',
+                       model=model)
+
+    with run.stage('plan'):
+        if restart and not partitioned and os.path.exists(output_path):
+            os.remove(output_path)
+        plan = load_or_create_plan(work_dir, input_path, model, version, chunk_rows,
+                                   processed, restart)
+    n_chunks = len(plan['chunks'])
+
+    artifact_manifest, _ = load_artifact(plan['artifact'], plan['version'])
+    scaler_manifest, scaler_arrays = load_artifact(
+        'scaler', artifact_manifest.get('scaler_version'))
+    feature_columns = scaler_manifest['feature_columns']
+
+    if partitioned:
+        merger = None
+        pending = [i for i in range(n_chunks) if not os.path.exists(part_path(work_dir, i))]
+    else:
+        merger = OrderedMerger(output_path, work_dir, n_chunks)
+        merger.merge_ready()
+        pending = merger.pending()
+
+    n_workers = n_workers or os.cpu_count()
+    print(f"{plan['artifact']}/{plan['version']} | {n_chunks} blocos "
+          f"({n_chunks - len(pending)} já prontos) | {n_workers} processo(s)")
+
+    start = time.perf_counter()
+    last_report = start
+    rows = anomalies = done = 0
+    with run.stage('score') as stage:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(plan, scaler_arrays, feature_columns,
+                                           THREADS_PER_WORKER)) as executor:
+            queue = iter(pending)
+            running = set()
+            while True:
+                # no máximo 2 blocos por processo em andamento
+                for index in queue:
+                    running.add(executor.submit(_score_chunk, index, work_dir, partitioned))
+                    if len(running) >= 2 * n_workers:
+                        break
+                if not running:
+                    break
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    _, n_rows, n_anomalies = future.result()
+                    rows += n_rows
+                    anomalies += n_anomalies
+                    done += 1
+                if merger is not None:
+                    merger.merge_ready()
+
+                now = time.perf_counter()
+                if now - last_report >= REPORT_EVERY_S or not running:
+                    print(f"[{n_chunks - len(pending) + done}/{n_chunks}] {rows:,} linhas | "
+                          f"{rows / (now - start):,.0f} linhas/s | {anomalies:,} anomalias",
+                          flush=True)
+                    last_report = now
+        stage.rows = rows
+    seconds = time.perf_counter() - start
+
+    with run.stage('finish'):
+        if partitioned:
+            with open(os.path.join(work_dir, SUCCESS_FILE), 'w', encoding='utf-8'):
+                pass
+        else:
+            shutil.rmtree(work_dir)
+    run.finish(artifact=plan['artifact'], artifact_version=plan['version'], n_chunks=n_chunks,
+               n_workers=n_workers, anomalies=anomalies)
+    return rows, anomalies, seconds
+
+
+# =========================================================
+# 4. EXECUÇÃO PRINCIPAL
+# =========================================================
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', choices=MODELS, required=True)
+    parser.add_argument('--input', required=True, help='CSV com as transações a pontuar')
+    parser.add_argument('--output', required=True,
+                        help='CSV de predições (ou pasta, com --partitioned)')
+    parser.add_argument('--partitioned', action='store_true',
+                        help='uma parte por bloco em --output, em vez de um CSV único')
+    parser.add_argument('--workers', type=int, default=N_WORKERS,
+                        help='processos de pontuação (padrão: todos os núcleos)')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--processed', action='store_true',
+                        help='o --input já está normalizado (formato X_*_processed)')
+    parser.add_argument('--version', default=None, help='versão do artefato (padrão: LATEST)')
+    parser.add_argument('--restart', action='store_true',
+                        help='descarta o progresso de uma execução interrompida')
+    args = parser.parse_args()
+
+    rows, anomalies, seconds = score_file(
+        args.input, args.output, args.model, args.partitioned, args.workers,
+        args.chunk_rows, args.processed, args.version, args.restart
+    )
+    print(f"\n{rows:,} linhas pontuadas em {seconds:.1f}s "
+          f"({rows / max(seconds, 1e-9):,.0f} linhas/s, {anomalies:,} anomalias) -> {args.output}")
+    print(f"Pico de memória (RSS): {peak_rss_mb():.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
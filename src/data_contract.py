@@ -0,0 +1,173 @@
+"""Contrato de dados de `data/processed/`.
+
+Cada tabela do contrato (X_train_processed, X_test_processed, y_train, y_test,
+ids_test) é gravada em dois formatos:
+
+* CSV (`<nome>.csv`) — formato original, legível e usado como fallback;
+* binário (`<nome>.npy`) — array NumPy tipado (features em float32), descrito
+  no arquivo `schema.json` (colunas, dtype e shape de cada tabela).
+
+Os loaders preferem o binário quando ele existe e está descrito no schema;
+caso contrário, leem o CSV normalmente.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+SCHEMA_FILE = 'schema.json'
+SCHEMA_VERSION = 1
+
+# dtype binário padrão de cada tabela do contrato
+TABLE_DTYPES = {
+    'X_train_processed': 'float32',
+    'X_test_processed': 'float32',
+    'y_train': 'int8',
+    'y_test': 'int8',
+    'ids_test': 'int64',
+}
+
+
+# =========================================================
+# SCHEMA
+# =========================================================
+
+def read_schema(data_path):
+    """Lê o schema.json da pasta (retorna um schema vazio se não existir)."""
+    path = os.path.join(data_path, SCHEMA_FILE)
+    if not os.path.exists(path):
+        return {'version': SCHEMA_VERSION, 'tables': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_schema(data_path, schema):
+    path = os.path.join(data_path, SCHEMA_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(schema, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# =========================================================
+# ESCRITA
+# =========================================================
+
+def save_table(data, data_path, name, dtype=None, write_csv=True):
+    """Salva uma tabela do contrato em CSV e em .npy tipado + schema.
+
+    `data` pode ser um DataFrame ou uma Series. Tabelas não numéricas (ex.: ids
+    em texto) são gravadas apenas em CSV.
+    """
+    df = data.to_frame() if isinstance(data, pd.Series) else data
+    os.makedirs(data_path, exist_ok=True)
+
+    if write_csv:
+        df.to_csv(os.path.join(data_path, f'{name}.csv'), index=False)
+
+    if dtype is None:
+        dtype = TABLE_DTYPES.get(name)
+    if dtype is None:
+        if not all(pd.api.types.is_numeric_dtype(t) for t in df.dtypes):
+            return
+        dtype = np.result_type(*df.dtypes)
+
+    values = np.ascontiguousarray(df.to_numpy(dtype=dtype))
+    np.save(os.path.join(data_path, f'{name}.npy'), values)
+    register_table(data_path, name, df.columns, values)
+
+
+def register_table(data_path, name, columns, values):
+    """Registra (ou atualiza) a entrada da tabela no schema.json."""
+    schema = read_schema(data_path)
+    schema['tables'][name] = {
+        'file': f'{name}.npy',
+        'dtype': values.dtype.str,
+        'shape': list(values.shape),
+        'columns': [str(c) for c in columns],
+    }
+    _write_schema(data_path, schema)
+
+
+def set_artifact_version(data_path, name, version):
+    """Registra no schema a versão do artefato (ex.: scaler) que gerou os dados."""
+    schema = read_schema(data_path)
+    schema.setdefault('artifacts', {})[name] = version
+    _write_schema(data_path, schema)
+
+
+def create_table(data_path, name, columns, n_rows, dtype=None):
+    """Cria o .npy da tabela como memmap gravável, para escrita em blocos.
+
+    Depois de preenchido, o array deve ser registrado com `register_table`
+    (e, se necessário, exportado para CSV com `export_csv`).
+    """
+    os.makedirs(data_path, exist_ok=True)
+    dtype = np.dtype(dtype or TABLE_DTYPES[name])
+    path = os.path.join(data_path, f'{name}.npy')
+    # int(): com um np.int64, o NumPy 2 grava 'np.int64(N)' no cabeçalho e o
+    # np.load não consegue mais ler o arquivo
+    table = np.lib.format.open_memmap(path, mode='w+', dtype=dtype,
+                                      shape=(int(n_rows), len(columns)))
+    # confere que o arquivo recém-criado pode ser relido do disco
+    reloaded = np.load(path, mmap_mode='r')
+    if reloaded.shape != table.shape or reloaded.dtype != table.dtype:
+        raise ValueError(f"Tabela '{name}' relida com {reloaded.dtype}{reloaded.shape}, "
+                         f"esperado {table.dtype}{table.shape}")
+    del reloaded
+    return table
+
+
+def export_csv(data_path, name, chunk_rows=100_000):
+    """Gera o CSV da tabela a partir do binário, bloco a bloco."""
+    entry = binary_entry(data_path, name)
+    values = np.load(os.path.join(data_path, entry['file']), mmap_mode='r')
+    with open(os.path.join(data_path, f'{name}.csv'), 'w', newline='') as f:
+        pd.DataFrame(columns=entry['columns']).to_csv(f, index=False)
+        for start in range(0, len(values), chunk_rows):
+            block = pd.DataFrame(values[start:start + chunk_rows], columns=entry['columns'])
+            block.to_csv(f, header=False, index=False)
+
+
+# =========================================================
+# LEITURA
+# =========================================================
+
+def binary_entry(data_path, name):
+    """Retorna a entrada do schema se o binário da tabela estiver disponível."""
+    entry = read_schema(data_path)['tables'].get(name)
+    if entry is None or not os.path.exists(os.path.join(data_path, entry['file'])):
+        return None
+    return entry
+
+
+def artifact_version(data_path, name):
+    """Versão do artefato registrada com os dados (None se não houver)."""
+    return read_schema(data_path).get('artifacts', {}).get(name)
+
+
+def table_exists(data_path, name):
+    """Indica se a tabela existe em algum dos formatos do contrato."""
+    return (binary_entry(data_path, name) is not None
+            or os.path.exists(os.path.join(data_path, f'{name}.csv')))
+
+
+def load_table(data_path, name, prefer_binary=True):
+    """Carrega uma tabela do contrato como DataFrame.
+
+    Usa o .npy descrito no schema quando disponível e cai para o CSV caso
+    contrário. Levanta FileNotFoundError se nenhum dos dois existir.
+    """
+    entry = binary_entry(data_path, name) if prefer_binary else None
+    if entry is None:
+        return pd.read_csv(os.path.join(data_path, f'{name}.csv'))
+
+    values = np.load(os.path.join(data_path, entry['file']))
+    if list(values.shape) != entry['shape'] or values.dtype.str != entry['dtype']:
+        raise ValueError(
+            f"Arquivo binário de '{name}' não confere com o schema: "
+            f"{values.dtype.str}{list(values.shape)} != {entry['dtype']}{entry['shape']}"
+        )
+    return pd.DataFrame(values, columns=entry['columns'])
@@ -7,61 +7,117 @@ Original file is located at
     https://colab.research.google.com/drive/1kh_qBcMOINe4SAvP2c5VeSBJAqNYS6XZ
 """
 
+import os
+
 import pandas as pd
-import matplotlib.pyplot as plt
-from sklearn.metrics import ( precision_score, recall_score, f1_score,
-                              roc_auc_score, average_precision_score, confusion_matrix)
 
+from data_contract import load_table
+from metrics import evaluate
+from telemetry import RunTelemetry
+
+# Caminhos relativos à raiz do repositório (como nos scripts dos modelos)
+DATA_PATH = "data/processed"
+OUTPUT_PATH = "outputs"
 
+# Bootstrap dos intervalos de confiança (0 desativa; None = todos os núcleos)
+N_BOOTSTRAP = 1000
+BOOTSTRAP_SEED = 42
+N_WORKERS = None
 
-gmm = pd.read_csv("../outputs/gmm_predictions.csv")
-dbscan = pd.read_csv("../outputs/dbscan_predictions.csv")
-ae = pd.read_csv("../outputs/autoencoder_predictions.csv")
+MODELS = {"GMM": "gmm", "DBSCAN": "dbscan", "Autoencoder": "autoencoder"}
+METRICS_TO_PLOT = ["Precision", "Recall", "F1-score", "ROC-AUC", "PR-AUC"]
 
-# ground truth
-y_test = pd.read_csv("../data/processed/y_test.csv")
-ids_test = pd.read_csv("../data/processed/ids_test.csv")
 
 def evaluate_model(pred_df, y_df, model_name):
 
     df = pred_df.merge(y_df, on="id", how="inner")
-    y_true = df["Class"].astype(int)
-    y_pred = df["is_anomaly"].astype(int)
-    y_score = df["anomaly_score"].astype(float)
+    y_true = df["Class"].to_numpy(dtype=int)
+    y_pred = df["is_anomaly"].to_numpy(dtype=int)
+    y_score = df["anomaly_score"].to_numpy(dtype=float)
 
+    # Uma única ordenação dos scores por modelo (ROC-AUC, PR-AUC e bootstrap)
     return {
         "Modelo": model_name,
-        "Precision": precision_score(y_true, y_pred, zero_division=0),
-        "Recall": recall_score(y_true, y_pred, zero_division=0),
-        "F1-score": f1_score(y_true, y_pred, zero_division=0),
-        "ROC-AUC": roc_auc_score(y_true, y_score),
-        "PR-AUC": average_precision_score(y_true, y_score),
-        "TN_FP_FN_TP": confusion_matrix(y_true, y_pred).ravel().tolist()
+        **evaluate(y_true, y_score, y_pred, n_bootstrap=N_BOOTSTRAP,
+                   seed=BOOTSTRAP_SEED, n_workers=N_WORKERS)
     }
 
-results = []
 
-results.append(evaluate_model(gmm, y_test, "GMM"))
-results.append(evaluate_model(dbscan, y_test, "DBSCAN"))
-results.append(evaluate_model(ae, y_test, "Autoencoder"))
+def load_ground_truth(data_path=DATA_PATH):
+    # ground truth (binário .npy se disponível, senão CSV)
+    y_test = load_table(data_path, "y_test")
+    ids_test = load_table(data_path, "ids_test")
+    return pd.DataFrame({"id": ids_test["id"], "Class": y_test["Class"]})
 
-results_df = pd.DataFrame(results)
-results_df
 
-metrics_to_plot = ["Precision", "Recall", "F1-score", "ROC-AUC", "PR-AUC"]
+def load_predictions(output_path=OUTPUT_PATH, models=MODELS):
+    """{nome do modelo: DataFrame de `<modelo>_predictions.csv`}."""
+    return {
+        model_name: pd.read_csv(os.path.join(output_path, f"{prefix}_predictions.csv"))
+        for model_name, prefix in models.items()
+    }
 
-results_df.set_index("Modelo")[metrics_to_plot].plot(
-    kind="bar",
-    figsize=(10, 6)
-)
 
-plt.title("Comparação de Métricas entre Modelos")
-plt.ylabel("Score")
-plt.ylim(0, 1)
-plt.legend(title="Métrica")
-plt.grid(axis="y", linestyle="--", alpha=0.6)
-plt.tight_layout()
-plt.show()
+def plot_metrics(results_df, metrics_to_plot=METRICS_TO_PLOT):
+    # matplotlib só é importado aqui: importar o módulo não abre backend gráfico
+    import matplotlib.pyplot as plt
+
+    plot_df = results_df.set_index("Modelo")
+
+    # Barras de erro com o intervalo de confiança do bootstrap
+    yerr = None
+    if f"{metrics_to_plot[0]} IC" in plot_df.columns:
+        yerr = [[[row[m] - row[f"{m} IC"][0] for _, row in plot_df.iterrows()],
+                 [row[f"{m} IC"][1] - row[m] for _, row in plot_df.iterrows()]]
+                for m in metrics_to_plot]
+
+    plot_df[metrics_to_plot].plot(
+        kind="bar",
+        figsize=(10, 6),
+        yerr=yerr,
+        capsize=3
+    )
+
+    plt.title("Comparação de Métricas entre Modelos")
+    plt.ylabel("Score")
+    plt.ylim(0, 1)
+    plt.legend(title="Métrica")
+    plt.grid(axis="y", linestyle="--", alpha=0.6)
+    plt.tight_layout()
+    plt.show()
+
+
+def main():
+    run = RunTelemetry("evaluation", OUTPUT_PATH, n_bootstrap=N_BOOTSTRAP)
+    with run.stage("load") as stage:
+        predictions = load_predictions(OUTPUT_PATH)
+        y_test = load_ground_truth(DATA_PATH)
+        n_rows = sum(len(pred_df) for pred_df in predictions.values())
+        stage.rows = n_rows
+
+    with run.stage("score", rows=n_rows):
+        results = [evaluate_model(pred_df, y_test, model_name)
+                   for model_name, pred_df in predictions.items()]
+
+    results_df = pd.DataFrame(results)
+    ci_columns = [c for c in results_df.columns if c.endswith(" IC")]
+    print(results_df.to_string(
+        index=False,
+        float_format="{:.4f}".format,
+        formatters={c: "[{0[0]:.4f}, {0[1]:.4f}]".format for c in ci_columns}
+    ))
+
+    metrics_path = os.path.join(OUTPUT_PATH, "evaluation_metrics.csv")
+    with run.stage("write", rows=len(results_df)):
+        results_df.to_csv(metrics_path, index=False)
+    print(f"\nMétricas salvas em: {metrics_path}")
+    run.finish()
+
+    plot_metrics(results_df)
+
+
+if __name__ == "__main__":
+    main()
 
 """## Análise e Comparação de Resultados
 
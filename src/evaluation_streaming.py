@@ -0,0 +1,306 @@
+"""Avaliação em streaming (em blocos) das predições dos modelos.
+
+Versão do `evaluation.py` para arquivos de predições que não cabem em memória.
+Em vez de carregar cada `<modelo>_predictions.csv` e fazer o merge com o
+`y_test`, os arquivos são lidos em blocos:
+
+1. rótulos: `ids_test` e `y_test` são lidos em blocos (memmap do .npy, ou CSV)
+   e viram dois bitsets indexados pelo id (1 bit por id): ids do teste e ids
+   das fraudes;
+2. histogramas: os arquivos de predições de todos os modelos são divididos em
+   blocos por posição em bytes (como no `batch_scoring.py`) e pontuados em um
+   pool de processos. Cada bloco gera um histograma dos `anomaly_score`
+   separado por classe, com os buckets logarítmicos fixos do `QuantileSketch`
+   (`alerting.py`), e as contagens TN/FP/FN/TP do `is_anomaly`. Os
+   histogramas dos blocos de um modelo são somados, com o mesmo resultado em
+   qualquer ordem e número de processos;
+3. métricas: cada bin vira um grupo de scores empatados em
+   `RankedScores.from_counts`, e ROC-AUC, PR-AUC e o bootstrap saem das mesmas
+   funções do `metrics.py`. Precision, recall e F1 vêm das contagens do
+   `is_anomaly`, exatas.
+
+A memória não depende do número de linhas: ~2 x 2 x `n_bins` contagens por
+modelo (`--relative-accuracy` define a largura relativa dos bins e, portanto,
+o número de bins). O único erro é a ordem dentro de cada bin, que se perde;
+para cada modelo também são calculados os limites da ROC-AUC e da PR-AUC com
+as fraudes de cada bin antes (limite superior) e depois (limite inferior) dos
+normais. O valor exato do `evaluation.py` sempre fica entre os dois, e bins
+mais estreitos fecham o intervalo.
+
+Como no merge do `evaluation.py` (inner join por `id`), as predições com id
+fora do `ids_test` são descartadas.
+
+Uso (a partir da raiz do repositório):
+    python src/evaluation_streaming.py [--output-path outputs] [--data-path data/processed]
+        [--relative-accuracy 1e-4] [--chunk-rows 1000000] [--workers N]
+"""
+
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from alerting import QuantileSketch
+from batch_scoring import plan_chunks, read_header
+from data_contract import binary_entry
+from evaluation import BOOTSTRAP_SEED, DATA_PATH, MODELS, N_BOOTSTRAP, OUTPUT_PATH, plot_metrics
+from metrics import RankedScores, evaluate_ranked
+from telemetry import RunTelemetry, peak_rss_mb
+
+# Largura relativa dos bins de score (erro relativo máximo do valor do bin)
+HISTOGRAM_RELATIVE_ACCURACY = 1e-4
+CHUNK_ROWS = 1_000_000   # Linhas de predições por tarefa do pool
+LABEL_CHUNK_ROWS = 1_000_000
+N_WORKERS = None         # None = todos os núcleos
+
+METRICS_FILE = "evaluation_metrics_streaming.csv"
+
+
+# =========================================================
+# 1. HISTOGRAMA POR CLASSE
+# =========================================================
+
+class ScoreHistogram:
+    """Contagens de normais e de fraudes por bin de score."""
+
+    def __init__(self, relative_accuracy=HISTOGRAM_RELATIVE_ACCURACY):
+        self.normal = QuantileSketch(relative_accuracy)
+        self.fraud = QuantileSketch(relative_accuracy)
+
+    @property
+    def n_bins(self):
+        return len(self.normal.bucket_counts())
+
+    def update(self, y_true, y_score):
+        y_true = np.asarray(y_true).astype(bool)
+        y_score = np.asarray(y_score, dtype=np.float64)
+        self.normal.update(y_score[~y_true])
+        self.fraud.update(y_score[y_true])
+        return self
+
+    def merge(self, other):
+        self.normal.merge(other.normal)
+        self.fraud.merge(other.fraud)
+        return self
+
+    def counts(self):
+        """(fraudes, normais) dos bins ocupados, do maior score ao menor."""
+        pos = self.fraud.bucket_counts()[::-1]
+        neg = self.normal.bucket_counts()[::-1]
+        used = (pos + neg) > 0
+        return pos[used], neg[used]
+
+    def ranked(self):
+        return RankedScores.from_counts(*self.counts())
+
+    def curve_bounds(self):
+        """((ROC-AUC mín., máx.), (PR-AUC mín., máx.)) sobre as ordens possíveis dentro dos bins."""
+        pos, neg = self.counts()
+        zeros = np.zeros_like(pos)
+        # cada bin vira dois grupos: fraudes antes dos normais (melhor caso) ou depois (pior)
+        best = RankedScores.from_counts(np.ravel([pos, zeros], 'F'), np.ravel([zeros, neg], 'F'))
+        worst = RankedScores.from_counts(np.ravel([zeros, pos], 'F'), np.ravel([neg, zeros], 'F'))
+        (roc_low, pr_low), (roc_high, pr_high) = worst.curve_metrics(), best.curve_metrics()
+        return (roc_low, roc_high), (pr_low, pr_high)
+
+
+# =========================================================
+# 2. LEITURA EM BLOCOS
+# =========================================================
+
+def _label_chunks(data_path, name, chunk_rows=LABEL_CHUNK_ROWS):
+    """Blocos (arrays 1D) de uma tabela de uma coluna do contrato (.npy ou CSV)."""
+    entry = binary_entry(data_path, name)
+    if entry is not None:
+        # leitura com fromfile (sem memmap, as páginas lidas não ficam no RSS)
+        with open(os.path.join(data_path, entry['file']), 'rb') as f:
+            read_header = (np.lib.format.read_array_header_1_0
+                           if np.lib.format.read_magic(f) == (1, 0)
+                           else np.lib.format.read_array_header_2_0)
+            shape, fortran_order, dtype = read_header(f)
+            if fortran_order or len(shape) != 2:
+                raise ValueError(f"Formato inesperado do binário de '{name}': {shape}")
+            for start in range(0, shape[0], chunk_rows):
+                count = min(chunk_rows, shape[0] - start) * shape[1]
+                yield np.fromfile(f, dtype=dtype, count=count).reshape(-1, shape[1])[:, 0]
+    else:
+        for chunk in pd.read_csv(os.path.join(data_path, f"{name}.csv"), chunksize=chunk_rows):
+            yield chunk.iloc[:, 0].to_numpy()
+
+
+def _set_bits(bits, ids):
+    ids = ids.astype(np.int64)
+    np.bitwise_or.at(bits, ids >> 3, np.left_shift(1, ids & 7).astype(np.uint8))
+
+
+def get_bits(bits, ids):
+    """Máscara dos `ids` marcados no bitset (ids fora do bitset: False)."""
+    ids = np.asarray(ids, dtype=np.int64)
+    found = np.zeros(len(ids), dtype=bool)
+    inside = np.flatnonzero((ids >= 0) & (ids < len(bits) * 8))
+    found[inside] = (bits[ids[inside] >> 3] >> (ids[inside] & 7)) & 1
+    return found
+
+
+def load_label_bits(data_path=DATA_PATH):
+    """(bitset dos ids do teste, bitset dos ids das fraudes, linhas do teste).
+
+    Um bit por id (ids inteiros >= 0, como os números de linha do contrato):
+    ~36 KB por bitset no creditcard.csv e 12 MB para ids de até 100 milhões.
+    """
+    n_rows = max_id = 0
+    for ids in _label_chunks(data_path, "ids_test"):
+        if len(ids) and ids.min() < 0:
+            raise ValueError("ids_test com ids negativos")
+        n_rows += len(ids)
+        max_id = max(max_id, int(ids.max()) if len(ids) else 0)
+
+    test_bits = np.zeros(max_id // 8 + 1, dtype=np.uint8)
+    fraud_bits = np.zeros_like(test_bits)
+    for ids, labels in zip(_label_chunks(data_path, "ids_test"), _label_chunks(data_path, "y_test")):
+        _set_bits(test_bits, ids)
+        _set_bits(fraud_bits, ids[labels.astype(bool)])
+    return test_bits, fraud_bits, n_rows
+
+
+_worker = None
+
+def _init_worker(test_bits, fraud_bits, relative_accuracy):
+    global _worker
+    _worker = {'test_bits': test_bits, 'fraud_bits': fraud_bits,
+               'relative_accuracy': relative_accuracy}
+
+
+def _evaluate_chunk(model_name, path, columns, start, stop):
+    """Histograma, contagens (TN, FP, FN, TP) e linhas (com rótulo) de um bloco."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    df = pd.read_csv(io.BytesIO(data), header=None, names=columns,
+                     usecols=["id", "anomaly_score", "is_anomaly"])
+    del data
+
+    # inner join com o ground truth: linhas com id fora do teste são descartadas
+    df = df[get_bits(_worker['test_bits'], df["id"].to_numpy())]
+    y_true = get_bits(_worker['fraud_bits'], df["id"].to_numpy())
+    y_pred = df["is_anomaly"].to_numpy().astype(bool)
+
+    histogram = ScoreHistogram(_worker['relative_accuracy']).update(y_true, df["anomaly_score"])
+    tp = int(np.count_nonzero(y_true & y_pred))
+    fp = int(np.count_nonzero(y_pred)) - tp
+    fn = int(np.count_nonzero(y_true)) - tp
+    counts = np.array([len(df) - tp - fp - fn, fp, fn, tp])
+    return model_name, histogram, counts, len(df)
+
+
+def _run_tasks(tasks, label_bits, relative_accuracy, n_workers):
+    n_workers = min(n_workers or os.cpu_count() or 1, len(tasks))
+    if n_workers <= 1:
+        _init_worker(*label_bits, relative_accuracy)
+        yield from (_evaluate_chunk(*task) for task in tasks)
+        return
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=(*label_bits, relative_accuracy)) as executor:
+        futures = [executor.submit(_evaluate_chunk, *task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def stream_histograms(output_path=OUTPUT_PATH, data_path=DATA_PATH, models=MODELS,
+                      relative_accuracy=HISTOGRAM_RELATIVE_ACCURACY, chunk_rows=CHUNK_ROWS,
+                      n_workers=N_WORKERS):
+    """{nome do modelo: (histograma, contagens TN/FP/FN/TP)} de todos os modelos."""
+    test_bits, fraud_bits, n_labels = load_label_bits(data_path)
+
+    tasks = []
+    for model_name, prefix in models.items():
+        path = os.path.join(output_path, f"{prefix}_predictions.csv")
+        columns, _ = read_header(path)
+        chunks, _ = plan_chunks(path, chunk_rows, count_rows=False)
+        tasks += [(model_name, path, columns, start, stop) for start, stop in chunks]
+
+    totals = {name: [ScoreHistogram(relative_accuracy), np.zeros(4, dtype=np.int64), 0]
+              for name in models}
+    for model_name, histogram, counts, n_rows in _run_tasks(
+            tasks, (test_bits, fraud_bits), relative_accuracy, n_workers):
+        total = totals[model_name]
+        total[0].merge(histogram)
+        total[1] += counts
+        total[2] += n_rows
+
+    for model_name, (_, _, n_rows) in totals.items():
+        if n_rows > n_labels:
+            raise ValueError(f"{model_name}: {n_rows:,} predições com rótulo para "
+                             f"{n_labels:,} linhas no ids_test (ids repetidos?)")
+    return {name: (histogram, tuple(int(c) for c in counts))
+            for name, (histogram, counts, _) in totals.items()}
+
+
+# =========================================================
+# 3. MÉTRICAS
+# =========================================================
+
+def evaluate_histogram(histogram, counts, model_name, n_bootstrap=N_BOOTSTRAP,
+                       seed=BOOTSTRAP_SEED, n_workers=N_WORKERS):
+    (roc_low, roc_high), (pr_low, pr_high) = histogram.curve_bounds()
+    return {
+        "Modelo": model_name,
+        **evaluate_ranked(histogram.ranked(), counts, n_bootstrap, seed, n_workers=n_workers),
+        "ROC-AUC limites": (roc_low, roc_high),
+        "PR-AUC limites": (pr_low, pr_high),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output-path', default=OUTPUT_PATH,
+                        help='pasta com os <modelo>_predictions.csv')
+    parser.add_argument('--data-path', default=DATA_PATH, help='pasta com ids_test e y_test')
+    parser.add_argument('--relative-accuracy', type=float, default=HISTOGRAM_RELATIVE_ACCURACY)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=N_WORKERS)
+    parser.add_argument('--n-bootstrap', type=int, default=N_BOOTSTRAP)
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args()
+
+    run = RunTelemetry("evaluation_streaming", args.output_path, n_bootstrap=args.n_bootstrap,
+                       relative_accuracy=args.relative_accuracy)
+    start = time.perf_counter()
+    with run.stage("score") as stage:
+        histograms = stream_histograms(args.output_path, args.data_path, MODELS,
+                                       args.relative_accuracy, args.chunk_rows, args.workers)
+        n_rows = sum(sum(counts) for _, counts in histograms.values())
+        stage.rows = n_rows
+    with run.stage("metrics"):
+        results = [evaluate_histogram(histogram, counts, model_name, args.n_bootstrap,
+                                      n_workers=args.workers)
+                   for model_name, (histogram, counts) in histograms.items()]
+    seconds = time.perf_counter() - start
+
+    results_df = pd.DataFrame(results)
+    interval_columns = [c for c in results_df.columns if c.endswith((" IC", " limites"))]
+    print(results_df.to_string(
+        index=False,
+        float_format="{:.4f}".format,
+        formatters={c: "[{0[0]:.4f}, {0[1]:.4f}]".format for c in interval_columns}
+    ))
+    n_bins = next(iter(histograms.values()))[0].n_bins
+    print(f"\n{n_rows:,} predições em {seconds:.1f}s | {n_bins:,} bins por classe | "
+          f"pico de memória (RSS): {peak_rss_mb():.1f} MB")
+
+    metrics_path = os.path.join(args.output_path, METRICS_FILE)
+    with run.stage("write", rows=len(results_df)):
+        results_df.to_csv(metrics_path, index=False)
+    print(f"Métricas salvas em: {metrics_path}")
+    run.finish()
+
+    if not args.no_plot:
+        plot_metrics(results_df)
+
+
+if __name__ == "__main__":
+    main()
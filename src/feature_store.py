@@ -0,0 +1,159 @@
+"""Feature store em float32 contíguo, lido via np.memmap.
+
+O preprocessing grava uma única matriz de features (`features.f32`, float32,
+C-order) com as linhas agrupadas em segmentos contíguos:
+
+    train_normal | train_anomaly | val | test
+
+A ordem relativa das linhas dentro de cada segmento é a mesma do split
+original, então `segment('train_normal')` é exatamente `X_train[y_train == 0]`.
+Como cada segmento é uma fatia contígua do memmap, os modelos obtêm treino,
+validação e teste sem copiar dados, e vários processos na mesma máquina
+compartilham as mesmas páginas do page cache.
+
+Rótulos (`labels.npy`) e ids (`ids.npy`) seguem a mesma ordem de linhas.
+"""
+
+import json
+import os
+
+import numpy as np
+
+STORE_DIR = 'feature_store'
+MANIFEST_FILE = 'manifest.json'
+FEATURES_FILE = 'features.f32'
+LABELS_FILE = 'labels.npy'
+IDS_FILE = 'ids.npy'
+STORE_VERSION = 1
+
+# Linhas copiadas por vez na escrita (limita a memória temporária)
+WRITE_CHUNK_ROWS = 65536
+
+
+# =========================================================
+# ESCRITA
+# =========================================================
+
+class FeatureStoreWriter:
+    """Escrita incremental do feature store em `<data_path>/feature_store/`.
+
+    `segment_sizes` é uma lista ordenada de `(nome, n_linhas)`. Os arquivos são
+    pré-alocados e preenchidos em blocos com `write`; `close` grava o manifest.
+    """
+
+    def __init__(self, data_path, columns, segment_sizes):
+        self.path = os.path.join(data_path, STORE_DIR)
+        os.makedirs(self.path, exist_ok=True)
+
+        self.columns = [str(c) for c in columns]
+        self.offsets = {}
+        start = 0
+        for name, size in segment_sizes:
+            self.offsets[name] = [start, start + int(size)]
+            start += int(size)
+        self.shape = (start, len(self.columns))
+
+        self.features = np.memmap(os.path.join(self.path, FEATURES_FILE),
+                                  dtype=np.float32, mode='w+', shape=self.shape)
+        self.labels = np.lib.format.open_memmap(os.path.join(self.path, LABELS_FILE),
+                                                mode='w+', dtype=np.int8, shape=(start,))
+        self.ids = np.lib.format.open_memmap(os.path.join(self.path, IDS_FILE),
+                                             mode='w+', dtype=np.int64, shape=(start,))
+
+    def write(self, segment, positions, X, y, ids):
+        """Grava um bloco no segmento.
+
+        `positions` é a posição inicial do bloco dentro do segmento (bloco
+        contíguo) ou um array com a posição de cada linha.
+        """
+        base = self.offsets[segment][0]
+        if np.isscalar(positions):
+            rows = slice(base + positions, base + positions + len(X))
+        else:
+            rows = base + np.asarray(positions)
+        self.features[rows] = X
+        self.labels[rows] = y
+        self.ids[rows] = ids
+
+    def close(self):
+        self.features.flush()
+        self.labels.flush()
+        self.ids.flush()
+        del self.features, self.labels, self.ids
+
+        manifest = {
+            'version': STORE_VERSION,
+            'features_file': FEATURES_FILE,
+            'dtype': 'float32',
+            'shape': list(self.shape),
+            'columns': self.columns,
+            'segments': self.offsets,
+        }
+        tmp_path = os.path.join(self.path, MANIFEST_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST_FILE))
+
+
+def write_feature_store(data_path, columns, segments):
+    """Grava o feature store a partir de dados em memória.
+
+    `segments` é uma lista ordenada de tuplas `(nome, X, y, ids)`; X pode ser
+    DataFrame ou array e é convertido para float32 em blocos.
+    """
+    writer = FeatureStoreWriter(data_path, columns,
+                                [(name, len(X)) for name, X, _, _ in segments])
+    for name, X, y, seg_ids in segments:
+        X, y, seg_ids = np.asarray(X), np.asarray(y), np.asarray(seg_ids)
+        for i in range(0, len(X), WRITE_CHUNK_ROWS):
+            block = slice(i, i + WRITE_CHUNK_ROWS)
+            writer.write(name, i, X[block], y[block], seg_ids[block])
+    writer.close()
+
+
+# =========================================================
+# LEITURA
+# =========================================================
+
+class FeatureStore:
+    """Acesso somente leitura ao feature store (fatias sem cópia)."""
+
+    def __init__(self, store_path):
+        with open(os.path.join(store_path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        self.path = store_path
+        self.columns = manifest['columns']
+        self.segments = {name: tuple(bounds) for name, bounds in manifest['segments'].items()}
+        self.features = np.memmap(os.path.join(store_path, manifest['features_file']),
+                                  dtype=manifest['dtype'], mode='r',
+                                  shape=tuple(manifest['shape']))
+        self._labels = np.load(os.path.join(store_path, LABELS_FILE), mmap_mode='r')
+        self._ids = np.load(os.path.join(store_path, IDS_FILE), mmap_mode='r')
+
+    def _bounds(self, name):
+        if name not in self.segments:
+            raise KeyError(f"Segmento '{name}' não existe no feature store "
+                           f"(disponíveis: {list(self.segments)})")
+        return self.segments[name]
+
+    def segment(self, name):
+        """Features do segmento como view float32 do memmap."""
+        start, stop = self._bounds(name)
+        return self.features[start:stop]
+
+    def labels(self, name):
+        start, stop = self._bounds(name)
+        return self._labels[start:stop]
+
+    def ids(self, name):
+        start, stop = self._bounds(name)
+        return self._ids[start:stop]
+
+
+def open_feature_store(data_path):
+    """Abre o feature store de `data_path`, ou retorna None se não existir."""
+    store_path = os.path.join(data_path, STORE_DIR)
+    if not os.path.exists(os.path.join(store_path, MANIFEST_FILE)):
+        return None
+    return FeatureStore(store_path)
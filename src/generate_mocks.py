@@ -1,68 +1,296 @@
+"""Gerador de dados sintéticos no contrato de `data/processed/`.
+
+Gera qualquer número de linhas, inclusive centenas de milhões, direto no
+formato que o preprocessing produz:
+
+* tabelas do contrato (X_train_processed, X_test_processed, y_train, y_test,
+  ids_test) em `.npy` tipado + `schema.json` e em CSV;
+* feature store float32 (train_normal | train_anomaly | val | test).
+
+As colunas são as do `preprocessing.py`: V1-V28 e Amount, já padronizadas.
+
+Distribuição:
+
+* normais: mistura de `N_NORMAL_COMPONENTS` gaussianas com covariâncias
+  correlacionadas;
+* fraudes: `N_FRAUD_CLUSTERS` clusters compactos deslocados da massa normal,
+  mais uma fração `OUTLIER_SHARE` de outliers espalhados;
+* padronização pelos momentos exatos da mistura normal, equivalente ao
+  StandardScaler ajustado no treino.
+
+As linhas são geradas em blocos de `CHUNK_ROWS` por um pool de processos. Cada
+bloco tem seu próprio `np.random.Generator`, derivado de `SEED` por
+`SeedSequence.spawn`, então o resultado é o mesmo para qualquer número de
+processos. Uma primeira passada, barata, sorteia só rótulos e splits e fixa a
+posição de cada bloco nos arquivos. Depois, cada processo gera as features do
+seu bloco e grava direto nos memmaps e em um pedaço de CSV; os pedaços são
+concatenados no final.
+
+Uso (a partir da raiz do repositório):
+    python src/generate_mocks.py [--rows 5000] [--output data/mocks]
+        [--fraud-rate 0.01] [--workers N] [--chunk-rows 500000] [--no-csv]
+"""
+
+import argparse
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
-import os
+
+from data_contract import create_table, register_table
+from feature_store import FEATURES_FILE, IDS_FILE, LABELS_FILE, STORE_DIR, FeatureStoreWriter
 
 # --- Configurações ---
-N_SAMPLES_TEST = 1000   # Amostras para o conjunto de teste
-N_SAMPLES_TRAIN = 4000  # Amostras para o conjunto de treino (simula ser maior)
-N_FEATURES = 30         # V1-V28, Time, Amount
-FRAUD_RATE = 0.01       # Simula 1% de fraude (desbalanceamento)
+N_ROWS = 5000            # Total de linhas (treino + validação + teste)
+SPLIT_FRACTIONS = (0.70, 0.15, 0.15)  # Mesmo holdout do preprocessing.py
+FRAUD_RATE = 0.01        # Simula 1% de fraude (o dataset real tem 0,172%)
+OUTLIER_SHARE = 0.3      # Fração das fraudes espalhada (fora dos clusters)
+N_NORMAL_COMPONENTS = 4
+N_FRAUD_CLUSTERS = 3
+FRAUD_SHIFT = 5.0        # Distância dos clusters de fraude à massa normal (em desvios)
+OUTLIER_SCALE = 4.0      # Desvio dos outliers espalhados
 SEED = 42
 
-# --- Caminhos e Setup ---
+CHUNK_ROWS = 500_000     # Linhas por bloco (memória de cada processo)
+N_WORKERS = None         # None = todos os núcleos
+
+FEATURE_COLUMNS = [f'V{i}' for i in range(1, 29)] + ['Amount']
+
+# --- Caminhos ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 OUTPUT_DIR = os.path.join(BASE_DIR, 'data', 'mocks')
 
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
-    print(f"Pasta criada: {OUTPUT_DIR}")
+TRAIN, VAL, TEST = 0, 1, 2
+# Tabela do contrato -> (colunas, split)
+TABLES = {
+    'X_train_processed': (FEATURE_COLUMNS, 'train'),
+    'X_test_processed': (FEATURE_COLUMNS, 'test'),
+    'y_train': (['Class'], 'train'),
+    'y_test': (['Class'], 'test'),
+    'ids_test': (['id'], 'test'),
+}
+SEGMENTS = ['train_normal', 'train_anomaly', 'val', 'test']
+
+# =========================================================
+# 1. DISTRIBUIÇÃO
+# =========================================================
+
+def build_distribution(seed=SEED, n_features=len(FEATURE_COLUMNS)):
+    """Parâmetros da mistura normal, dos clusters de fraude e da padronização."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0])
+    weights = rng.dirichlet(np.full(N_NORMAL_COMPONENTS, 5.0))
+    means = rng.normal(0, 1.5, (N_NORMAL_COMPONENTS, n_features))
+    # Fator de Cholesky de cada componente: escalas por eixo + correlações
+    chols = np.stack([
+        np.diag(rng.uniform(0.4, 1.2, n_features))
+        + np.tril(rng.normal(0, 0.3 / np.sqrt(n_features), (n_features, n_features)), -1)
+        for _ in range(N_NORMAL_COMPONENTS)
+    ])
+
+    # Momentos exatos da mistura (o StandardScaler do treino, sem as fraudes)
+    second = np.einsum('kij,kij->ki', chols, chols) + means ** 2
+    center = weights @ means
+    scale = np.sqrt(weights @ second - center ** 2)
+
+    directions = rng.normal(size=(N_FRAUD_CLUSTERS, n_features))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    fraud_centers = center + FRAUD_SHIFT * scale * directions
+    return {'weights': weights, 'means': means, 'chols': chols,
+            'center': center, 'scale': scale, 'fraud_centers': fraud_centers}
+
+
+def chunk_streams(seed, n_chunks):
+    """(rótulos, features) de cada bloco: geradores independentes."""
+    return [seq.spawn(2) for seq in np.random.SeedSequence(seed).spawn(n_chunks + 1)[1:]]
+
+
+def chunk_labels(label_seq, n_rows, fraud_rate):
+    """Classe e split de cada linha do bloco (só o gerador de rótulos)."""
+    rng = np.random.default_rng(label_seq)
+    y = (rng.random(n_rows) < fraud_rate).astype(np.int8)
+    split = np.searchsorted(np.cumsum(SPLIT_FRACTIONS)[:-1], rng.random(n_rows), side='right')
+    return y, split
+
+
+def chunk_features(feature_seq, y, dist):
+    """Features padronizadas (float32) do bloco."""
+    rng = np.random.default_rng(feature_seq)
+    n_rows, n_features = len(y), dist['means'].shape[1]
+    component = rng.choice(N_NORMAL_COMPONENTS, n_rows, p=dist['weights'])
+    X = rng.standard_normal((n_rows, n_features))
+    for k in range(N_NORMAL_COMPONENTS):
+        rows = component == k
+        X[rows] = X[rows] @ dist['chols'][k].T + dist['means'][k]
+
+    fraud = np.flatnonzero(y == 1)
+    outlier = rng.random(len(fraud)) < OUTLIER_SHARE
+    cluster = rng.integers(0, N_FRAUD_CLUSTERS, len(fraud))
+    noise = rng.standard_normal((len(fraud), n_features))
+    X[fraud] = np.where(outlier[:, None],
+                        dist['center'] + OUTLIER_SCALE * dist['scale'] * noise,
+                        dist['fraud_centers'][cluster] + 0.5 * dist['scale'] * noise)
+    return ((X - dist['center']) / dist['scale']).astype(np.float32)
+
+# =========================================================
+# 2. PLANO DE ESCRITA
+# =========================================================
+
+def plan_chunks(n_rows, chunk_rows, fraud_rate, seed):
+    """Posição inicial de cada bloco em cada tabela e segmento.
+
+    Retorna (tarefas, totais). Cada bloco grava suas linhas de treino, por
+    exemplo, a partir de `offsets['train']`.
+    """
+    starts = list(range(0, n_rows, chunk_rows))
+    streams = chunk_streams(seed, len(starts))
+    counts = []
+    for start, (label_seq, _) in zip(starts, streams):
+        y, split = chunk_labels(label_seq, min(chunk_rows, n_rows - start), fraud_rate)
+        counts.append({
+            'train': int((split == TRAIN).sum()),
+            'test': int((split == TEST).sum()),
+            'train_normal': int(((split == TRAIN) & (y == 0)).sum()),
+            'train_anomaly': int(((split == TRAIN) & (y == 1)).sum()),
+            'val': int((split == VAL).sum()),
+        })
+
+    totals = dict.fromkeys(counts[0], 0) if counts else {}
+    tasks = []
+    for i, (start, streams_i, chunk_counts) in enumerate(zip(starts, streams, counts)):
+        tasks.append({'index': i, 'start': start, 'n_rows': min(chunk_rows, n_rows - start),
+                      'streams': streams_i, 'offsets': dict(totals)})
+        for key, value in chunk_counts.items():
+            totals[key] += value
+    return tasks, totals
+
+# =========================================================
+# 3. GERAÇÃO EM PARALELO
+# =========================================================
+
+_worker = None
+
+def _init_worker(output_dir, dist, fraud_rate, write_csv):
+    global _worker
+    store_dir = os.path.join(output_dir, STORE_DIR)
+    n_features = len(FEATURE_COLUMNS)
+    features = np.memmap(os.path.join(store_dir, FEATURES_FILE), dtype=np.float32, mode='r+')
+    _worker = {
+        'output_dir': output_dir, 'dist': dist, 'fraud_rate': fraud_rate,
+        'write_csv': write_csv,
+        'tables': {name: np.load(os.path.join(output_dir, f'{name}.npy'), mmap_mode='r+')
+                   for name in TABLES},
+        'features': features.reshape(-1, n_features),
+        'labels': np.load(os.path.join(store_dir, LABELS_FILE), mmap_mode='r+'),
+        'ids': np.load(os.path.join(store_dir, IDS_FILE), mmap_mode='r+'),
+    }
+
+
+def _generate_chunk(task, segment_starts):
+    w = _worker
+    label_seq, feature_seq = task['streams']
+    y, split = chunk_labels(label_seq, task['n_rows'], w['fraud_rate'])
+    X = chunk_features(feature_seq, y, w['dist'])
+    ids = np.arange(task['start'], task['start'] + task['n_rows'], dtype=np.int64)
+    offsets = task['offsets']
+
+    train, test = split == TRAIN, split == TEST
+    parts = {
+        'X_train_processed': (X[train], offsets['train']),
+        'y_train': (y[train, None], offsets['train']),
+        'X_test_processed': (X[test], offsets['test']),
+        'y_test': (y[test, None], offsets['test']),
+        'ids_test': (ids[test, None], offsets['test']),
+    }
+    for name, (values, offset) in parts.items():
+        w['tables'][name][offset:offset + len(values)] = values
+        if w['write_csv']:
+            pd.DataFrame(values, columns=TABLES[name][0]).to_csv(
+                os.path.join(w['output_dir'], f"{name}.csv.part{task['index']:06d}"),
+                header=task['index'] == 0, index=False)
+
+    masks = {'train_normal': train & (y == 0), 'train_anomaly': train & (y == 1),
+             'val': split == VAL, 'test': test}
+    for segment, mask in masks.items():
+        first = segment_starts[segment] + offsets[segment]
+        rows = slice(first, first + int(mask.sum()))
+        w['features'][rows] = X[mask]
+        w['labels'][rows] = y[mask]
+        w['ids'][rows] = ids[mask]
 
-np.random.seed(SEED)
+    for values in list(w['tables'].values()) + [w['features'], w['labels'], w['ids']]:
+        values.flush()
+    return task['n_rows'], int(y.sum())
 
-def generate_labels(n_samples, fraud_rate):
-    """Cria um array de labels com a taxa de fraude especificada."""
-    labels = np.zeros(n_samples, dtype=int)
-    num_anomalies = int(n_samples * fraud_rate)
-    labels[:num_anomalies] = 1
-    np.random.shuffle(labels)
-    return labels, num_anomalies
 
-# --- 1. Geração do Conjunto de Treino (X_train e Y_train) ---
+def merge_csv_parts(output_dir, name, n_chunks):
+    """Concatena os pedaços de CSV (o primeiro tem o cabeçalho)."""
+    with open(os.path.join(output_dir, f'{name}.csv'), 'wb') as out:
+        for i in range(n_chunks):
+            part = os.path.join(output_dir, f'{name}.csv.part{i:06d}')
+            with open(part, 'rb') as f:
+                shutil.copyfileobj(f, out, 1 << 20)
+            os.remove(part)
 
-# Gera dados aleatórios normalizados (entre 0 e 1)
-X_train_mock = np.random.rand(N_SAMPLES_TRAIN, N_FEATURES)
-feature_names = [f'V{i}' for i in range(1, 29)] + ['Time_norm', 'Amount_norm']
-df_X_train = pd.DataFrame(X_train_mock, columns=feature_names)
 
-# Cria o gabarito Y_train
-y_train_mock, num_frauds_train = generate_labels(N_SAMPLES_TRAIN, FRAUD_RATE)
+def generate(output_dir=OUTPUT_DIR, n_rows=N_ROWS, fraud_rate=FRAUD_RATE, seed=SEED,
+             chunk_rows=CHUNK_ROWS, n_workers=N_WORKERS, write_csv=True):
+    """Gera o conjunto completo em `output_dir` e retorna os totais por split."""
+    os.makedirs(output_dir, exist_ok=True)
+    dist = build_distribution(seed)
+    tasks, totals = plan_chunks(n_rows, chunk_rows, fraud_rate, seed)
 
-# SALVAR X_train_processed.csv
-df_X_train.to_csv(os.path.join(OUTPUT_DIR, 'X_train_processed.csv'), index=False)
-print(f"\nGerado: X_train_processed.csv ({N_SAMPLES_TRAIN} linhas)")
+    # Arquivos pré-alocados; cada processo grava nas posições do seu bloco
+    for name, (columns, split) in TABLES.items():
+        create_table(output_dir, name, columns, totals[split])
+    store = FeatureStoreWriter(output_dir, FEATURE_COLUMNS,
+                               [(s, totals[s]) for s in SEGMENTS])
+    segment_starts = {s: store.offsets[s][0] for s in SEGMENTS}
 
-# SALVAR Y_train.csv
-pd.Series(y_train_mock, name='Class').to_csv(os.path.join(OUTPUT_DIR, 'Y_train.csv'), index=False)
-print(f"Gerado: Y_train.csv (Fraudes simuladas: {num_frauds_train})")
+    n_workers = n_workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=(output_dir, dist, fraud_rate, write_csv)) as executor:
+        futures = [executor.submit(_generate_chunk, task, segment_starts) for task in tasks]
+        n_frauds = sum(f.result()[1] for f in futures)
 
-# --- 2. Geração do Conjunto de Teste (X_test, Y_test, IDs) ---
+    store.close()
+    for name, (columns, _) in TABLES.items():
+        register_table(output_dir, name, columns,
+                       np.load(os.path.join(output_dir, f'{name}.npy'), mmap_mode='r'))
+        if write_csv:
+            merge_csv_parts(output_dir, name, len(tasks))
+    return {**totals, 'frauds': n_frauds}
 
-X_test_mock = np.random.rand(N_SAMPLES_TEST, N_FEATURES)
-df_X_test = pd.DataFrame(X_test_mock, columns=feature_names)
+# =========================================================
+# 4. EXECUÇÃO PRINCIPAL
+# =========================================================
 
-y_test_mock, num_frauds_test = generate_labels(N_SAMPLES_TEST, FRAUD_RATE)
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=N_ROWS)
+    parser.add_argument('--output', default=OUTPUT_DIR)
+    parser.add_argument('--fraud-rate', type=float, default=FRAUD_RATE)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=N_WORKERS,
+                        help='processos geradores (padrão: todos os núcleos)')
+    parser.add_argument('--no-csv', action='store_true',
+                        help='grava só o binário e o feature store (mais rápido)')
+    args = parser.parse_args()
 
-# SALVAR X_test_processed.csv
-df_X_test.to_csv(os.path.join(OUTPUT_DIR, 'X_test_processed.csv'), index=False)
-print(f"Gerado: X_test_processed.csv ({N_SAMPLES_TEST} linhas)")
+    start = time.perf_counter()
+    totals = generate(args.output, args.rows, args.fraud_rate, args.seed, args.chunk_rows,
+                      args.workers, not args.no_csv)
+    seconds = time.perf_counter() - start
 
-# SALVAR Y_test.csv
-pd.Series(y_test_mock, name='Class').to_csv(os.path.join(OUTPUT_DIR, 'Y_test.csv'), index=False)
-print(f"Gerado: Y_test.csv (Fraudes simuladas: {num_frauds_test})")
+    print(f"Gerado em: {args.output}")
+    print(f"Treino: {totals['train']} linhas ({totals['train_anomaly']} fraudes) | "
+          f"Validação: {totals['val']} | Teste: {totals['test']}")
+    print(f"Fraudes: {totals['frauds']} ({totals['frauds'] / max(args.rows, 1):.4%})")
+    print(f"{args.rows:,} linhas em {seconds:.2f}s ({args.rows / seconds:,.0f} linhas/s)")
 
-# SALVAR ids_test.csv
-ids_test_mock = np.arange(10000, 10000 + N_SAMPLES_TEST)
-pd.Series(ids_test_mock, name='id').to_csv(os.path.join(OUTPUT_DIR, 'ids_test.csv'), index=False)
-print(f"Gerado: ids_test.csv")
 
-print("\nMocks prontos no caminho 'data/mocks/'.")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Kernel NumPy de pontuação do GMM (log-verossimilhança por amostra).
+
+Equivalente ao `GaussianMixture.score_samples`, sem a validação de entrada do
+scikit-learn a cada chamada. Na construção, os parâmetros ajustados são
+convertidos em constantes prontas para o produto matricial:
+
+* `full`: os fatores de Cholesky das precisões das K componentes são
+  concatenados em uma única matriz (d, K*d), então todas as componentes são
+  projetadas com um só `X @ P`;
+* `tied`: um único fator compartilhado;
+* `diag` / `spherical`: forma quadrática expandida
+  (`x²·l² - 2x·(μl²) + ‖μl‖²`), também com produtos matriciais;
+* log dos pesos + log-determinantes + constante gaussiana somados em um vetor.
+
+A mistura é combinada com log-sum-exp estável (subtraindo o máximo por linha).
+Em `float32` o erro relativo em relação ao `score_samples` (float64) fica abaixo
+de `TOLERANCE['float32']`; em `float64`, abaixo de `TOLERANCE['float64']`.
+"""
+
+import numpy as np
+
+# Erro relativo máximo tolerado, |kernel - score_samples| / (1 + |score_samples|)
+TOLERANCE = {'float64': 1e-10, 'float32': 1e-5}
+
+# Linhas por bloco (limita a memória intermediária n x K x d)
+SCORE_CHUNK_ROWS = 16_384
+
+
+class GMMKernel:
+    def __init__(self, weights, means, precisions_cholesky, covariance_type, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.covariance_type = covariance_type
+        means = np.asarray(means, dtype=np.float64)
+        prec_chol = np.asarray(precisions_cholesky, dtype=np.float64)
+        n_components, n_features = means.shape
+        self.n_components = n_components
+        self.n_features = n_features
+
+        if covariance_type == 'full':
+            # P[:, k*d:(k+1)*d] = L_k ; b_k = mu_k @ L_k
+            self.projection = np.concatenate(list(prec_chol), axis=1)
+            self.offset = np.einsum('kd,kde->ke', means, prec_chol).ravel()
+            log_det = np.log(np.diagonal(prec_chol, axis1=1, axis2=2)).sum(axis=1)
+        elif covariance_type == 'tied':
+            self.projection = prec_chol
+            self.offset = means @ prec_chol
+            log_det = np.full(n_components, np.log(np.diag(prec_chol)).sum())
+        elif covariance_type in ('diag', 'spherical'):
+            if covariance_type == 'spherical':
+                prec_chol = np.repeat(prec_chol[:, None], n_features, axis=1)
+            # ||(x - mu_k) * l_k||^2 = x^2 . l_k^2 - 2 x . (mu_k l_k^2) + ||mu_k l_k||^2
+            precisions = prec_chol ** 2
+            self.projection = precisions.T
+            self.cross = -2 * (means * precisions).T
+            self.offset = (means ** 2 * precisions).sum(axis=1)
+            log_det = np.log(prec_chol).sum(axis=1)
+        else:
+            raise ValueError(f"covariance_type não suportado: {covariance_type}")
+
+        self.constant = (np.log(weights) + log_det
+                         - 0.5 * n_features * np.log(2 * np.pi))
+        self.projection = self.projection.astype(self.dtype)
+        self.offset = self.offset.astype(self.dtype)
+        self.constant = self.constant.astype(self.dtype)
+        if covariance_type in ('diag', 'spherical'):
+            self.cross = self.cross.astype(self.dtype)
+
+    @classmethod
+    def from_sklearn(cls, model, dtype=np.float64):
+        return cls(model.weights_, model.means_, model.precisions_cholesky_,
+                   model.covariance_type, dtype)
+
+    @classmethod
+    def from_artifact(cls, manifest, arrays, dtype=np.float64):
+        return cls(arrays['weights'], arrays['means'], arrays['precisions_cholesky'],
+                   manifest['params']['covariance_type'], dtype)
+
+    def _mahalanobis(self, X):
+        """Distância de Mahalanobis ao quadrado de cada linha a cada componente (n, K)."""
+        n = len(X)
+        if self.covariance_type == 'full':
+            Y = X @ self.projection
+            Y -= self.offset
+            Y = Y.reshape(n, self.n_components, self.n_features)
+        elif self.covariance_type == 'tied':
+            Y = (X @ self.projection)[:, None, :] - self.offset
+        else:
+            # diag/spherical: forma quadrática expandida, dois produtos (n, d) x (d, K)
+            distances = (X * X) @ self.projection
+            distances += X @ self.cross
+            distances += self.offset
+            return distances
+        return np.einsum('nkd,nkd->nk', Y, Y)
+
+    def _score_block(self, X, return_resp=False):
+        weighted = self.constant - 0.5 * self._mahalanobis(X)
+        # log-sum-exp estável
+        top = weighted.max(axis=1)
+        weighted -= top[:, None]
+        log_norm = np.log(np.exp(weighted).sum(axis=1))
+        if return_resp:
+            weighted -= log_norm[:, None]
+            return top + log_norm, weighted
+        return top + log_norm
+
+    def score_samples(self, X):
+        """Log-verossimilhança de cada linha (mesma saída do score_samples)."""
+        X = np.asarray(X, dtype=self.dtype)
+        if X.ndim == 1:
+            X = X[None, :]
+        if len(X) <= SCORE_CHUNK_ROWS:
+            return self._score_block(X)
+        out = np.empty(len(X), dtype=self.dtype)
+        for start in range(0, len(X), SCORE_CHUNK_ROWS):
+            stop = start + SCORE_CHUNK_ROWS
+            out[start:stop] = self._score_block(X[start:stop])
+        return out
+
+    def log_responsibilities(self, X):
+        """(log-verossimilhança (n,), log da responsabilidade de cada componente (n, K))."""
+        X = np.asarray(X, dtype=self.dtype)
+        return self._score_block(X[None, :] if X.ndim == 1 else X, return_resp=True)
+
+    def max_relative_error(self, model, X):
+        """Erro relativo máximo contra o `score_samples` do scikit-learn."""
+        reference = model.score_samples(np.asarray(X, dtype=np.float64))
+        diff = np.abs(self.score_samples(X).astype(np.float64) - reference)
+        return float((diff / (1 + np.abs(reference))).max())
@@ -0,0 +1,196 @@
+"""Métricas de avaliação com uma única ordenação por modelo e bootstrap vetorizado.
+
+Os scores são ordenados uma vez (decrescente) e agrupados por valor distinto.
+Para ROC-AUC e PR-AUC só importa, para cada grupo que contém fraudes, quantas
+fraudes ele tem (`pos`), quantos normais empatados com elas (`neg`) e quantos
+normais aparecem antes dele desde o grupo anterior (`gap`). Os normais entre
+dois grupos com fraude são intercambiáveis, então a curva inteira é resumida em
+~P blocos (P = número de fraudes), em vez de N linhas:
+
+* ROC-AUC: regra do trapézio sobre os blocos (mesma área do `roc_auc_score`);
+* PR-AUC: soma de `ΔRecall · Precision` nos limiares distintos (mesma fórmula
+  do `average_precision_score`).
+
+Precision, recall, F1 e a matriz de confusão saem das contagens TN/FP/FN/TP do
+`is_anomaly`.
+
+Bootstrap de Poisson: cada linha recebe peso Poisson(1) por reamostragem. Como a
+soma de k pesos Poisson(1) é Poisson(k), cada bloco é reamostrado com um único
+sorteio (Poisson(pos), Poisson(neg), Poisson(gap)), e o custo por reamostragem
+é O(P), independente do número de linhas. As reamostragens são divididas em
+tarefas com sementes derivadas de `seed` (resultado igual para qualquer número
+de processos) e executadas em um pool de processos.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+N_BOOTSTRAP = 1000
+BOOTSTRAP_SEED = 42
+CI_LEVEL = 0.95
+
+# Reamostragens por tarefa do pool (limita a matriz B x blocos de cada tarefa)
+RESAMPLES_PER_TASK = 50
+
+METRICS = ['Precision', 'Recall', 'F1-score', 'ROC-AUC', 'PR-AUC']
+
+
+# =========================================================
+# CURVAS (ROC-AUC / PR-AUC)
+# =========================================================
+
+class RankedScores:
+    """Scores ordenados uma única vez e resumidos em blocos com fraude."""
+
+    def __init__(self, y_true, y_score):
+        y_true = np.asarray(y_true).astype(bool)
+        y_score = np.asarray(y_score, dtype=np.float64)
+        order = np.argsort(y_score, kind='stable')[::-1]
+        scores = y_score[order]
+        labels = y_true[order]
+
+        # Grupos de scores empatados (limiares distintos)
+        starts = np.concatenate([[0], np.flatnonzero(scores[1:] != scores[:-1]) + 1])
+        pos = np.add.reduceat(labels, starts).astype(np.int64) if len(scores) else np.zeros(0, np.int64)
+        neg = np.diff(np.append(starts, len(scores))) - pos
+        self._summarize(pos, neg)
+
+    @classmethod
+    def from_counts(cls, pos, neg):
+        """A partir das contagens de fraudes e normais por grupo, do maior score ao menor.
+
+        Cada grupo conta como um conjunto de scores empatados (ex.: um bin de
+        histograma).
+        """
+        ranked = cls.__new__(cls)
+        ranked._summarize(np.asarray(pos, dtype=np.int64), np.asarray(neg, dtype=np.int64))
+        return ranked
+
+    def _summarize(self, pos, neg):
+        # Grupos só com normais viram o `gap` antes do próximo grupo com fraude
+        keep = np.flatnonzero(pos > 0)
+        neg_before = np.cumsum(neg) - neg
+        fp_before = neg_before[keep]
+        fp_after = fp_before + neg[keep]
+        self.pos = pos[keep]
+        self.neg = neg[keep]
+        self.gap = fp_before - np.concatenate([[0], fp_after[:-1]])
+        self.tail = int(neg.sum() - (fp_after[-1] if len(keep) else 0))
+        self.n_rows = int(pos.sum() + neg.sum())
+
+    def curve_metrics(self):
+        roc_auc, pr_auc = _curve_metrics(self.pos, self.neg, self.gap, self.tail)
+        return float(roc_auc), float(pr_auc)
+
+
+def _curve_metrics(pos, neg, gap, tail):
+    """ROC-AUC e PR-AUC dos blocos; aceita lotes de reamostragens (B, blocos)."""
+    pos, neg, gap = (np.asarray(a, dtype=np.float64) for a in (pos, neg, gap))
+    tp = np.cumsum(pos, axis=-1)
+    fp = np.cumsum(neg + gap, axis=-1)
+    n_pos = tp[..., -1] if tp.shape[-1] else np.zeros(tp.shape[:-1])
+    n_neg = (fp[..., -1] if fp.shape[-1] else 0) + tail
+    tp_before = tp - pos
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        area = ((gap + neg) * tp_before + 0.5 * neg * pos).sum(axis=-1) + tail * n_pos
+        roc_auc = area / (n_pos * n_neg)
+        precision = tp / np.maximum(tp + fp, 1)
+        pr_auc = (pos * precision).sum(axis=-1) / n_pos
+    roc_auc = np.where((n_pos > 0) & (n_neg > 0), roc_auc, np.nan)
+    pr_auc = np.where(n_pos > 0, pr_auc, np.nan)
+    return roc_auc, pr_auc
+
+
+# =========================================================
+# LIMIAR (is_anomaly)
+# =========================================================
+
+def confusion_counts(y_true, y_pred):
+    """(TN, FP, FN, TP) do is_anomaly."""
+    y_true = np.asarray(y_true).astype(bool)
+    y_pred = np.asarray(y_pred).astype(bool)
+    tp = int(np.count_nonzero(y_true & y_pred))
+    fp = int(np.count_nonzero(y_pred)) - tp
+    fn = int(np.count_nonzero(y_true)) - tp
+    return len(y_true) - tp - fp - fn, fp, fn, tp
+
+
+def _threshold_metrics(tn, fp, fn, tp):
+    """Precision, recall e F1 (0 quando indefinidos, como zero_division=0)."""
+    tp, fp, fn = (np.asarray(a, dtype=np.float64) for a in (tp, fp, fn))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), 0.0)
+    return precision, recall, f1
+
+
+# =========================================================
+# AVALIAÇÃO + BOOTSTRAP
+# =========================================================
+
+def evaluate(y_true, y_score, y_pred, n_bootstrap=0, seed=BOOTSTRAP_SEED,
+             level=CI_LEVEL, n_workers=None):
+    """Métricas do modelo (mesmos nomes do evaluation.py).
+
+    Com `n_bootstrap > 0`, acrescenta `<métrica> IC` = (inferior, superior) do
+    intervalo de confiança percentil de nível `level`.
+    """
+    return evaluate_ranked(RankedScores(y_true, y_score), confusion_counts(y_true, y_pred),
+                           n_bootstrap, seed, level, n_workers)
+
+
+def evaluate_ranked(ranked, counts, n_bootstrap=0, seed=BOOTSTRAP_SEED, level=CI_LEVEL,
+                    n_workers=None):
+    """Como `evaluate`, a partir dos blocos já ordenados e das contagens (TN, FP, FN, TP)."""
+    roc_auc, pr_auc = ranked.curve_metrics()
+    precision, recall, f1 = (float(v) for v in _threshold_metrics(*counts))
+
+    result = {
+        'Precision': precision,
+        'Recall': recall,
+        'F1-score': f1,
+        'ROC-AUC': roc_auc,
+        'PR-AUC': pr_auc,
+        'TN_FP_FN_TP': list(counts),
+    }
+    if n_bootstrap > 0:
+        samples = bootstrap(ranked, counts, n_bootstrap, seed, n_workers)
+        alpha = (1 - level) / 2
+        for name in METRICS:
+            low, high = np.nanquantile(samples[name], [alpha, 1 - alpha])
+            result[f'{name} IC'] = (float(low), float(high))
+    return result
+
+
+def _bootstrap_task(blocks, counts, n_resamples, seed):
+    pos, neg, gap, tail = blocks
+    rng = np.random.default_rng(seed)
+    size = (n_resamples, len(pos))
+    roc_auc, pr_auc = _curve_metrics(rng.poisson(pos, size), rng.poisson(neg, size),
+                                     rng.poisson(gap, size), rng.poisson(tail, n_resamples))
+    cells = rng.poisson(counts, (n_resamples, 4)).T
+    precision, recall, f1 = _threshold_metrics(*cells)
+    return np.stack([precision, recall, f1, roc_auc, pr_auc])
+
+
+def bootstrap(ranked, counts, n_resamples=N_BOOTSTRAP, seed=BOOTSTRAP_SEED, n_workers=None):
+    """Bootstrap de Poisson das métricas: {métrica: array (n_resamples,)}."""
+    blocks = (ranked.pos, ranked.neg, ranked.gap, ranked.tail)
+    sizes = [min(RESAMPLES_PER_TASK, n_resamples - start)
+             for start in range(0, n_resamples, RESAMPLES_PER_TASK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(blocks, counts, size, task_seed) for size, task_seed in zip(sizes, seeds)]
+
+    n_workers = min(n_workers or os.cpu_count() or 1, len(tasks))
+    if n_workers <= 1:
+        results = [_bootstrap_task(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(_bootstrap_task, *zip(*tasks)))
+
+    samples = np.concatenate(results, axis=1)
+    return dict(zip(METRICS, samples))
@@ -1,46 +1,173 @@
 import pandas as pd
 import numpy as np
 import os
-import tensorflow as tf
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Input, Dense, Dropout, BatchNormalization
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
-from tensorflow.keras.regularizers import l1
-from sklearn.model_selection import train_test_split, ParameterGrid
-from sklearn.metrics import average_precision_score, roc_auc_score, precision_recall_curve, classification_report
-import matplotlib.pyplot as plt
+import sys
+import math
+import time
+from functools import lru_cache
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from autoencoder_kernel import AutoencoderKernel, layer_spec
+from artifacts import (
+    latest_version, load_artifact, load_scoring_input, parse_score_only_args, save_artifact,
+    score_only_parser, write_predictions
+)
+from data_contract import artifact_version, load_table
+from feature_store import open_feature_store
+from telemetry import RunTelemetry, peak_rss_mb
+from thresholds import THRESHOLD_RULE, describe, flag_anomalies, select_threshold
 
 # =========================================================
 # CONFIGURAÇÕES GERAIS
 # =========================================================
+# TensorFlow e scikit-learn são importados sob demanda (import_tensorflow e
+# dentro das funções): importar o módulo não carrega nenhum dos dois
 RANDOM_SEED = 42
-tf.random.set_seed(RANDOM_SEED)
-np.random.seed(RANDOM_SEED)
 
 DATA_PATH = 'data/processed'
 OUTPUT_PATH = 'outputs'
 
-if not os.path.exists(OUTPUT_PATH):
-    os.makedirs(OUTPUT_PATH)
+# =========================================================
+# DESEMPENHO DO TREINO
+# =========================================================
+# Pipeline de entrada do fit:
+# 'numpy'  = arrays NumPy direto no fit (comportamento original)
+# 'tfdata' = tf.data com a matriz residente em memória, shuffle por época,
+#            lotes montados em paralelo e prefetch
+# 'stream' = tf.data lendo os lotes do feature store em disco (memmap),
+#            sem carregar o treino inteiro em memória
+INPUT_PIPELINE = 'numpy'
+
+# Threads do TensorFlow (0 = padrão do TensorFlow, que usa todos os núcleos)
+TF_INTRA_OP_THREADS = 0
+TF_INTER_OP_THREADS = 0
+
+# Compilação XLA do modelo (jit_compile no compile do Keras)
+JIT_COMPILE = False
+
+# Tamanho do lote de inferência no --score-only
+PREDICT_BATCH_SIZE = 4096
+
+# Motor de pontuação (avaliação final e --score-only):
+# 'numpy' = AutoencoderKernel (autoencoder_kernel.py), sem TensorFlow no
+#           --score-only, BatchNormalization dobrada e MSE calculado em blocos
+# 'keras' = model.predict (comportamento original)
+SCORING_ENGINE = 'numpy'
+
+# Formato dos pesos do kernel NumPy: 'float32', 'float16' ou 'int8'
+# (as contas são em float32; ver TOLERANCE em autoencoder_kernel.py)
+KERNEL_WEIGHTS_DTYPE = 'float32'
+
+_tf = None
+
+def import_tensorflow():
+    """Importa o TensorFlow na primeira chamada, já com threads e semente configuradas."""
+    global _tf
+    if _tf is None:
+        import tensorflow
+        _tf = tensorflow
+        configure_tf_threads()
+        _tf.random.set_seed(RANDOM_SEED)
+    return _tf
+
+def configure_tf_threads(intra_op=TF_INTRA_OP_THREADS, inter_op=TF_INTER_OP_THREADS):
+    # Precisa ser chamado antes de qualquer operação do TensorFlow
+    tf = import_tensorflow()
+    if intra_op:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+    if inter_op:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op)
 
 
 # =========================================================
 # MODO DE EXECUÇÃO
 # 0 = Execução normal (hiperparâmetros fixos)
 # 1 = Grid Search (tunagem)
+# 2 = Successive Halving (tunagem com orçamento de épocas)
 # =========================================================
 RUN_TUNING = 0
 
+# Successive Halving: todos os candidatos treinam HALVING_MIN_EPOCHS épocas,
+# a cada rodada sobra 1/HALVING_ETA deles e o orçamento é multiplicado por HALVING_ETA
+HALVING_MIN_EPOCHS = 5
+HALVING_ETA = 2
+
+# Política do threshold (thresholds.py): target_recall, target_precision,
+# alert_budget ou min_cost
+THRESHOLD_POLICY = {'name': 'target_recall', 'recall': 0.80}
+
+# =========================================================
+# DESTILAÇÃO (python src/models/autoencoder.py --distill)
+# =========================================================
+# Aluno: autoencoder raso (encoder com STUDENT_ENCODING_DIM neurônios e
+# ativação STUDENT_ACTIVATION, decoder sigmoid), treinado nos normais de
+# treino para que o log do seu erro de reconstrução reproduza o do professor
+# (o autoencoder do artefato LATEST)
+STUDENT_ENCODING_DIM = 4
+STUDENT_ACTIVATION = 'linear'
+STUDENT_EPOCHS = 30
+STUDENT_BATCH_SIZE = 512
+STUDENT_LEARNING_RATE = 0.005
+
+# Perda máxima de AUC-PR (validação) do aluno em relação ao professor para
+# ele ser aprovado como pontuador de produção
+DISTILL_MAX_AUC_PR_LOSS = 0.02
+
+# Linhas da comparação de throughput professor x aluno (teste repetido)
+DISTILL_THROUGHPUT_ROWS = 1_000_000
+
+# Pontuador do --score-only e do servidor: 'teacher', 'student' ou 'auto'
+# ('auto' = o último aluno, se ele foi aprovado e destilado do professor usado)
+PRODUCTION_SCORER = 'auto'
+
 
 # =========================================================
 # 1. PREPARAÇÃO DOS DADOS (Mantido similar, com ajustes de tipo)
 # =========================================================
 
-def load_and_split_data(data_path, test_size=0.2): # Reduzi test_size para ter mais dados de treino
+class RowSubset:
+    """Subconjunto de linhas de uma matriz em disco (memmap), lido sob demanda."""
+
+    def __init__(self, base, indices):
+        self.base = base
+        # ordenado para leituras sequenciais no disco (o treino embaralha os lotes)
+        self.indices = np.sort(indices)
+        self.shape = (len(self.indices), base.shape[1])
+
+    def __len__(self):
+        return len(self.indices)
+
+def load_and_split_data(data_path, test_size=0.2, use_store=True, lazy_train=False): # Reduzi test_size para ter mais dados de treino
+    from sklearn.model_selection import train_test_split
+
+    # Feature store float32: normais e anomalias do treino já são fatias contíguas
+    store = open_feature_store(data_path) if use_store else None
+    if store is not None:
+        X_normal = store.segment('train_normal')
+        X_anomaly = store.segment('train_anomaly')
+
+        # Mesmo split de antes, feito sobre os índices das linhas
+        idx_train, idx_val = train_test_split(
+            np.arange(len(X_normal)), test_size=test_size, random_state=RANDOM_SEED
+        )
+        X_val_normal = X_normal[idx_val]
+        # lazy_train: o treino fica no disco e é lido em lotes (INPUT_PIPELINE='stream')
+        X_train_pure = RowSubset(X_normal, idx_train) if lazy_train else X_normal[idx_train]
+        X_val_combined = np.concatenate([X_val_normal, X_anomaly])
+        y_val_combined = np.concatenate([
+            np.zeros(len(X_val_normal), dtype=np.int8),
+            store.labels('train_anomaly')
+        ])
+
+        print(f"Treino Puro (Normal): {X_train_pure.shape}")
+        print(f"Validação (Normal+Fraude): {X_val_combined.shape}")
+
+        return X_train_pure, X_val_normal, X_val_combined, y_val_combined
+
     # Carregamento seguro
     try:
-        X_train = pd.read_csv(os.path.join(data_path, 'X_train_processed.csv'))
-        y_train = pd.read_csv(os.path.join(data_path, 'y_train.csv'))['Class'] # Atenção ao Y maiúsculo se for mock
+        X_train = load_table(data_path, 'X_train_processed')
+        y_train = load_table(data_path, 'y_train')['Class'] # Atenção ao Y maiúsculo se for mock
     except FileNotFoundError:
         print("Arquivos não encontrados. Verifique o caminho.")
         return None
@@ -76,6 +203,11 @@ def load_and_split_data(data_path, test_size=0.2): # Reduzi test_size para ter m
 # =========================================================
 
 def build_deep_autoencoder(input_dim, encoding_dim, dropout_rate=0.2):
+    import_tensorflow()
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import Input, Dense, Dropout, BatchNormalization
+    from tensorflow.keras.regularizers import l1
+
     input_layer = Input(shape=(input_dim,))
     
     # --- Encoder ---
@@ -101,122 +233,565 @@ def build_deep_autoencoder(input_dim, encoding_dim, dropout_rate=0.2):
     
     return Model(input_layer, output)
 
-def train_and_evaluate_run(params, X_train_pure, X_val_pure, X_val_combined, y_val_combined):
-    # Desempacotar parâmetros
-    encoding_dim = params['encoding_dim']
-    lr = params['learning_rate']
-    batch_size = params['batch_size']
-    epochs = params['epochs']
-    
-    autoencoder = build_deep_autoencoder(X_train_pure.shape[1], encoding_dim)
+def compile_autoencoder(params, input_dim):
+    tf = import_tensorflow()
+    autoencoder = build_deep_autoencoder(input_dim, params['encoding_dim'])
 
     autoencoder.compile(
-        optimizer=tf.keras.optimizers.Adam(learning_rate=lr),
-        loss='mean_squared_error' # MSE foca em penalizar grandes erros (fraudes)
+        optimizer=tf.keras.optimizers.Adam(learning_rate=params['learning_rate']),
+        loss='mean_squared_error', # MSE foca em penalizar grandes erros (fraudes)
+        jit_compile=JIT_COMPILE
     )
+    return autoencoder
 
-    # Callbacks para parar treino se não melhorar e reduzir LR se estagnar
-    callbacks = [
-        EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True, verbose=0),
-        ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=2, verbose=0)
-    ]
+def make_train_dataset(X_train, batch_size, seed=RANDOM_SEED):
+    """tf.data do treino: índices embaralhados por época -> lotes -> prefetch.
+
+    Com array em memória, a matriz vira um tensor residente e cada lote é um
+    gather vetorizado. Com RowSubset, os lotes são lidos do memmap em disco
+    (o page cache do sistema serve de cache entre as épocas).
+    """
+    tf = import_tensorflow()
+    n_features = X_train.shape[1]
+
+    if isinstance(X_train, RowSubset):
+        base = X_train.base
+        indices = X_train.indices
+
+        def read_rows(batch_idx):
+            return np.asarray(base[np.sort(batch_idx)], dtype=np.float32)
+
+        gather = lambda idx: tf.numpy_function(read_rows, [idx], tf.float32)
+    else:
+        indices = np.arange(len(X_train))
+        X_tensor = tf.constant(np.asarray(X_train, dtype=np.float32))
+        gather = lambda idx: tf.gather(X_tensor, idx)
+
+    def to_pair(idx):
+        x = tf.ensure_shape(gather(idx), [None, n_features])
+        return x, x
 
+    return (
+        tf.data.Dataset.from_tensor_slices(indices)
+        .shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+        .batch(batch_size)
+        .map(to_pair, num_parallel_calls=tf.data.AUTOTUNE)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+
+@lru_cache(maxsize=None)
+def keras_callbacks():
+    """(ThroughputLogger, ResumableEarlyStopping, ResumableReduceLROnPlateau).
+
+    As classes herdam de callbacks do Keras, então são definidas na primeira
+    chamada, depois de importar o TensorFlow.
+    """
+    import_tensorflow()
+    from tensorflow.keras.callbacks import Callback, EarlyStopping, ReduceLROnPlateau
+
+    class ThroughputLogger(Callback):
+        # Registra amostras/s de treino por época (sem o tempo de validação)
+        # no histórico do fit, na chave 'samples_per_sec'
+        def __init__(self, n_samples):
+            super().__init__()
+            self.n_samples = n_samples
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._start = time.perf_counter()
+            self._train_end = None
+
+        def on_test_begin(self, logs=None):
+            if self._train_end is None:
+                self._train_end = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            elapsed = (self._train_end or time.perf_counter()) - self._start
+            if logs is not None:
+                logs['samples_per_sec'] = self.n_samples / elapsed
+
+    class _ResumableMixin:
+        # Keras reinicia o estado dos callbacks a cada fit(); aqui o estado
+        # (paciência, melhor val_loss, melhores pesos) é mantido entre as rodadas
+        _started = False
+
+        def on_train_begin(self, logs=None):
+            if not self._started:
+                super().on_train_begin(logs)
+                self._started = True
+
+    class ResumableEarlyStopping(_ResumableMixin, EarlyStopping):
+        pass
+
+    class ResumableReduceLROnPlateau(_ResumableMixin, ReduceLROnPlateau):
+        pass
+
+    return ThroughputLogger, ResumableEarlyStopping, ResumableReduceLROnPlateau
+
+def fit_autoencoder(autoencoder, X_train_pure, X_val_pure, batch_size, epochs, callbacks,
+                    initial_epoch=0, pipeline=INPUT_PIPELINE):
     # Treino
     # Nota: Passamos X_train_pure como entrada E saída. 
     # O Dropout na primeira camada cuida do "ruído".
-    autoencoder.fit(
-        X_train_pure, X_train_pure,
+    ThroughputLogger = keras_callbacks()[0]
+    callbacks = list(callbacks) + [ThroughputLogger(len(X_train_pure))]
+
+    if pipeline == 'numpy' and not isinstance(X_train_pure, RowSubset):
+        return autoencoder.fit(
+            X_train_pure, X_train_pure,
+            initial_epoch=initial_epoch,
+            epochs=epochs,
+            batch_size=batch_size,
+            shuffle=True,
+            validation_data=(X_val_pure, X_val_pure),
+            callbacks=callbacks,
+            verbose=0
+        )
+
+    return autoencoder.fit(
+        make_train_dataset(X_train_pure, batch_size),
+        initial_epoch=initial_epoch,
         epochs=epochs,
-        batch_size=batch_size,
-        shuffle=True,
         validation_data=(X_val_pure, X_val_pure),
+        validation_batch_size=batch_size,
         callbacks=callbacks,
         verbose=0
     )
 
-    # Avaliação
-    reconstructions = autoencoder.predict(X_val_combined, verbose=0)
-    mse = np.mean(np.square(X_val_combined - reconstructions), axis=1)
+def make_callbacks(resumable=False):
+    # Callbacks para parar treino se não melhorar e reduzir LR se estagnar
+    import_tensorflow()
+    from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+
+    _, resumable_early_stopping, resumable_reduce_lr = keras_callbacks()
+    early_stopping = resumable_early_stopping if resumable else EarlyStopping
+    reduce_lr = resumable_reduce_lr if resumable else ReduceLROnPlateau
+    return [
+        early_stopping(monitor='val_loss', patience=5, restore_best_weights=True, verbose=0),
+        reduce_lr(monitor='val_loss', factor=0.5, patience=2, verbose=0)
+    ]
+
+def reconstruction_error(model, X, engine=SCORING_ENGINE):
+    """MSE de reconstrução por linha, pelo motor configurado."""
+    if engine == 'numpy':
+        return AutoencoderKernel.from_keras(model, KERNEL_WEIGHTS_DTYPE).score_samples(X)
+    reconstructions = model.predict(X, batch_size=PREDICT_BATCH_SIZE, verbose=0)
+    return np.mean(np.square(X - reconstructions), axis=1)
+
+def validation_auc_pr(autoencoder, X_val_combined, y_val_combined):
+    from sklearn.metrics import average_precision_score
+
+    mse = reconstruction_error(autoencoder, X_val_combined)
+
+    return average_precision_score(y_val_combined, mse)
+
+def train_and_evaluate_run(params, X_train_pure, X_val_pure, X_val_combined, y_val_combined):
+    # Desempacotar parâmetros
+    batch_size = params['batch_size']
+    epochs = params['epochs']
+    
+    autoencoder = compile_autoencoder(params, X_train_pure.shape[1])
+    callbacks = make_callbacks()
 
-    auc_pr = average_precision_score(y_val_combined, mse)
+    history = fit_autoencoder(
+        autoencoder, X_train_pure, X_val_pure, batch_size, epochs, callbacks
+    )
+    print(f"{np.mean(history.history['samples_per_sec']):.0f} amostras/s |", end=" ")
+
+    # Avaliação
+    auc_pr = validation_auc_pr(autoencoder, X_val_combined, y_val_combined)
     # auc_roc = roc_auc_score(y_val_combined, mse) # Opcional
 
     return auc_pr, autoencoder
 
+# =========================================================
+# 2.1 SUCCESSIVE HALVING (TUNAGEM COM ORÇAMENTO DE ÉPOCAS)
+# =========================================================
+
+def successive_halving_search(grid, X_train_pure, X_val_pure, X_val_combined, y_val_combined,
+                              min_epochs=HALVING_MIN_EPOCHS, eta=HALVING_ETA):
+    """Busca de hiperparâmetros por Successive Halving.
+
+    Todos os candidatos treinam `min_epochs` épocas e são avaliados (AUC-PR em
+    X_val_combined); só o melhor 1/eta continua, retomando dos próprios pesos
+    (e do estado do otimizador e dos callbacks) com orçamento eta vezes maior,
+    até o número de épocas do grid. Retorna (melhor_auc_pr, modelo, params,
+    épocas_gastas).
+    """
+    runs = [{
+        'params': params,
+        'model': compile_autoencoder(params, X_train_pure.shape[1]),
+        'callbacks': make_callbacks(resumable=True),
+        'epochs_done': 0,
+        'finished': False,
+        'auc_pr': -1,
+        'samples_per_sec': float('nan')
+    } for params in grid]
+
+    max_epochs = max(params['epochs'] for params in grid)
+    budget = min(min_epochs, max_epochs)
+    survivors = runs
+    total_epochs = 0
+    round_idx = 1
+
+    while True:
+        print(f"\n--- Rodada {round_idx}: {len(survivors)} candidato(s), orçamento {budget} épocas ---")
+        for run in survivors:
+            target = min(budget, run['params']['epochs'])
+            if not run['finished'] and run['epochs_done'] < target:
+                history = fit_autoencoder(
+                    run['model'], X_train_pure, X_val_pure,
+                    run['params']['batch_size'], target, run['callbacks'],
+                    initial_epoch=run['epochs_done']
+                )
+                run['epochs_done'] += len(history.epoch)
+                total_epochs += len(history.epoch)
+                run['samples_per_sec'] = np.mean(history.history['samples_per_sec'])
+                # EarlyStopping disparou: o candidato não treina mais
+                run['finished'] = (run['callbacks'][0].stopped_epoch > 0
+                                   or run['epochs_done'] >= run['params']['epochs'])
+
+            run['auc_pr'] = validation_auc_pr(run['model'], X_val_combined, y_val_combined)
+            print(f"{run['params']} | épocas: {run['epochs_done']} | "
+                  f"{run['samples_per_sec']:.0f} amostras/s | AUC-PR: {run['auc_pr']:.4f}")
+
+        # Ordenação estável: empates mantêm a ordem do grid
+        survivors = sorted(survivors, key=lambda run: -run['auc_pr'])
+        if budget >= max_epochs:
+            break
+        survivors = survivors[:max(1, math.ceil(len(survivors) / eta))]
+        budget = max_epochs if len(survivors) == 1 else min(budget * eta, max_epochs)
+        round_idx += 1
+
+    best = survivors[0]
+    return best['auc_pr'], best['model'], best['params'], total_epochs
+
 # =========================================================
 # 3. AVALIAÇÃO FINAL
 # =========================================================
 
-def generate_final_scores(best_model, data_path, target_recall=0.80):
-    # Carrega dados de teste
+def load_test_data(data_path):
+    """(X_test, y_test, ids_test), do feature store (view) se existir."""
+    store = open_feature_store(data_path)
+    if store is not None:
+        return store.segment('test'), store.labels('test'), store.ids('test')
+    X_test = load_table(data_path, 'X_test_processed').values.astype(np.float32)
+    y_test = load_table(data_path, 'y_test')['Class'].values
+    ids_test = load_table(data_path, 'ids_test')['id']
+    return X_test, y_test, ids_test
+
+def generate_final_scores(best_model, data_path, policy=THRESHOLD_POLICY, run=None):
+    from sklearn.metrics import classification_report, confusion_matrix
+
+    run = run or RunTelemetry('autoencoder', enabled=False)
     try:
-        X_test = pd.read_csv(os.path.join(data_path, 'X_test_processed.csv')).values.astype(np.float32)
-        y_test = pd.read_csv(os.path.join(data_path, 'y_test.csv'))['Class'].values
-        ids_test = pd.read_csv(os.path.join(data_path, 'ids_test.csv'))['id']
+        with run.stage('load_test') as stage:
+            X_test, y_test, ids_test = load_test_data(data_path)
+            stage.rows = len(X_test)
     except Exception as e:
         print(f"Erro ao carregar teste: {e}")
-        return
+        return None
 
     # Gera scores
-    reconstructions = best_model.predict(X_test, verbose=0)
-    anomaly_scores = np.mean(np.square(X_test - reconstructions), axis=1)
-
-    # Curva PR
-    precision, recall, thresholds = precision_recall_curve(y_test, anomaly_scores)
+    with run.stage('score', rows=len(X_test)):
+        anomaly_scores = reconstruction_error(best_model, X_test)
 
-    # Estratégia de Threshold: Buscar o limiar que garante X% de Recall (captura de fraude)
+    # Threshold pela política configurada (uma ordenação dos scores).
     # Em fraude, geralmente preferimos Recall alto (pegar a fraude) mesmo que Precision caia um pouco
-    valid_idxs = np.where(recall >= target_recall)[0]
-    
-    if len(valid_idxs) > 0:
-        best_idx = valid_idxs[-1] # O último índice onde recall >= target (maior precision possível)
-        threshold = thresholds[best_idx]
-    else:
-        best_idx = np.argmax(recall) # Fallback
-        threshold = thresholds[best_idx]
-
-    predictions = (anomaly_scores > threshold).astype(int)
+    with run.stage('threshold', rows=len(X_test)):
+        threshold = select_threshold(y_test, anomaly_scores, policy)
+        predictions = flag_anomalies(anomaly_scores, threshold)
 
-    print(f"\n🎯 Threshold escolhido: {threshold:.6f} (Para Recall ~{target_recall:.0%})")
+    print(f"\n{describe(threshold)}")
     print("\n--- RELATÓRIO FINAL ---")
     print(classification_report(y_test, predictions, target_names=['Normal', 'Fraude']))
     
     # Matriz de Confusão simplificada
-    from sklearn.metrics import confusion_matrix
     cm = confusion_matrix(y_test, predictions)
     print(f"Matriz de Confusão:\n{cm}")
 
     # =========================================================
     # EXPORTAÇÃO FINAL (CONTRATO DE SAÍDA)
     # =========================================================
-    df_output = pd.DataFrame({
-        'id': ids_test,
-        'anomaly_score': anomaly_scores,
-        'is_anomaly': predictions
-    })
+    with run.stage('write', rows=len(X_test)):
+        df_output = pd.DataFrame({
+            'id': ids_test,
+            'anomaly_score': anomaly_scores,
+            'is_anomaly': predictions
+        })
 
-    output_file = os.path.join(OUTPUT_PATH, 'autoencoder_predictions.csv')
-    df_output.to_csv(output_file, index=False)
+        output_file = os.path.join(OUTPUT_PATH, 'autoencoder_predictions.csv')
+        df_output.to_csv(output_file, index=False)
 
     print(f"\n✅ Arquivo de predições salvo em: {output_file}")
+    return threshold
 
 
 # =========================================================
-# 4. EXECUÇÃO PRINCIPAL
+# 4. ARTEFATO (SCORE-ONLY)
+# =========================================================
+
+def save_autoencoder_artifact(model, params, threshold, auc_pr):
+    """Salva os pesos do autoencoder e o threshold em artifacts/autoencoder/<versão>/.
+
+    `threshold` é o resumo devolvido por `select_threshold` (valor + política).
+    """
+    weights = {f'w{i}': w for i, w in enumerate(model.get_weights())}
+    return save_artifact('autoencoder', 'keras_autoencoder', weights, {
+        'params': params,
+        'input_dim': int(model.input_shape[1]),
+        'layers': layer_spec(model),
+        'threshold': threshold['threshold'],
+        'threshold_rule': THRESHOLD_RULE,
+        'threshold_policy': threshold,
+        'metrics': {'auc_pr_val': float(auc_pr)},
+        'tensorflow_version': import_tensorflow().__version__,
+        'scaler_version': artifact_version(DATA_PATH, 'scaler'),
+    })
+
+def autoencoder_from_artifact(manifest, arrays):
+    """Reconstrói a arquitetura e carrega os pesos (sem compilar: só inferência)."""
+    model = build_deep_autoencoder(manifest['input_dim'], manifest['params']['encoding_dim'])
+    model.set_weights([arrays[f'w{i}'] for i in range(len(arrays))])
+    return model
+
+def autoencoder_scorer(manifest, arrays, engine=SCORING_ENGINE):
+    """Função X -> MSE por linha a partir do artefato.
+
+    Com o motor 'numpy' o TensorFlow não é importado.
+    """
+    if engine == 'numpy':
+        return AutoencoderKernel.from_artifact(manifest, arrays, KERNEL_WEIGHTS_DTYPE).score_samples
+    model = autoencoder_from_artifact(manifest, arrays)
+    return lambda X: reconstruction_error(model, X, engine)
+
+def approved_student(teacher_version):
+    """(manifest, arrays) do último aluno, se aprovado e destilado deste professor; senão None."""
+    if latest_version('autoencoder_student') is None:
+        return None
+    manifest, arrays = load_artifact('autoencoder_student')
+    if manifest['selected'] and manifest['teacher_version'] == teacher_version:
+        return manifest, arrays
+    return None
+
+def production_scorer(version=None, scorer=PRODUCTION_SCORER):
+    """(manifest, função X -> score) do pontuador de produção (PRODUCTION_SCORER).
+
+    `version` é a versão do artefato do professor ('teacher'/'auto') ou do
+    aluno ('student'). O manifest devolvido traz o threshold do pontuador
+    escolhido, e `manifest['name']` diz qual foi.
+    """
+    if scorer == 'student':
+        manifest, arrays = load_artifact('autoencoder_student', version)
+    else:
+        manifest, arrays = load_artifact('autoencoder', version)
+        student = approved_student(manifest['version']) if scorer == 'auto' else None
+        if student is None:
+            return manifest, autoencoder_scorer(manifest, arrays)
+        manifest, arrays = student
+    # o aluno é sempre pontuado pelo kernel NumPy (a arquitetura vem do manifest)
+    return manifest, AutoencoderKernel.from_artifact(manifest, arrays,
+                                                     KERNEL_WEIGHTS_DTYPE).score_samples
+
+def score_only(input_path, output_path, processed=False, version=None):
+    run = RunTelemetry('autoencoder', OUTPUT_PATH, mode='score_only', engine=SCORING_ENGINE,
+                       production_scorer=PRODUCTION_SCORER)
+    start = time.perf_counter()
+    with run.stage('load_artifact'):
+        manifest, score = production_scorer(version)
+    load_seconds = time.perf_counter() - start
+
+    with run.stage('load') as stage:
+        ids, X = load_scoring_input(input_path, processed, manifest.get('scaler_version'))
+        stage.rows = len(ids)
+    with run.stage('score', rows=len(ids)):
+        anomaly_scores = score(X)
+    with run.stage('threshold', rows=len(ids)):
+        predictions = flag_anomalies(anomaly_scores, manifest)
+    with run.stage('write', rows=len(ids)):
+        write_predictions(output_path, ids, anomaly_scores, predictions)
+    run.finish(artifact=manifest['name'], artifact_version=manifest['version'])
+
+    print(f"Artefato {manifest['name']}/{manifest['version']} carregado em {load_seconds:.3f}s")
+    print(f"{len(ids)} linhas pontuadas em {time.perf_counter() - start:.2f}s "
+          f"({predictions.sum()} anomalias) -> {output_path}")
+
+# =========================================================
+# 5. DESTILAÇÃO (ALUNO LEVE)
+# =========================================================
+
+def build_student(input_dim, encoding_dim=STUDENT_ENCODING_DIM, activation=STUDENT_ACTIVATION):
+    """(aluno, modelo de treino): o aluno reconstrói X; o de treino devolve log(MSE do aluno)."""
+    tf = import_tensorflow()
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import Input, Dense, Lambda
+
+    input_layer = Input(shape=(input_dim,))
+    x = Dense(encoding_dim, activation=activation)(input_layer)
+    # Saída sigmoid, como no professor: boa parte do erro dele vem de features
+    # fora de [0, 1], que o aluno reproduz pela mesma saída
+    output = Dense(input_dim, activation='sigmoid')(x)
+    student = Model(input_layer, output)
+
+    log_mse = Lambda(lambda t: tf.math.log(
+        tf.reduce_mean(tf.square(t[0] - t[1]), axis=1, keepdims=True) + 1e-12
+    ))([input_layer, output])
+    return student, Model(input_layer, log_mse)
+
+def fit_student(X_train, teacher_train, X_val, teacher_val):
+    """Treina o aluno para que log(MSE do aluno) reproduza log(score do professor)."""
+    tf = import_tensorflow()
+    student, trainer = build_student(X_train.shape[1])
+    trainer.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=STUDENT_LEARNING_RATE),
+        loss='mean_squared_error',
+        jit_compile=JIT_COMPILE
+    )
+    # log: o erro de reconstrução tem cauda longa, e o aluno erraria sobretudo a cauda
+    y_train = np.log(np.maximum(teacher_train, 1e-12))[:, None]
+    y_val = np.log(np.maximum(teacher_val, 1e-12))[:, None]
+    trainer.fit(
+        X_train, y_train,
+        epochs=STUDENT_EPOCHS,
+        batch_size=STUDENT_BATCH_SIZE,
+        shuffle=True,
+        validation_data=(X_val, y_val),
+        callbacks=make_callbacks(),
+        verbose=0
+    )
+    return student
+
+def scoring_throughput(score_fn, X, rows=DISTILL_THROUGHPUT_ROWS):
+    """Linhas/s de `score_fn` em `rows` linhas (X repetido até o tamanho pedido)."""
+    X_big = np.tile(X, (-(-rows // len(X)), 1))[:rows]
+    start = time.perf_counter()
+    score_fn(X_big)
+    return rows / (time.perf_counter() - start)
+
+def save_student_artifact(student, teacher_manifest, threshold, report):
+    """Salva o aluno em artifacts/autoencoder_student/<versão>/ (com a versão do professor)."""
+    weights = {f'w{i}': w for i, w in enumerate(student.get_weights())}
+    return save_artifact('autoencoder_student', 'distilled_autoencoder', weights, {
+        'params': {'encoding_dim': STUDENT_ENCODING_DIM, 'activation': STUDENT_ACTIVATION,
+                   'epochs': STUDENT_EPOCHS,
+                   'batch_size': STUDENT_BATCH_SIZE, 'learning_rate': STUDENT_LEARNING_RATE},
+        'input_dim': int(student.input_shape[1]),
+        'layers': layer_spec(student),
+        'teacher_version': teacher_manifest['version'],
+        'selected': report['selected'],
+        'max_auc_pr_loss': DISTILL_MAX_AUC_PR_LOSS,
+        'threshold': threshold['threshold'],
+        'threshold_rule': THRESHOLD_RULE,
+        'threshold_policy': threshold,
+        'metrics': report,
+        'tensorflow_version': import_tensorflow().__version__,
+        'scaler_version': teacher_manifest.get('scaler_version'),
+    })
+
+def distill(data_path=DATA_PATH, version=None):
+    """Destila o autoencoder salvo em um aluno leve e decide se ele vai para produção.
+
+    O aluno é aprovado quando a AUC-PR dele na validação (normais + fraudes)
+    fica no máximo DISTILL_MAX_AUC_PR_LOSS abaixo da do professor.
+    """
+    from sklearn.metrics import average_precision_score
+
+    np.random.seed(RANDOM_SEED)
+    run = RunTelemetry('autoencoder', OUTPUT_PATH, mode='distill',
+                       encoding_dim=STUDENT_ENCODING_DIM, max_auc_pr_loss=DISTILL_MAX_AUC_PR_LOSS)
+    with run.stage('load_artifact'):
+        teacher_manifest, teacher_arrays = load_artifact('autoencoder', version)
+        teacher = AutoencoderKernel.from_artifact(teacher_manifest, teacher_arrays,
+                                                  KERNEL_WEIGHTS_DTYPE)
+    with run.stage('load') as stage:
+        data = load_and_split_data(data_path)
+        if data is None:
+            return None
+        X_train_pure, X_val_pure, X_val_combined, y_val_combined = data
+        X_test, y_test, _ = load_test_data(data_path)
+        X_test = np.asarray(X_test, dtype=np.float32)
+        stage.rows = len(X_train_pure) + len(X_val_combined) + len(X_test)
+
+    # Rótulos do aluno: o score do professor nos normais
+    with run.stage('teacher_score', rows=len(X_train_pure) + len(X_val_pure)):
+        teacher_train = teacher.score_samples(X_train_pure)
+        teacher_val = teacher.score_samples(X_val_pure)
+
+    with run.stage('fit', rows=len(X_train_pure)):
+        student_model = fit_student(X_train_pure, teacher_train, X_val_pure, teacher_val)
+    student = AutoencoderKernel.from_keras(student_model, KERNEL_WEIGHTS_DTYPE)
+
+    with run.stage('score', rows=2 * (len(X_val_combined) + len(X_test))):
+        scores = {name: (kernel.score_samples(X_val_combined), kernel.score_samples(X_test))
+                  for name, kernel in (('teacher', teacher), ('student', student))}
+    auc_pr = {name: {'val': float(average_precision_score(y_val_combined, val)),
+                     'test': float(average_precision_score(y_test, test))}
+              for name, (val, test) in scores.items()}
+
+    with run.stage('throughput', rows=2 * DISTILL_THROUGHPUT_ROWS):
+        throughput = {name: scoring_throughput(kernel.score_samples, X_test)
+                      for name, kernel in (('teacher', teacher), ('student', student))}
+
+    auc_pr_loss = auc_pr['teacher']['val'] - auc_pr['student']['val']
+    report = {
+        'auc_pr': auc_pr,
+        'auc_pr_loss_val': auc_pr_loss,
+        # fidelidade: correlação dos log-scores no teste
+        'log_score_corr_test': float(np.corrcoef(np.log(scores['teacher'][1]),
+                                                 np.log(scores['student'][1]))[0, 1]),
+        'rows_per_sec': throughput,
+        'speedup': throughput['student'] / throughput['teacher'],
+        'selected': bool(auc_pr_loss <= DISTILL_MAX_AUC_PR_LOSS),
+    }
+
+    # Threshold do aluno pela mesma política do professor, na escala do aluno
+    with run.stage('threshold', rows=len(X_test)):
+        threshold = select_threshold(y_test, scores['student'][1], THRESHOLD_POLICY)
+
+    print(f"\nProfessor: autoencoder/{teacher_manifest['version']} | "
+          f"aluno: {X_test.shape[1]}-{STUDENT_ENCODING_DIM}-{X_test.shape[1]}")
+    print(f"AUC-PR validação: professor {auc_pr['teacher']['val']:.4f} | "
+          f"aluno {auc_pr['student']['val']:.4f} (perda {auc_pr_loss:+.4f}, "
+          f"tolerância {DISTILL_MAX_AUC_PR_LOSS})")
+    print(f"AUC-PR teste:     professor {auc_pr['teacher']['test']:.4f} | "
+          f"aluno {auc_pr['student']['test']:.4f}")
+    print(f"Correlação dos log-scores (teste): {report['log_score_corr_test']:.4f}")
+    print(f"Throughput: professor {throughput['teacher']:,.0f} linhas/s | "
+          f"aluno {throughput['student']:,.0f} linhas/s ({report['speedup']:.2f}x)")
+    print(describe(threshold))
+    print("Aluno APROVADO para produção" if report['selected']
+          else "Aluno REPROVADO: o --score-only continua com o professor")
+
+    with run.stage('write_artifact'):
+        artifact_path = save_student_artifact(student_model, teacher_manifest, threshold, report)
+    print(f"Artefato salvo em: {artifact_path}")
+    run.finish(**{key: report[key] for key in ('auc_pr_loss_val', 'speedup', 'selected')})
+    return report
+
+# =========================================================
+# 6. EXECUÇÃO PRINCIPAL
 # =========================================================
 
 def main():
+    from sklearn.model_selection import ParameterGrid
+
     if not os.path.exists(DATA_PATH):
         print("Gere os mocks primeiro!")
         return
-        
-    data = load_and_split_data(DATA_PATH)
+
+    np.random.seed(RANDOM_SEED)
+    os.makedirs(OUTPUT_PATH, exist_ok=True)
+
+    run = RunTelemetry('autoencoder', OUTPUT_PATH, mode='train', run_tuning=RUN_TUNING,
+                       input_pipeline=INPUT_PIPELINE, threshold_policy=THRESHOLD_POLICY)
+    with run.stage('load') as stage:
+        data = load_and_split_data(DATA_PATH, lazy_train=(INPUT_PIPELINE == 'stream'))
+        stage.rows = 0 if data is None else len(data[0]) + len(data[2])
     if data is None: return
     X_train_pure, X_val_pure, X_val_combined, y_val_combined = data
 
-    if RUN_TUNING == 1:
+    if RUN_TUNING in (1, 2):
         # =========================
-        # MODO TUNAGEM (GRID SEARCH)
+        # MODO TUNAGEM (GRID SEARCH / SUCCESSIVE HALVING)
         # =========================
         param_grid = {
             'encoding_dim': [4, 8],
@@ -243,25 +818,39 @@ def main():
     best_model = None
     best_params = None
 
-    print("\n=============================================")
-    print(f"INICIANDO GRID SEARCH ({len(grid)} combinações)")
-    print("=============================================")
+    if RUN_TUNING == 2:
+        print("\n=============================================")
+        print(f"INICIANDO SUCCESSIVE HALVING ({len(grid)} combinações)")
+        print("=============================================")
 
-    for i, params in enumerate(grid):
-        print(f"[{i+1}/{len(grid)}] Testando: {params} ...", end=" ")
-        
-        try:
-            auc_pr, model = train_and_evaluate_run(
-                params, X_train_pure, X_val_pure, X_val_combined, y_val_combined
+        with run.stage('fit'):
+            best_auc_pr, best_model, best_params, total_epochs = successive_halving_search(
+                grid, X_train_pure, X_val_pure, X_val_combined, y_val_combined
             )
-            print(f"AUC-PR: {auc_pr:.4f}")
-
-            if auc_pr > best_auc_pr:
-                best_auc_pr = auc_pr
-                best_model = model
-                best_params = params
-        except Exception as e:
-            print(f"Erro: {e}")
+        grid_epochs = sum(params['epochs'] for params in grid)
+        print(f"\nÉpocas treinadas: {total_epochs} "
+              f"(grid exaustivo: até {grid_epochs}, {total_epochs / grid_epochs:.0%} do orçamento)")
+    else:
+        print("\n=============================================")
+        print(f"INICIANDO GRID SEARCH ({len(grid)} combinações)")
+        print("=============================================")
+
+        for i, params in enumerate(grid):
+            print(f"[{i+1}/{len(grid)}] Testando: {params} ...", end=" ")
+            
+            try:
+                with run.stage('fit', rows=len(X_train_pure)):
+                    auc_pr, model = train_and_evaluate_run(
+                        params, X_train_pure, X_val_pure, X_val_combined, y_val_combined
+                    )
+                print(f"AUC-PR: {auc_pr:.4f}")
+
+                if auc_pr > best_auc_pr:
+                    best_auc_pr = auc_pr
+                    best_model = model
+                    best_params = params
+            except Exception as e:
+                print(f"Erro: {e}")
 
     print("\n🏆 MELHOR MODELO ENCONTRADO")
     print(f"Params: {best_params}")
@@ -269,7 +858,30 @@ def main():
 
     if best_model:
         # Avalia no Teste (Simulando produção)
-        # Definimos target_recall=0.8 (queremos pegar 80% das fraudes)
-        generate_final_scores(best_model, DATA_PATH, target_recall=0.8)
-
-main()
\ No newline at end of file
+        # Threshold pela THRESHOLD_POLICY (padrão: recall de 80% das fraudes)
+        threshold = generate_final_scores(best_model, DATA_PATH, run=run)
+        if threshold is not None:
+            with run.stage('write_artifact'):
+                artifact_path = save_autoencoder_artifact(best_model, best_params, threshold,
+                                                          best_auc_pr)
+            print(f"Artefato salvo em: {artifact_path}")
+
+    print(f"Pico de memória (RSS): {peak_rss_mb():.1f} MB")
+    telemetry_path = run.finish(best_params=best_params, auc_pr=best_auc_pr)
+    if telemetry_path:
+        print(f"Telemetria salva em: {telemetry_path}")
+
+if __name__ == "__main__":
+    parser = score_only_parser(
+        "Autoencoder: treino completo, destilação ou pontuação com o artefato salvo.",
+        os.path.join(OUTPUT_PATH, 'autoencoder_predictions.csv')
+    )
+    parser.add_argument('--distill', action='store_true',
+                        help='destila o autoencoder salvo (--version) em um aluno leve')
+    args = parse_score_only_args(parser)
+    if args.score_only:
+        score_only(args.input, args.output, args.processed, args.version)
+    elif args.distill:
+        distill(DATA_PATH, args.version)
+    else:
+        main()
@@ -0,0 +1,371 @@
+"""Cascata GMM -> autoencoder: o autoencoder só pontua a faixa incerta do GMM.
+
+Toda transação é pontuada pelo kernel NumPy do GMM (barato). Dois cortes no
+score do GMM, calibrados com rótulos, decidem a maior parte do tráfego:
+
+* abaixo de `low`: normal aceito (o corte mantém acima dele pelo menos
+  `LOW_RECALL` das fraudes de calibração);
+* a partir de `high`: anomalia aceita (precision >= `HIGH_PRECISION` acima
+  dele);
+* entre os dois: segundo estágio, com o autoencoder.
+
+O `anomaly_score` final é `estágio + posição dentro do estágio`, em três
+faixas ordenadas: [0, 1] normais aceitos, [1, 2] faixa incerta e [2, 3]
+anomalias aceitas. Nos estágios aceitos, a posição é o quantil do score do GMM
+na calibração; na faixa incerta, a média ponderada (`AE_WEIGHT`) dos quantis
+do GMM e do erro de reconstrução entre as transações da faixa. O threshold
+(`THRESHOLD_POLICY`) é escolhido nesse score e limitado à faixa incerta, então
+normais aceitos nunca viram alerta e anomalias aceitas sempre viram.
+
+A calibração usa a validação do feature store (ou o teste, sem ele). O teste
+é pontuado pela cascata e por cada modelo sozinho, e o relatório mostra a
+fração do tráfego que chega ao autoencoder, o throughput de ponta a ponta e a
+AUC-PR de cada um. Os cortes, os quantis e as versões dos artefatos `gmm` e
+`autoencoder` usados vão para o artefato `cascade`.
+
+Uso (a partir da raiz do repositório, depois de treinar o GMM e o autoencoder):
+    python src/models/cascade.py
+    python src/models/cascade.py --score-only --input novas.csv [--output ...]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from artifacts import (
+    load_artifact, load_scoring_input, parse_score_only_args, save_artifact,
+    score_only_parser, write_predictions
+)
+from data_contract import artifact_version, load_table
+from feature_store import open_feature_store
+from gmm_kernel import GMMKernel
+from metrics import RankedScores
+from telemetry import RunTelemetry, peak_rss_mb
+from thresholds import THRESHOLD_RULE, describe, flag_anomalies, select_threshold, threshold_curve
+import autoencoder
+import gmm
+
+# =========================================================
+# CONFIGURAÇÕES GERAIS
+# =========================================================
+DATA_PATH = 'data/processed'
+OUTPUT_PATH = 'outputs'
+OUTPUT_FILE = 'cascade_predictions.csv'
+
+# Corte inferior: maior score do GMM que ainda mantém acima dele esta fração
+# das fraudes de calibração (o resto é aceito como normal sem o autoencoder)
+LOW_RECALL = 0.99
+
+# Corte superior: menor score do GMM com esta precision acima dele
+HIGH_PRECISION = 0.99
+
+# Peso do autoencoder na faixa incerta (0 = só GMM, 1 = só autoencoder)
+AE_WEIGHT = 0.5
+
+# Pontos da tabela de quantis (ECDF) de cada score guardada no artefato
+N_QUANTILES = 1001
+
+# Política do threshold (thresholds.py), aplicada ao score da cascata
+THRESHOLD_POLICY = {'name': 'target_recall', 'recall': 0.80}
+
+# =========================================================
+# 1. DETECTOR
+# =========================================================
+
+def _quantile_table(values):
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return np.zeros(N_QUANTILES)
+    return np.quantile(values, np.linspace(0, 1, N_QUANTILES))
+
+def _ecdf(table, values):
+    """Posição (0 a 1) de `values` na tabela de quantis."""
+    return np.interp(values, table, np.linspace(0, 1, len(table)))
+
+def autoencoder_scorer(model, batch_size=autoencoder.PREDICT_BATCH_SIZE):
+    """Erro de reconstrução (MSE por linha), como no autoencoder.py.
+
+    Usa um grafo único para qualquer tamanho de lote (como o servidor): a
+    faixa incerta costuma ter poucas linhas, e o custo fixo de cada
+    `predict` dominaria o segundo estágio.
+    """
+    tf = autoencoder.import_tensorflow()
+
+    @tf.function(input_signature=[tf.TensorSpec([None, model.input_shape[1]], tf.float32)])
+    def reconstruct(X):
+        return model(X, training=False)
+
+    def score(X):
+        X = np.asarray(X, dtype=np.float32)
+        reconstructions = np.concatenate([
+            reconstruct(X[start:start + batch_size]).numpy()
+            for start in range(0, len(X), batch_size)
+        ]) if len(X) else np.empty_like(X)
+        return np.mean(np.square(X - reconstructions), axis=1)
+    return score
+
+class CascadeDetector:
+    """GMM em todas as linhas; autoencoder só em low <= score do GMM < high.
+
+    `ae_factory` constrói a função de pontuação do autoencoder na primeira
+    vez que algum lote tem linhas na faixa incerta: lotes decididos só pelo
+    GMM não importam o TensorFlow.
+    """
+
+    def __init__(self, kernel, ae_factory, low, high, gmm_table, gmm_band_table,
+                 ae_band_table, ae_weight=AE_WEIGHT):
+        self.kernel = kernel
+        self._ae_factory = ae_factory
+        self._ae_score = None
+        self.low = float(low)
+        self.high = float(high)
+        self.gmm_table = gmm_table
+        self.gmm_band_table = gmm_band_table
+        self.ae_band_table = ae_band_table
+        self.ae_weight = ae_weight
+
+    @classmethod
+    def calibrate(cls, kernel, ae_factory, X, y, low_recall=LOW_RECALL,
+                  high_precision=HIGH_PRECISION, ae_weight=AE_WEIGHT):
+        """Escolhe os cortes e as tabelas de quantis em dados rotulados."""
+        gmm_scores = -kernel.score_samples(X)
+        low = select_threshold(y, gmm_scores, {'name': 'target_recall',
+                                               'recall': low_recall})['threshold']
+        high = select_threshold(y, gmm_scores, {'name': 'target_precision',
+                                                'precision': high_precision})['threshold']
+        # Em dados bem separados, a precision alvo pode valer abaixo de low:
+        # a faixa incerta fica vazia e o GMM decide tudo
+        high = max(high, low)
+
+        band = (gmm_scores >= low) & (gmm_scores < high)
+        detector = cls(kernel, ae_factory, low, high, _quantile_table(gmm_scores),
+                       _quantile_table(gmm_scores[band]), None, ae_weight)
+        ae_band = detector.ae_score(X[band]) if band.any() else np.zeros(0)
+        detector.ae_band_table = _quantile_table(ae_band)
+        return detector
+
+    def ae_score(self, X):
+        if self._ae_score is None:
+            self._ae_score = self._ae_factory()
+        return self._ae_score(X)
+
+    def score(self, X, gmm_scores=None):
+        """Retorna (anomaly_score, máscara das linhas do segundo estágio)."""
+        if gmm_scores is None:
+            gmm_scores = -self.kernel.score_samples(X)
+        band = (gmm_scores >= self.low) & (gmm_scores < self.high)
+
+        stage = np.where(gmm_scores >= self.high, 2.0, np.where(band, 1.0, 0.0))
+        within = _ecdf(self.gmm_table, gmm_scores)
+        if band.any():
+            rows = np.flatnonzero(band)
+            within[rows] = ((1 - self.ae_weight) * _ecdf(self.gmm_band_table, gmm_scores[rows])
+                            + self.ae_weight * _ecdf(self.ae_band_table,
+                                                     self.ae_score(X[rows])))
+        return stage + within, band
+
+def clip_threshold(y, scores, policy=THRESHOLD_POLICY):
+    """Threshold da política, limitado à faixa incerta [1, 2]."""
+    summary = select_threshold(y, scores, policy)
+    clipped = min(max(summary['threshold'], 1.0), 2.0)
+    if clipped != summary['threshold']:
+        summary = threshold_curve(y, scores).at_threshold(clipped)
+        summary['policy'] = dict(policy, clipped=True)
+    return summary
+
+# =========================================================
+# 2. DADOS
+# =========================================================
+
+def load_calibration_data(data_path, use_store=True):
+    # Validação do feature store; sem ela, o teste (como na varredura do DBSCAN)
+    store = open_feature_store(data_path) if use_store else None
+    if store is not None:
+        return np.asarray(store.segment('val')), store.labels('val'), 'validação'
+    X_test = load_table(data_path, 'X_test_processed').values.astype(np.float32)
+    y_test = load_table(data_path, 'y_test')['Class'].values
+    return X_test, y_test, 'teste'
+
+def load_test_data(data_path):
+    _, X_test, y_test, ids_test = gmm.load_data(data_path)
+    return np.asarray(X_test, dtype=np.float32), np.asarray(y_test), np.asarray(ids_test)
+
+# =========================================================
+# 3. ARTEFATO (SCORE-ONLY)
+# =========================================================
+
+def load_stage_models(gmm_version=None, autoencoder_version=None):
+    """(kernel do GMM, fábrica do autoencoder, manifest gmm, manifest autoencoder).
+
+    Os pesos do autoencoder são lidos já aqui; o kernel NumPy (ou, com
+    `autoencoder.SCORING_ENGINE = 'keras'`, a arquitetura e o TensorFlow) só
+    quando a fábrica é chamada.
+    """
+    gmm_manifest, gmm_arrays = load_artifact('gmm', gmm_version)
+    kernel = GMMKernel.from_artifact(gmm_manifest, gmm_arrays, gmm.SCORE_DTYPE)
+    ae_manifest, ae_arrays = load_artifact('autoencoder', autoencoder_version)
+
+    def ae_factory():
+        if autoencoder.SCORING_ENGINE == 'numpy':
+            return autoencoder.autoencoder_scorer(ae_manifest, ae_arrays)
+        return autoencoder_scorer(autoencoder.autoencoder_from_artifact(ae_manifest, ae_arrays))
+
+    return kernel, ae_factory, gmm_manifest, ae_manifest
+
+def save_cascade_artifact(detector, threshold, gmm_manifest, ae_manifest, report):
+    """Salva cortes, quantis e versões dos estágios em artifacts/cascade/<versão>/."""
+    return save_artifact('cascade', 'gmm_autoencoder_cascade', {
+        'gmm_table': detector.gmm_table,
+        'gmm_band_table': detector.gmm_band_table,
+        'ae_band_table': detector.ae_band_table,
+    }, {
+        'params': {'low_recall': LOW_RECALL, 'high_precision': HIGH_PRECISION,
+                   'ae_weight': detector.ae_weight},
+        'low': detector.low,
+        'high': detector.high,
+        'gmm_version': gmm_manifest['version'],
+        'autoencoder_version': ae_manifest['version'],
+        'threshold': threshold['threshold'],
+        'threshold_rule': THRESHOLD_RULE,
+        'threshold_policy': threshold,
+        'metrics': report,
+        'scaler_version': artifact_version(DATA_PATH, 'scaler'),
+    })
+
+def cascade_from_artifact(manifest, arrays):
+    kernel, ae_factory, _, _ = load_stage_models(manifest['gmm_version'],
+                                                 manifest['autoencoder_version'])
+    return CascadeDetector(kernel, ae_factory, manifest['low'], manifest['high'],
+                           arrays['gmm_table'], arrays['gmm_band_table'],
+                           arrays['ae_band_table'], manifest['params']['ae_weight'])
+
+def score_only(input_path, output_path, processed=False, version=None):
+    run = RunTelemetry('cascade', OUTPUT_PATH, mode='score_only')
+    start = time.perf_counter()
+    with run.stage('load_artifact'):
+        manifest, arrays = load_artifact('cascade', version)
+        detector = cascade_from_artifact(manifest, arrays)
+
+    with run.stage('load') as stage:
+        ids, X = load_scoring_input(input_path, processed, manifest.get('scaler_version'))
+        stage.rows = len(ids)
+    score_start = time.perf_counter()
+    with run.stage('score', rows=len(ids)):
+        scores, band = detector.score(X)
+    score_seconds = time.perf_counter() - score_start
+    with run.stage('threshold', rows=len(ids)):
+        y_pred = flag_anomalies(scores, manifest)
+    with run.stage('write', rows=len(ids)):
+        write_predictions(output_path, ids, scores, y_pred)
+    run.finish(artifact_version=manifest['version'], stage_two_fraction=float(band.mean()))
+
+    print(f"Artefato cascade/{manifest['version']} "
+          f"(gmm/{manifest['gmm_version']}, autoencoder/{manifest['autoencoder_version']})")
+    # com linhas na faixa incerta, o tempo inclui montar o autoencoder
+    print(f"Segundo estágio: {band.sum()} de {len(ids)} linhas ({band.mean():.1%}) | "
+          f"pontuação: {len(ids) / max(score_seconds, 1e-9):,.0f} linhas/s")
+    print(f"{len(ids)} linhas pontuadas em {time.perf_counter() - start:.2f}s "
+          f"({y_pred.sum()} anomalias) -> {output_path}")
+
+# =========================================================
+# 4. EXECUÇÃO PRINCIPAL
+# =========================================================
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def compare_on_test(detector, X_test, y_test):
+    """Cascata contra cada modelo sozinho no teste: AUC-PR e throughput."""
+    # Aquece o autoencoder (construção do modelo e do grafo) fora das medições
+    detector.ae_score(X_test[:1])
+
+    gmm_scores, gmm_seconds = _timed(lambda X: -detector.kernel.score_samples(X), X_test)
+    ae_scores, ae_seconds = _timed(detector.ae_score, X_test)
+    (scores, band), cascade_seconds = _timed(detector.score, X_test)
+
+    n_rows = len(X_test)
+    auc_pr = {name: RankedScores(y_test, s).curve_metrics()[1]
+              for name, s in (('gmm', gmm_scores), ('autoencoder', ae_scores),
+                              ('cascade', scores))}
+    report = {
+        'stage_two_fraction': float(band.mean()),
+        'stage_two_fraud_fraction': float(band[y_test == 1].mean()) if (y_test == 1).any() else 0.0,
+        'rows_per_sec': {'gmm': n_rows / gmm_seconds, 'autoencoder': n_rows / ae_seconds,
+                         'cascade': n_rows / cascade_seconds},
+        'speedup_vs_autoencoder': ae_seconds / cascade_seconds,
+        'auc_pr_test': auc_pr,
+        'auc_pr_delta': {'vs_gmm': auc_pr['cascade'] - auc_pr['gmm'],
+                         'vs_autoencoder': auc_pr['cascade'] - auc_pr['autoencoder']},
+    }
+    return scores, report
+
+def print_report(report, n_rows):
+    rps, auc = report['rows_per_sec'], report['auc_pr_test']
+    table = pd.DataFrame({
+        'linhas/s': [rps['gmm'], rps['autoencoder'], rps['cascade']],
+        'AUC-PR': [auc['gmm'], auc['autoencoder'], auc['cascade']],
+    }, index=['GMM', 'Autoencoder', 'Cascata'])
+    print(f"\nTeste ({n_rows} linhas):")
+    print(table.to_string(formatters={'linhas/s': '{:,.0f}'.format, 'AUC-PR': '{:.4f}'.format}))
+    print(f"\nSegundo estágio: {report['stage_two_fraction']:.1%} do tráfego "
+          f"({report['stage_two_fraud_fraction']:.1%} das fraudes)")
+    print(f"Throughput de ponta a ponta: {report['speedup_vs_autoencoder']:.1f}x o autoencoder sozinho")
+    print(f"AUC-PR da cascata: {report['auc_pr_delta']['vs_gmm']:+.4f} contra o GMM, "
+          f"{report['auc_pr_delta']['vs_autoencoder']:+.4f} contra o autoencoder")
+
+def main():
+    run = RunTelemetry('cascade', OUTPUT_PATH, mode='calibrate', low_recall=LOW_RECALL,
+                       high_precision=HIGH_PRECISION, ae_weight=AE_WEIGHT,
+                       threshold_policy=THRESHOLD_POLICY)
+    with run.stage('load_artifact'):
+        kernel, ae_factory, gmm_manifest, ae_manifest = load_stage_models()
+    print(f"Estágios: gmm/{gmm_manifest['version']} -> autoencoder/{ae_manifest['version']}")
+
+    with run.stage('load') as stage:
+        X_cal, y_cal, split = load_calibration_data(DATA_PATH)
+        X_test, y_test, ids_test = load_test_data(DATA_PATH)
+        stage.rows = len(X_cal) + len(X_test)
+
+    with run.stage('fit', rows=len(X_cal)):
+        detector = CascadeDetector.calibrate(kernel, ae_factory, X_cal, y_cal)
+        cal_scores, _ = detector.score(X_cal)
+    print(f"Cortes do GMM calibrados na {split} ({len(X_cal)} linhas): "
+          f"normal < {detector.low:.4f} <= autoencoder < {detector.high:.4f} <= anomalia")
+
+    with run.stage('threshold', rows=len(X_cal)):
+        threshold = clip_threshold(y_cal, cal_scores, THRESHOLD_POLICY)
+    print(describe(threshold))
+
+    with run.stage('score', rows=len(X_test)):
+        scores, report = compare_on_test(detector, X_test, y_test)
+        y_pred = flag_anomalies(scores, threshold)
+    print_report(report, len(X_test))
+
+    with run.stage('write', rows=len(X_test)):
+        csv_path = os.path.join(OUTPUT_PATH, OUTPUT_FILE)
+        write_predictions(csv_path, ids_test, scores, y_pred)
+        artifact_path = save_cascade_artifact(detector, threshold, gmm_manifest, ae_manifest,
+                                              report)
+    print(f"\nArquivo salvo em: {csv_path}")
+    print(f"Artefato salvo em: {artifact_path}")
+    print(f"Pico de memória (RSS): {peak_rss_mb():.1f} MB")
+    telemetry_path = run.finish(**report)
+    if telemetry_path:
+        print(f"Telemetria salva em: {telemetry_path}")
+
+
+if __name__ == "__main__":
+    args = parse_score_only_args(score_only_parser(
+        "Cascata GMM -> autoencoder: calibração ou pontuação com o artefato salvo.",
+        os.path.join(OUTPUT_PATH, OUTPUT_FILE)
+    ))
+    if args.score_only:
+        score_only(args.input, args.output, args.processed, args.version)
+    else:
+        main()
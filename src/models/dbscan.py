@@ -1,49 +1,392 @@
 import pandas as pd
+import numpy as np
+import hashlib
 import os
+import sys
+import time
+from scipy import sparse
 from sklearn.decomposition import PCA
 from sklearn.cluster import DBSCAN
+from sklearn.neighbors import KDTree, NearestNeighbors
+from sklearn.metrics import average_precision_score
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from artifacts import (
+    load_artifact, load_scoring_input, parse_score_only_args, save_artifact,
+    score_only_parser, write_predictions
+)
+from data_contract import artifact_version, load_table, table_exists
+from feature_store import open_feature_store
+from telemetry import RunTelemetry, peak_rss_mb
+from thresholds import THRESHOLD_RULE, describe, flag_anomalies, select_threshold
 
 # --- CONFIGURAÇÕES DE INTEGRAÇÃO ---
-INPUT_X_TEST = 'data/processed/X_test_processed.csv'
-INPUT_IDS = 'data/processed/ids_test.csv'
+DATA_PATH = 'data/processed'
 OUTPUT_DIR = 'outputs'
 OUTPUT_FILE = 'dbscan_predictions.csv'
 
 # Hiperparâmetros
 EPS_OTIMO = 2.9619
 MIN_SAMPLES = 14
+N_COMPONENTS = 10
+RANDOM_SEED = 42
+
+# Modo do detector:
+# 'index'        = PCA + pontos núcleo ajustados nos normais de treino; o teste é
+#                  pontuado pela distância ao ponto núcleo mais próximo (KD-tree)
+# 'transductive' = comportamento original: PCA + DBSCAN ajustados no próprio teste
+DBSCAN_MODE = 'index'
+
+# Linhas de normais de treino usadas no ajuste (amostra aleatória).
+# None = o mesmo número de linhas do teste: EPS_OTIMO/MIN_SAMPLES foram
+# calibrados no teste, e a densidade de vizinhos depende do número de linhas.
+FIT_SAMPLE_ROWS = None
+
+# Linhas por consulta à KD-tree (limita a memória das distâncias)
+QUERY_CHUNK_ROWS = 65_536
+
+# Política do threshold no modo 'index' (thresholds.py). None = regra do
+# próprio DBSCAN: anomalia quando não há ponto núcleo a até eps (score > 1)
+THRESHOLD_POLICY = None
+EPS_THRESHOLD = float(np.nextafter(1.0, np.inf))
+
+# =========================================================
+# MODO DE EXECUÇÃO
+# 0 = Execução normal (EPS_OTIMO / MIN_SAMPLES)
+# 1 = Varredura de eps x min_samples (grafo de vizinhança em cache)
+# =========================================================
+RUN_TUNING = 0
+
+EPS_GRID = [round(float(e), 4) for e in np.linspace(1.5, 4.0, 11)] + [EPS_OTIMO]
+MIN_SAMPLES_GRID = [5, 8, 10, 14, 20]
+
+# Grafos de vizinhança já calculados (um arquivo por dados + raio)
+GRAPH_CACHE_DIR = os.path.join(DATA_PATH, 'cache')
+
+def load_data(data_path, use_store=True):
+    # Feature store float32: o teste é uma fatia do memmap, sem cópia
+    store = open_feature_store(data_path) if use_store else None
+    if store is not None:
+        return store.segment('test'), store.ids('test')
+
+    X_input = load_table(data_path, 'X_test_processed')
+    ids_test = load_table(data_path, 'ids_test')
+    
+    # Garantir que IDs sejam uma série unidimensional
+    if isinstance(ids_test, pd.DataFrame):
+        ids_test = ids_test.iloc[:, 0]
+
+    return X_input, ids_test
+
+def load_train_normal(data_path, use_store=True):
+    store = open_feature_store(data_path) if use_store else None
+    if store is not None:
+        return store.segment('train_normal')
+
+    X_train = load_table(data_path, 'X_train_processed')
+    y_train = load_table(data_path, 'y_train')['Class']
+    return X_train[y_train == 0]
+
+# =========================================================
+# DETECTOR INDEXADO (AJUSTE E PONTUAÇÃO SEPARADOS)
+# =========================================================
+
+class DBSCANDetector:
+    """DBSCAN com ajuste nos dados normais e pontuação de pontos novos.
+
+    O ajuste projeta (uma amostra de) os normais de treino no PCA e encontra os
+    pontos núcleo do DBSCAN: pontos com pelo menos `min_samples` vizinhos a até
+    `eps`, contando o próprio ponto, ou seja, cuja distância ao
+    `min_samples`-ésimo vizinho mais próximo é <= `eps`. Essa consulta k-NN dá
+    os mesmos pontos núcleo do `sklearn.cluster.DBSCAN` sem materializar as
+    vizinhanças inteiras (memória O(n * min_samples)).
+
+    Os pontos núcleo ficam em uma KD-tree. O `anomaly_score` de um ponto novo é
+    a distância ao ponto núcleo mais próximo dividida por `eps`: acima de 1 o
+    ponto seria ruído para o DBSCAN (a mesma regra dos pontos do ajuste).
+    """
+
+    def __init__(self, eps=EPS_OTIMO, min_samples=MIN_SAMPLES, n_components=N_COMPONENTS,
+                 fit_sample_rows=FIT_SAMPLE_ROWS, random_state=RANDOM_SEED):
+        self.eps = eps
+        self.min_samples = min_samples
+        self.n_components = n_components
+        self.fit_sample_rows = fit_sample_rows
+        self.random_state = random_state
+
+    def fit(self, X):
+        X = np.asarray(X)
+        if self.fit_sample_rows and len(X) > self.fit_sample_rows:
+            rng = np.random.default_rng(self.random_state)
+            X = X[np.sort(rng.choice(len(X), self.fit_sample_rows, replace=False))]
+        self.n_fit_rows_ = len(X)
+
+        pca = PCA(n_components=self.n_components, random_state=self.random_state).fit(X)
+        self.pca_mean_ = pca.mean_.astype(np.float64)
+        self.pca_components_ = pca.components_.astype(np.float64)
+
+        X_pca = self.project(X)
+        tree = KDTree(X_pca)
+        kth_distance = np.concatenate([
+            tree.query(X_pca[start:start + QUERY_CHUNK_ROWS], k=self.min_samples)[0][:, -1]
+            for start in range(0, len(X_pca), QUERY_CHUNK_ROWS)
+        ])
+        core_points = X_pca[kth_distance <= self.eps]
+        if len(core_points) == 0:
+            raise ValueError(
+                f"Nenhum ponto núcleo com eps={self.eps} e min_samples={self.min_samples} "
+                f"em {len(X_pca)} linhas; aumente eps ou o número de linhas do ajuste."
+            )
+        self._set_core_points(core_points)
+        return self
+
+    def _set_core_points(self, core_points):
+        self.core_points_ = core_points
+        self.tree_ = KDTree(core_points)
+
+    @classmethod
+    def from_artifact(cls, manifest, arrays):
+        params = manifest['params']
+        detector = cls(params['eps'], params['min_samples'], params['n_components'])
+        detector.pca_mean_ = arrays['pca_mean'].astype(np.float64)
+        detector.pca_components_ = arrays['pca_components'].astype(np.float64)
+        detector._set_core_points(arrays['core_points'].astype(np.float64))
+        return detector
+
+    def project(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.pca_mean_) @ self.pca_components_.T
+
+    def score(self, X):
+        """Distância ao ponto núcleo mais próximo / eps (> 1 = anomalia)."""
+        X = np.asarray(X)
+        distances = np.empty(len(X))
+        for start in range(0, len(X), QUERY_CHUNK_ROWS):
+            stop = start + QUERY_CHUNK_ROWS
+            distances[start:stop] = self.tree_.query(self.project(X[start:stop]), k=1)[0][:, 0]
+        return distances / self.eps
+
+# =========================================================
+# TUNAGEM (GRAFO DE VIZINHANÇA EM CACHE)
+# =========================================================
+
+def radius_graph(X_pca, max_eps, cache_dir=GRAPH_CACHE_DIR):
+    """Grafo esparso (CSR) das distâncias entre pontos a até `max_eps`.
+
+    Calculado uma única vez por (dados, raio) e salvo em `cache_dir`; o próprio
+    ponto não entra no grafo. Retorna (grafo, veio_do_cache).
+    """
+    X_pca = np.ascontiguousarray(X_pca)
+    key = hashlib.sha1(X_pca.tobytes() + repr(float(max_eps)).encode()).hexdigest()[:16]
+    path = os.path.join(cache_dir, f'dbscan_graph_{key}.npz')
+    if os.path.exists(path):
+        return sparse.load_npz(path), True
+
+    graph = NearestNeighbors(radius=max_eps).fit(X_pca).radius_neighbors_graph(mode='distance')
+    os.makedirs(cache_dir, exist_ok=True)
+    sparse.save_npz(path, graph, compressed=False)
+    return graph, False
+
+class NeighborGraph:
+    """Avalia DBSCAN(eps, min_samples) para eps <= raio filtrando o grafo.
+
+    Cada aresta recebe o índice do menor eps do grid que a inclui (distância
+    <= eps). Daí saem, por ponto, o número de vizinhos em cada eps (+1, o
+    próprio ponto, como no scikit-learn), o menor eps em que o ponto vira
+    núcleo e o menor eps em que ele alcança um vizinho núcleo; é ruído quem
+    não é núcleo nem alcança um núcleo. O resultado é o mesmo conjunto de ruído
+    do `DBSCAN.fit`, com uma passada pelas arestas por valor de min_samples.
+    """
+
+    def __init__(self, graph):
+        self.n = graph.shape[0]
+        self.distances = graph.data
+        self.neighbors = graph.indices
+        self.indptr = graph.indptr
+        self.rows = np.repeat(np.arange(self.n, dtype=np.int32), np.diff(graph.indptr))
+
+    def sweep(self, eps_grid, min_samples_grid):
+        """Gera (eps, min_samples, máscara de ruído) para cada par."""
+        eps_grid = np.unique(eps_grid)
+        n_eps = len(eps_grid)
+        # arrays por aresta em tipos estreitos (o grafo pode ter dezenas de milhões de arestas)
+        level = np.searchsorted(eps_grid, self.distances).astype(np.int16)
+        counts = np.bincount(self.rows.astype(np.int64) * (n_eps + 1) + level,
+                             minlength=self.n * (n_eps + 1))
+        counts = counts.reshape(self.n, n_eps + 1)[:, :n_eps].cumsum(axis=1) + 1
+
+        has_edges = np.diff(self.indptr) > 0
+        for min_samples in min_samples_grid:
+            # menor nível de eps em que cada ponto é núcleo (n_eps = nunca)
+            core_level = (n_eps - (counts >= min_samples).sum(axis=1)).astype(np.int16)
+            # menor nível em que o ponto tem um vizinho núcleo a até eps
+            activation = np.maximum(level, core_level[self.neighbors])
+            reach_level = np.full(self.n, n_eps, dtype=np.int16)
+            reach_level[has_edges] = np.minimum.reduceat(activation, self.indptr[:-1][has_edges])
+            for k, eps in enumerate(eps_grid):
+                yield float(eps), min_samples, (core_level > k) & (reach_level > k)
+
+def load_tuning_data(data_path, use_store=True):
+    # Validação do feature store; sem ela, o teste (onde EPS_OTIMO foi calibrado)
+    store = open_feature_store(data_path) if use_store else None
+    if store is not None:
+        return store.segment('val'), store.labels('val'), 'validação'
+    X_test = load_table(data_path, 'X_test_processed')
+    y_test = load_table(data_path, 'y_test')['Class'].values
+    return X_test, y_test, 'teste'
+
+def run_tuning_sweep(data_path, eps_grid=EPS_GRID, min_samples_grid=MIN_SAMPLES_GRID):
+    """Varre eps x min_samples com um único grafo de vizinhança. Retorna o grid."""
+    X, y, split = load_tuning_data(data_path)
+    n_settings = len(eps_grid) * len(min_samples_grid)
+    print(f"Varredura de {n_settings} combinações no conjunto de {split} ({len(X)} linhas)")
+
+    pca = PCA(n_components=N_COMPONENTS, random_state=RANDOM_SEED)
+    X_pca = pca.fit(X).transform(X)
+
+    start = time.perf_counter()
+    graph, cached = radius_graph(X_pca, max(eps_grid))
+    print(f"Grafo de vizinhança (raio {max(eps_grid)}, {graph.nnz} arestas) "
+          f"{'lido do cache' if cached else 'calculado'} em {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    rows = []
+    for eps, min_samples, noise in NeighborGraph(graph).sweep(eps_grid, min_samples_grid):
+        rows.append({
+            'eps': eps,
+            'min_samples': min_samples,
+            'auc_pr': average_precision_score(y, noise),
+            'alertas': int(noise.sum()),
+            'fraudes_detectadas': int(noise[y == 1].sum()),
+        })
+    print(f"{n_settings} combinações avaliadas em {time.perf_counter() - start:.2f}s")
+    return pd.DataFrame(rows)
+
+def save_dbscan_artifact(pca_mean, pca_components, core_points, mode, n_fit_rows,
+                         eps=EPS_OTIMO, min_samples=MIN_SAMPLES, threshold=None):
+    """Salva a projeção PCA e os pontos núcleo (conjunto de referência) do DBSCAN.
+
+    `threshold` é o resumo devolvido por `select_threshold`; None = regra do eps.
+    """
+    threshold = threshold or {'threshold': EPS_THRESHOLD, 'policy': {'name': 'eps'}}
+    return save_artifact('dbscan', 'pca_dbscan', {
+        'pca_mean': pca_mean,
+        'pca_components': pca_components,
+        'core_points': core_points,
+    }, {
+        'params': {'eps': eps, 'min_samples': min_samples,
+                   'n_components': int(len(pca_components))},
+        'mode': mode,
+        'n_fit_rows': int(n_fit_rows),
+        'n_core_points': int(len(core_points)),
+        'threshold': threshold['threshold'],
+        'threshold_rule': THRESHOLD_RULE,
+        'threshold_policy': threshold,
+        'n_features': int(pca_components.shape[1]),
+        'scaler_version': artifact_version(DATA_PATH, 'scaler'),
+    })
+
+def score_only(input_path, output_path, processed=False, version=None):
+    """Pontua novos dados sem reajustar PCA/DBSCAN."""
+    start = time.perf_counter()
+    run = RunTelemetry('dbscan', OUTPUT_DIR, mode='score_only')
+    with run.stage('load_artifact'):
+        manifest, arrays = load_artifact('dbscan', version)
+        detector = DBSCANDetector.from_artifact(manifest, arrays)
+    load_seconds = time.perf_counter() - start
+
+    with run.stage('load') as stage:
+        ids, X = load_scoring_input(input_path, processed, manifest.get('scaler_version'))
+        stage.rows = len(ids)
+    with run.stage('score', rows=len(ids)):
+        anomaly_score = detector.score(X)
+    with run.stage('threshold', rows=len(ids)):
+        is_anomaly = flag_anomalies(anomaly_score, manifest)
+    with run.stage('write', rows=len(ids)):
+        write_predictions(output_path, ids, anomaly_score, is_anomaly)
+    run.finish(artifact_version=manifest['version'])
+
+    print(f"Artefato dbscan/{manifest['version']} carregado em {load_seconds:.3f}s")
+    print(f"{len(ids)} linhas pontuadas em {time.perf_counter() - start:.2f}s "
+          f"({is_anomaly.sum()} anomalias) -> {output_path}")
 
 def main():
     print("--- INICIANDO MODELO DBSCAN (MODO INTEGRAÇÃO) ---")
     
     # 1. Verificar e Ler Dados Processados
-    if not os.path.exists(INPUT_X_TEST) or not os.path.exists(INPUT_IDS):
+    if not table_exists(DATA_PATH, 'X_test_processed') or not table_exists(DATA_PATH, 'ids_test'):
         print(f"ERRO CRÍTICO: Arquivos processados não encontrados em 'data/processed/'.")
         print("Certifique-se de que o pré-processamento (Integrante 1) foi rodado antes.")
         return
 
-    print(f"Lendo dados de: {INPUT_X_TEST}")
-    X_input = pd.read_csv(INPUT_X_TEST)
-    ids_test = pd.read_csv(INPUT_IDS)
-    
-    # Garantir que IDs sejam uma série unidimensional
-    if isinstance(ids_test, pd.DataFrame):
-        ids_test = ids_test.iloc[:, 0]
+    run = RunTelemetry('dbscan', OUTPUT_DIR, mode=DBSCAN_MODE, run_tuning=RUN_TUNING,
+                       threshold_policy=THRESHOLD_POLICY)
+    eps, min_samples = EPS_OTIMO, MIN_SAMPLES
+    if RUN_TUNING:
+        print(">>> MODO: VARREDURA DE EPS x MIN_SAMPLES")
+        with run.stage('tuning'):
+            grid = run_tuning_sweep(DATA_PATH)
+        grid_path = os.path.join(OUTPUT_DIR, 'dbscan_tuning_grid.csv')
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        grid.to_csv(grid_path, index=False)
+        print("\nAUC-PR (linhas: eps, colunas: min_samples):")
+        print(grid.pivot(index='eps', columns='min_samples', values='auc_pr').round(4))
+        print("\nAlertas:")
+        print(grid.pivot(index='eps', columns='min_samples', values='alertas'))
+        best = grid.loc[grid['auc_pr'].idxmax()]
+        eps, min_samples = float(best['eps']), int(best['min_samples'])
+        print(f"\n🏆 Melhor: eps={eps}, min_samples={min_samples} (AUC-PR {best['auc_pr']:.4f}) "
+              f"| grid salvo em: {grid_path}\n")
+
+    print(f"Lendo dados de: {DATA_PATH}")
+    with run.stage('load') as stage:
+        X_input, ids_test = load_data(DATA_PATH)
+        y_test = None
+        if table_exists(DATA_PATH, 'y_test'):
+            y_test = load_table(DATA_PATH, 'y_test')['Class'].to_numpy()
+        stage.rows = len(X_input)
+
+    if DBSCAN_MODE == 'index':
+        # 2. Ajuste nos normais de treino (PCA + pontos núcleo na KD-tree)
+        print(f"Ajustando PCA ({N_COMPONENTS} componentes) e pontos núcleo "
+              f"(eps={eps}, min_samples={min_samples}) nos normais de treino...")
+        detector = DBSCANDetector(eps, min_samples, fit_sample_rows=FIT_SAMPLE_ROWS or len(X_input))
+        with run.stage('fit') as stage:
+            detector.fit(load_train_normal(DATA_PATH))
+            stage.rows = detector.n_fit_rows_
+        print(f"{len(detector.core_points_)} pontos núcleo em {detector.n_fit_rows_} linhas de treino")
+
+        # 3. Pontuação do teste pela distância ao ponto núcleo mais próximo
+        with run.stage('score', rows=len(X_input)):
+            anomaly_score = detector.score(X_input)
+        with run.stage('threshold', rows=len(X_input)):
+            threshold = None
+            if THRESHOLD_POLICY is not None and y_test is not None:
+                threshold = select_threshold(y_test, anomaly_score, THRESHOLD_POLICY)
+            is_anomaly = flag_anomalies(anomaly_score, threshold or {'threshold': EPS_THRESHOLD})
+        if threshold is not None:
+            print(describe(threshold))
+        artifact = (detector.pca_mean_, detector.pca_components_, detector.core_points_,
+                    DBSCAN_MODE, detector.n_fit_rows_, eps, min_samples, threshold)
+    else:
+        # 2. Aplicação do PCA
+        print("Aplicando PCA (Redução para 10 componentes)...")
+        pca = PCA(n_components=N_COMPONENTS)
+        # 3. Rodar DBSCAN (no modo transdutivo, o ajuste já rotula o teste)
+        print(f"Rodando DBSCAN (eps={eps}, min_samples={min_samples})...")
+        with run.stage('fit', rows=len(X_input)):
+            # fit + transform (e não fit_transform): com o solver randomizado o
+            # fit_transform devolve U*S, que difere da projeção usada no --score-only
+            X_pca = pca.fit(X_input).transform(X_input)
+            db = DBSCAN(eps=eps, min_samples=min_samples, n_jobs=-1)
+            labels = db.fit_predict(X_pca)
+
+        # 4. Formatar Saída
+        with run.stage('threshold', rows=len(X_input)):
+            is_anomaly = [1 if x == -1 else 0 for x in labels]
+            anomaly_score = [1.0 if x == 1 else 0.0 for x in is_anomaly]
+        artifact = (pca.mean_, pca.components_, db.components_, DBSCAN_MODE, len(X_pca),
+                    eps, min_samples)
 
-    # 2. Aplicação do PCA
-    print("Aplicando PCA (Redução para 10 componentes)...")
-    pca = PCA(n_components=10)
-    X_pca = pca.fit_transform(X_input)
-    
-    # 3. Rodar DBSCAN
-    print(f"Rodando DBSCAN (eps={EPS_OTIMO}, min_samples={MIN_SAMPLES})...")
-    db = DBSCAN(eps=EPS_OTIMO, min_samples=MIN_SAMPLES, n_jobs=-1)
-    labels = db.fit_predict(X_pca)
-    
-    # 4. Formatar Saída
-    is_anomaly = [1 if x == -1 else 0 for x in labels]
-    anomaly_score = [1.0 if x == 1 else 0.0 for x in is_anomaly]
-    
     df_out = pd.DataFrame({
         'id': ids_test,
         'anomaly_score': anomaly_score,
@@ -54,14 +397,30 @@ def main():
     print(f"\n--- RESULTADO FINAL ---")
     print(f"Total de linhas processadas: {len(df_out)}")
     print(f"Anomalias detectadas: {sum(is_anomaly)}")
+    if y_test is not None:
+        print(f"AUC-PR (teste): {average_precision_score(y_test, anomaly_score):.4f}")
     
     # 5. Salvar
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-        
-    save_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE)
-    df_out.to_csv(save_path, index=False)
+    with run.stage('write', rows=len(df_out)):
+        if not os.path.exists(OUTPUT_DIR):
+            os.makedirs(OUTPUT_DIR)
+
+        save_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE)
+        df_out.to_csv(save_path, index=False)
+        artifact_path = save_dbscan_artifact(*artifact)
     print(f"Sucesso! Arquivo salvo em: {save_path}")
+    print(f"Artefato salvo em: {artifact_path}")
+    print(f"Pico de memória (RSS): {peak_rss_mb():.1f} MB")
+    telemetry_path = run.finish(eps=eps, min_samples=min_samples)
+    if telemetry_path:
+        print(f"Telemetria salva em: {telemetry_path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_score_only_args(score_only_parser(
+        "DBSCAN: ajuste completo ou pontuação com o artefato salvo.",
+        os.path.join(OUTPUT_DIR, OUTPUT_FILE)
+    ))
+    if args.score_only:
+        score_only(args.input, args.output, args.processed, args.version)
+    else:
+        main()
\ No newline at end of file
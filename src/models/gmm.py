@@ -1,29 +1,32 @@
 import pandas as pd
 import numpy as np
 import os
-import matplotlib.pyplot as plt
-
-from sklearn.mixture import GaussianMixture
-from sklearn.model_selection import ParameterGrid
-from sklearn.metrics import (
-    average_precision_score,
-    precision_recall_curve,
-    classification_report,
-    confusion_matrix
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from artifacts import (
+    load_artifact, load_scoring_input, parse_score_only_args, save_artifact,
+    score_only_parser, write_predictions
 )
+from data_contract import artifact_version, load_table
+from feature_store import open_feature_store
+from gmm_kernel import GMMKernel
+from telemetry import RunTelemetry, peak_rss_mb
+from thresholds import THRESHOLD_RULE, describe, flag_anomalies, select_threshold
 
 # =========================================================
 # CONFIGURAÇÕES GERAIS
 # =========================================================
+# scikit-learn é importado dentro das funções de treino: o --score-only e o
+# servidor pontuam só com o kernel NumPy (gmm_kernel.py)
 RANDOM_SEED = 42
-np.random.seed(RANDOM_SEED)
 
 DATA_PATH = 'data/processed'
 OUTPUT_PATH = 'outputs'
 
-if not os.path.exists(OUTPUT_PATH):
-    os.makedirs(OUTPUT_PATH)
-
 # =========================================================
 # MODO DE EXECUÇÃO
 # 0 = Execução normal (apenas melhores hiperparâmetros)
@@ -31,19 +34,41 @@ if not os.path.exists(OUTPUT_PATH):
 # =========================================================
 RUN_TUNING = 0
 
+# Política do threshold (thresholds.py): target_recall, target_precision,
+# alert_budget ou min_cost
+THRESHOLD_POLICY = {'name': 'target_recall', 'recall': 0.80}
+
+# Precisão do kernel NumPy de pontuação (gmm_kernel.py) no --score-only e no
+# servidor; np.float32 é mais rápido, com erro relativo < 1e-5
+SCORE_DTYPE = np.float64
+
+# Processos usados no Grid Search (None = todos os núcleos).
+# Cada processo recebe uma fatia dos núcleos para as threads do BLAS.
+N_WORKERS = None
+
 # =========================================================
 # 1. PREPARAÇÃO DOS DADOS
 # =========================================================
 
-def load_data(data_path):
-    # Carrega os dados (certifique-se que os arquivos existem no caminho)
+def load_data(data_path, use_store=True):
+    # Feature store float32: fatias do memmap, sem cópia e sem parsing
+    store = open_feature_store(data_path) if use_store else None
+    if store is not None:
+        return (
+            store.segment('train_normal'),
+            store.segment('test'),
+            store.labels('test'),
+            store.ids('test')
+        )
+
+    # Carrega os dados (binário .npy se disponível, senão CSV)
     try:
-        X_train = pd.read_csv(os.path.join(data_path, 'X_train_processed.csv'))
-        y_train = pd.read_csv(os.path.join(data_path, 'y_train.csv'))['Class']
+        X_train = load_table(data_path, 'X_train_processed')
+        y_train = load_table(data_path, 'y_train')['Class']
 
-        X_test = pd.read_csv(os.path.join(data_path, 'X_test_processed.csv'))
-        y_test = pd.read_csv(os.path.join(data_path, 'y_test.csv'))['Class']
-        ids_test = pd.read_csv(os.path.join(data_path, 'ids_test.csv'))['id']
+        X_test = load_table(data_path, 'X_test_processed')
+        y_test = load_table(data_path, 'y_test')['Class']
+        ids_test = load_table(data_path, 'ids_test')['id']
         
         # Treino APENAS com normais
         X_train_normal = X_train[y_train == 0]
@@ -58,6 +83,9 @@ def load_data(data_path):
 # =========================================================
 
 def train_and_evaluate_gmm(params, X_train, X_test, y_test):
+    from sklearn.mixture import GaussianMixture
+    from sklearn.metrics import average_precision_score
+
     # Instancia o modelo
     gmm = GaussianMixture(
         n_components=params['n_components'],
@@ -71,18 +99,160 @@ def train_and_evaluate_gmm(params, X_train, X_test, y_test):
     # Avalia no conjunto de teste (Score: Log-likelihood negativo)
     # Quanto menor o log-likelihood, maior a chance de ser anomalia
     # Multiplicamos por -1 para que scores ALTOS sejam anomalias
-    scores = -gmm.score_samples(X_test)
+    scores = -GMMKernel.from_sklearn(gmm).score_samples(X_test)
     
     auc_pr = average_precision_score(y_test, scores)
     
     return auc_pr, gmm, scores
 
 # =========================================================
-# 4. EXECUÇÃO PRINCIPAL
+# 3. GRID SEARCH PARALELO
+# =========================================================
+
+# Dados de treino/teste de cada processo do pool (abertos via memmap)
+_worker_data = None
+
+def _init_worker(data_path, shared_dir, n_threads):
+    global _worker_data
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=n_threads)
+    if shared_dir is None:
+        store = open_feature_store(data_path)
+        _worker_data = (store.segment('train_normal'), store.segment('test'), store.labels('test'))
+    else:
+        _worker_data = tuple(
+            np.load(os.path.join(shared_dir, f'{name}.npy'), mmap_mode='r')
+            for name in ('X_train', 'X_test', 'y_test')
+        )
+
+def _run_config(params):
+    X_train, X_test, y_test = _worker_data
+    try:
+        # Os scores de cada candidato ficam no processo; só o modelo (pequeno) volta
+        auc_pr, model, _ = train_and_evaluate_gmm(params, X_train, X_test, y_test)
+        return auc_pr, model, None
+    except Exception as e:
+        return None, None, str(e)
+
+def run_grid_search(grid, data_path, X_train, X_test, y_test, n_workers=None):
+    """Avalia o grid em um pool de processos.
+
+    Os processos não recebem os dados por pickle: abrem o feature store de
+    `data_path` via memmap ou, na falta dele, cópias .npy temporárias. Gera
+    `(params, auc_pr, model, erro)` na ordem do grid.
+    """
+    n_cpus = os.cpu_count() or 1
+    n_workers = min(n_workers or n_cpus, len(grid))
+
+    if n_workers <= 1:
+        for params in grid:
+            try:
+                auc_pr, model, _ = train_and_evaluate_gmm(params, X_train, X_test, y_test)
+                yield params, auc_pr, model, None
+            except Exception as e:
+                yield params, None, None, str(e)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        shared_dir = None
+        if open_feature_store(data_path) is None:
+            shared_dir = tmp_dir
+            for name, values in (('X_train', X_train), ('X_test', X_test), ('y_test', y_test)):
+                np.save(os.path.join(shared_dir, f'{name}.npy'), np.asarray(values))
+
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=_init_worker,
+            initargs=(data_path, shared_dir, max(1, n_cpus // n_workers))
+        ) as executor:
+            # map preserva a ordem do grid (seleção do melhor igual à sequencial)
+            for params, result in zip(grid, executor.map(_run_config, grid)):
+                yield (params, *result)
+
+# =========================================================
+# 4. ARTEFATO (SCORE-ONLY)
+# =========================================================
+
+def save_gmm_artifact(model, params, threshold, auc_pr, n_train_rows):
+    """Salva os parâmetros do GMM e o threshold em artifacts/gmm/<versão>/.
+
+    `threshold` é o resumo devolvido por `select_threshold` (valor + política).
+
+    `n_train_rows` é o peso do histórico no warm start do GMM online
+    (gmm_online.py).
+    """
+    return save_artifact('gmm', 'gaussian_mixture', {
+        'weights': model.weights_,
+        'means': model.means_,
+        'covariances': model.covariances_,
+        'precisions_cholesky': model.precisions_cholesky_,
+    }, {
+        'params': params,
+        'threshold': threshold['threshold'],
+        'threshold_rule': THRESHOLD_RULE,
+        'threshold_policy': threshold,
+        'metrics': {'auc_pr_test': float(auc_pr)},
+        'n_features': int(model.means_.shape[1]),
+        'n_train_rows': int(n_train_rows),
+        'scaler_version': artifact_version(DATA_PATH, 'scaler'),
+    })
+
+def gmm_from_artifact(manifest, arrays):
+    """Reconstrói o GaussianMixture ajustado sem rodar o EM."""
+    from sklearn.mixture import GaussianMixture
+    params = manifest['params']
+    model = GaussianMixture(
+        n_components=params['n_components'],
+        covariance_type=params['covariance_type'],
+        random_state=RANDOM_SEED
+    )
+    model.weights_ = arrays['weights']
+    model.means_ = arrays['means']
+    model.covariances_ = arrays['covariances']
+    model.precisions_cholesky_ = arrays['precisions_cholesky']
+    model.n_features_in_ = manifest['n_features']
+    model.converged_ = True
+    return model
+
+def score_only(input_path, output_path, processed=False, version=None):
+    run = RunTelemetry('gmm', OUTPUT_PATH, mode='score_only')
+    start = time.perf_counter()
+    with run.stage('load_artifact'):
+        manifest, arrays = load_artifact('gmm', version)
+        kernel = GMMKernel.from_artifact(manifest, arrays, SCORE_DTYPE)
+    load_seconds = time.perf_counter() - start
+
+    with run.stage('load') as stage:
+        ids, X = load_scoring_input(input_path, processed, manifest.get('scaler_version'))
+        stage.rows = len(ids)
+    with run.stage('score', rows=len(ids)):
+        scores = -kernel.score_samples(X)
+    with run.stage('threshold', rows=len(ids)):
+        y_pred = flag_anomalies(scores, manifest)
+    with run.stage('write', rows=len(ids)):
+        write_predictions(output_path, ids, scores, y_pred)
+    run.finish(artifact_version=manifest['version'])
+
+    print(f"Artefato gmm/{manifest['version']} carregado em {load_seconds:.3f}s")
+    print(f"{len(ids)} linhas pontuadas em {time.perf_counter() - start:.2f}s "
+          f"({y_pred.sum()} anomalias) -> {output_path}")
+
+# =========================================================
+# 5. EXECUÇÃO PRINCIPAL
 # =========================================================
 
 def main():
-    X_train_normal, X_test, y_test, ids_test = load_data(DATA_PATH)
+    from sklearn.model_selection import ParameterGrid
+    from sklearn.metrics import classification_report, confusion_matrix
+
+    np.random.seed(RANDOM_SEED)
+    os.makedirs(OUTPUT_PATH, exist_ok=True)
+
+    run = RunTelemetry('gmm', OUTPUT_PATH, mode='train', run_tuning=RUN_TUNING,
+                       threshold_policy=THRESHOLD_POLICY)
+    with run.stage('load') as stage:
+        X_train_normal, X_test, y_test, ids_test = load_data(DATA_PATH)
+        stage.rows = len(X_train_normal) + len(X_test)
 
     # LÓGICA DE SELEÇÃO DE PARÂMETROS (Igual ao Autoencoder)
     if RUN_TUNING:
@@ -104,54 +274,49 @@ def main():
     best_auc_pr = -1
     best_model = None
     best_params = None
-    best_scores = None
 
     print("\n=============================================")
     print(f"INICIANDO EXECUÇÃO ({len(grid)} combinações)")
     print("=============================================")
 
-    for i, params in enumerate(grid):
+    # Ajuste + AUC-PR de cada candidato (no pool, quando há mais de um núcleo)
+    with run.stage('fit', rows=len(X_train_normal) * len(grid)):
+        results = list(run_grid_search(grid, DATA_PATH, X_train_normal, X_test, y_test,
+                                       N_WORKERS))
+
+    for i, (params, auc_pr, model, error) in enumerate(results):
         print(f"[{i+1}/{len(grid)}] Testando: {params} ...", end=" ")
 
-        try:
-            auc_pr, model, scores = train_and_evaluate_gmm(
-                params,
-                X_train_normal,
-                X_test,
-                y_test
-            )
-            print(f"AUC-PR: {auc_pr:.4f}")
-
-            # Salva o melhor modelo (ou o único, se RUN_TUNING=0)
-            if auc_pr > best_auc_pr:
-                best_auc_pr = auc_pr
-                best_model = model
-                best_params = params
-                best_scores = scores
-
-        except Exception as e:
-            print(f"Erro: {e}")
+        if error is not None:
+            print(f"Erro: {error}")
+            continue
+
+        print(f"AUC-PR: {auc_pr:.4f}")
+
+        # Salva o melhor modelo (ou o único, se RUN_TUNING=0)
+        if auc_pr > best_auc_pr:
+            best_auc_pr = auc_pr
+            best_model = model
+            best_params = params
 
     print("\n🏆 MELHOR RESULTADO")
     print(f"Parâmetros: {best_params}")
     print(f"AUC-PR Final: {best_auc_pr:.4f}")
 
+    # Scores apenas do melhor modelo (os dos demais candidatos não são guardados)
+    with run.stage('score', rows=len(X_test)):
+        best_scores = -GMMKernel.from_sklearn(best_model).score_samples(X_test)
+
     # =========================================================
     # GERAÇÃO DE RESULTADOS FINAIS (Do melhor modelo)
     # =========================================================
     
-    # 1. Definir Threshold para Recall ~0.80
-    precision, recall, thresholds = precision_recall_curve(y_test, best_scores)
-    
-    # Busca o limiar onde recall é o mais próximo possível de 0.80
-    target_recall = 0.80
-    idx = (np.abs(recall - target_recall)).argmin()
-    final_threshold = thresholds[idx]
-    
-    print(f"\n🎯 Threshold escolhido: {final_threshold:.6f} (Recall aprox {recall[idx]:.2f})")
-    
-    # 2. Gerar predições binárias
-    y_pred = (best_scores >= final_threshold).astype(int)
+    # 1. Threshold pela política configurada (uma ordenação dos scores)
+    with run.stage('threshold', rows=len(X_test)):
+        threshold = select_threshold(y_test, best_scores, THRESHOLD_POLICY)
+        # 2. Gerar predições binárias
+        y_pred = flag_anomalies(best_scores, threshold)
+    print(f"\n{describe(threshold)}")
     
     print("\nRelatório de Classificação:")
     print(classification_report(y_test, y_pred))
@@ -160,15 +325,31 @@ def main():
     print(confusion_matrix(y_test, y_pred))
 
     # 3. Salvar CSV de predições
-    results_df = pd.DataFrame({
-        'id': ids_test,
-        'anomaly_score': best_scores,
-        'is_anomaly': y_pred
-    })
-    
-    csv_path = os.path.join(OUTPUT_PATH, 'gmm_predictions.csv')
-    results_df.to_csv(csv_path, index=False)
+    with run.stage('write', rows=len(X_test)):
+        results_df = pd.DataFrame({
+            'id': ids_test,
+            'anomaly_score': best_scores,
+            'is_anomaly': y_pred
+        })
+
+        csv_path = os.path.join(OUTPUT_PATH, 'gmm_predictions.csv')
+        results_df.to_csv(csv_path, index=False)
+        artifact_path = save_gmm_artifact(best_model, best_params, threshold, best_auc_pr,
+                                          len(X_train_normal))
     print(f"\nArquivo salvo em: {csv_path}")
+    print(f"Artefato salvo em: {artifact_path}")
+    print(f"Pico de memória (RSS): {peak_rss_mb():.1f} MB")
+    telemetry_path = run.finish(best_params=best_params, auc_pr=best_auc_pr)
+    if telemetry_path:
+        print(f"Telemetria salva em: {telemetry_path}")
 
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    args = parse_score_only_args(score_only_parser(
+        "GMM: treino completo ou pontuação com o artefato salvo.",
+        os.path.join(OUTPUT_PATH, 'gmm_predictions.csv')
+    ))
+    if args.score_only:
+        score_only(args.input, args.output, args.processed, args.version)
+    else:
+        main()
@@ -0,0 +1,282 @@
+"""GMM online: atualiza o modelo salvo com novos blocos de transações normais.
+
+Parte do artefato `gmm` (warm start, sem rodar o EM do zero) e aplica um
+passo de EM por bloco (EM em mini-lotes). As estatísticas suficientes de cada
+componente (soma das responsabilidades, soma de x e soma de x·xᵀ) são
+acumuladas com fator de esquecimento:
+
+    S = FORGETTING_FACTOR · S + estatísticas do bloco
+
+e pesos, médias e covariâncias são recalculados a partir de S. A memória é a
+de um bloco mais o estado (K·(1 + d + d²) floats), independente do tamanho do
+histórico; com fator λ, o histórico efetivo é de ~CHUNK_ROWS / (1 - λ) linhas.
+
+O modelo atualizado é avaliado no teste, recebe um novo threshold (mesma
+`THRESHOLD_POLICY` do gmm.py) e é salvo como nova versão do artefato `gmm`,
+então o `--score-only` do gmm.py e o servidor passam a usá-lo.
+
+Uso (a partir da raiz do repositório, depois de rodar o gmm.py):
+    python src/models/gmm_online.py [--input novas_normais.csv] [--processed]
+        [--forgetting 0.95] [--chunk-rows 5000] [--version <base>]
+
+Sem `--input`, as transações normais do conjunto de validação são usadas como
+fluxo de novos dados. Com `--input`, o CSV é lido em blocos; se tiver a coluna
+`Class`, apenas as linhas normais (Class == 0) entram na atualização.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import solve_triangular
+from sklearn.metrics import average_precision_score
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from artifacts import load_artifact, save_artifact, scaler_from_artifact
+from feature_store import open_feature_store
+from gmm_kernel import GMMKernel
+from telemetry import peak_rss_mb
+from thresholds import THRESHOLD_RULE, describe, select_threshold
+from gmm import DATA_PATH, THRESHOLD_POLICY, load_data
+
+# =========================================================
+# CONFIGURAÇÕES GERAIS
+# =========================================================
+
+# Peso do estado anterior a cada bloco (1.0 = sem esquecimento)
+FORGETTING_FACTOR = 0.95
+
+# Linhas por bloco de atualização
+CHUNK_ROWS = 5000
+
+# Regularização da diagonal das covariâncias (mesmo padrão do GaussianMixture)
+REG_COVAR = 1e-6
+
+# =========================================================
+# 1. MODELO ONLINE
+# =========================================================
+
+class OnlineGMM:
+    """GMM atualizado por EM em mini-lotes, com fator de esquecimento.
+
+    `n_seen` é o peso do estado inicial, em linhas: com o warm start, o modelo
+    salvo conta como `n_seen` linhas já observadas.
+    """
+
+    def __init__(self, weights, means, covariances, covariance_type, n_seen,
+                 forgetting=FORGETTING_FACTOR, reg_covar=REG_COVAR):
+        if covariance_type not in ('full', 'tied', 'diag', 'spherical'):
+            raise ValueError(f"covariance_type não suportado: {covariance_type}")
+        self.covariance_type = covariance_type
+        self.forgetting = forgetting
+        self.reg_covar = reg_covar
+        self.n_chunks = 0
+        self.n_rows = 0
+
+        weights = np.asarray(weights, dtype=np.float64)
+        means = np.asarray(means, dtype=np.float64)
+        n_components, n_features = means.shape
+        covariances = np.asarray(covariances, dtype=np.float64)
+        if covariance_type == 'tied':
+            covariances = np.broadcast_to(covariances, (n_components, n_features, n_features))
+        elif covariance_type == 'spherical':
+            covariances = np.repeat(covariances[:, None], n_features, axis=1)
+
+        # Estatísticas suficientes equivalentes ao modelo salvo. As covariâncias
+        # salvas já incluem reg_covar na diagonal, que _update_parameters soma de
+        # novo: sem tirar aqui, seria contado duas vezes
+        self.s0 = n_seen * weights
+        self.s1 = self.s0[:, None] * means
+        if covariance_type in ('full', 'tied'):
+            covariances = covariances - reg_covar * np.eye(n_features)
+            second = covariances + np.einsum('kd,ke->kde', means, means)
+            self.s2 = self.s0[:, None, None] * second
+        else:
+            self.s2 = self.s0[:, None] * (covariances - reg_covar + means ** 2)
+        self._update_parameters()
+
+    @classmethod
+    def from_artifact(cls, manifest, arrays, forgetting=FORGETTING_FACTOR):
+        return cls(arrays['weights'], arrays['means'], arrays['covariances'],
+                   manifest['params']['covariance_type'], manifest['n_train_rows'],
+                   forgetting, manifest['params'].get('reg_covar', REG_COVAR))
+
+    @property
+    def n_effective(self):
+        """Peso total do histórico no estado atual, em linhas."""
+        return float(self.s0.sum())
+
+    def _update_parameters(self):
+        nk = self.s0 + 10 * np.finfo(np.float64).eps
+        n_features = self.s1.shape[1]
+        self.weights_ = nk / nk.sum()
+        self.means_ = self.s1 / nk[:, None]
+
+        if self.covariance_type in ('full', 'tied'):
+            outer = np.einsum('kd,ke->kde', self.means_, self.means_)
+            if self.covariance_type == 'full':
+                cov = self.s2 / nk[:, None, None] - outer
+            else:
+                cov = (self.s2.sum(axis=0) - (nk[:, None, None] * outer).sum(axis=0)) / nk.sum()
+            cov = cov + self.reg_covar * np.eye(n_features)
+            self.covariances_ = cov
+            # Mesma convenção do scikit-learn: precisão = P Pᵀ, P = L⁻ᵀ
+            cov_stack = cov[None] if self.covariance_type == 'tied' else cov
+            prec_chol = np.stack([
+                solve_triangular(np.linalg.cholesky(c), np.eye(n_features), lower=True).T
+                for c in cov_stack
+            ])
+            self.precisions_cholesky_ = prec_chol[0] if self.covariance_type == 'tied' else prec_chol
+        else:
+            cov = self.s2 / nk[:, None] - self.means_ ** 2 + self.reg_covar
+            if self.covariance_type == 'spherical':
+                cov = cov.mean(axis=1)
+            self.covariances_ = cov
+            self.precisions_cholesky_ = 1.0 / np.sqrt(cov)
+
+        self.kernel = GMMKernel(self.weights_, self.means_, self.precisions_cholesky_,
+                                self.covariance_type)
+
+    def partial_fit(self, X):
+        """Um passo de EM com o bloco X (só transações normais)."""
+        X = np.asarray(X, dtype=np.float64)
+        _, log_resp = self.kernel.log_responsibilities(X)
+        resp = np.exp(log_resp)
+
+        lam = self.forgetting
+        self.s0 = lam * self.s0 + resp.sum(axis=0)
+        self.s1 = lam * self.s1 + resp.T @ X
+        if self.covariance_type in ('full', 'tied'):
+            chunk_s2 = np.stack([(X * resp[:, k, None]).T @ X for k in range(resp.shape[1])])
+        else:
+            chunk_s2 = resp.T @ (X * X)
+        self.s2 = lam * self.s2 + chunk_s2
+
+        self.n_chunks += 1
+        self.n_rows += len(X)
+        self._update_parameters()
+        return self
+
+    def score_samples(self, X):
+        return self.kernel.score_samples(X)
+
+    def state_nbytes(self):
+        """Tamanho do estado (estatísticas suficientes), constante no histórico."""
+        return self.s0.nbytes + self.s1.nbytes + self.s2.nbytes
+
+# =========================================================
+# 2. FLUXO DE NOVAS TRANSAÇÕES
+# =========================================================
+
+def stream_normal_chunks(input_path=None, processed=False, scaler_version=None,
+                         chunk_rows=CHUNK_ROWS, data_path=DATA_PATH):
+    """Gera blocos float32 de transações normais, sem carregar o fluxo inteiro."""
+    if input_path is None:
+        store = open_feature_store(data_path)
+        if store is None or 'val' not in store.segments:
+            raise FileNotFoundError("Sem --input, o fluxo usa o segmento 'val' do feature store "
+                                    "(rode o preprocessing)")
+        X_val = store.segment('val')
+        normal = np.flatnonzero(store.labels('val') == 0)
+        for start in range(0, len(normal), chunk_rows):
+            yield np.asarray(X_val[normal[start:start + chunk_rows]])
+        return
+
+    manifest, arrays = load_artifact('scaler', scaler_version)
+    columns = manifest['feature_columns']
+    scaler = None if processed else scaler_from_artifact(manifest, arrays)
+    for df in pd.read_csv(input_path, chunksize=chunk_rows):
+        if 'Class' in df.columns:
+            df = df[df['Class'] == 0]
+        if df.empty:
+            continue
+        X = df[columns].to_numpy(dtype=np.float64)
+        if scaler is not None:
+            X = scaler.transform(X)
+        yield X.astype(np.float32)
+
+# =========================================================
+# 3. ARTEFATO
+# =========================================================
+
+def save_online_artifact(model, base_manifest, threshold, auc_pr):
+    """Nova versão do artefato `gmm`, no mesmo formato do gmm.py."""
+    return save_artifact('gmm', 'gaussian_mixture', {
+        'weights': model.weights_,
+        'means': model.means_,
+        'covariances': model.covariances_,
+        'precisions_cholesky': model.precisions_cholesky_,
+    }, {
+        'params': base_manifest['params'],
+        'threshold': threshold['threshold'],
+        'threshold_rule': THRESHOLD_RULE,
+        'threshold_policy': threshold,
+        'metrics': {'auc_pr_test': float(auc_pr)},
+        'n_features': base_manifest['n_features'],
+        'n_train_rows': model.n_effective,
+        'scaler_version': base_manifest.get('scaler_version'),
+        'online': {
+            'parent_version': base_manifest['version'],
+            'forgetting_factor': model.forgetting,
+            'chunks': model.n_chunks,
+            'rows': model.n_rows,
+        },
+    })
+
+# =========================================================
+# 4. EXECUÇÃO PRINCIPAL
+# =========================================================
+
+def main(args):
+    base_manifest, arrays = load_artifact('gmm', args.version)
+    model = OnlineGMM.from_artifact(base_manifest, arrays, args.forgetting)
+    _, X_test, y_test, _ = load_data(DATA_PATH)
+
+    base_scores = -model.score_samples(X_test)
+    print(f"Modelo base: gmm/{base_manifest['version']} {base_manifest['params']} "
+          f"| AUC-PR {average_precision_score(y_test, base_scores):.4f}")
+    print(f"Fator de esquecimento: {args.forgetting} | blocos de {args.chunk_rows} linhas")
+
+    chunks = stream_normal_chunks(args.input, args.processed,
+                                  base_manifest.get('scaler_version'), args.chunk_rows)
+    update_seconds = []
+    for X_chunk in chunks:
+        start = time.perf_counter()
+        model.partial_fit(X_chunk)
+        update_seconds.append(time.perf_counter() - start)
+        print(f"  bloco {model.n_chunks}: {len(X_chunk)} linhas em "
+              f"{update_seconds[-1] * 1000:.1f} ms", flush=True)
+
+    if not update_seconds:
+        print("Nenhuma transação normal no fluxo; artefato não atualizado.")
+        return
+
+    scores = -model.score_samples(X_test)
+    auc_pr = average_precision_score(y_test, scores)
+    threshold = select_threshold(y_test, scores, THRESHOLD_POLICY)
+
+    print(f"\n{model.n_rows} linhas em {model.n_chunks} blocos "
+          f"(média {np.mean(update_seconds) * 1000:.1f} ms/bloco)")
+    print(f"AUC-PR após a atualização: {auc_pr:.4f}")
+    print(describe(threshold))
+    print(f"Estado do modelo: {model.state_nbytes() / 1024:.1f} KB | "
+          f"histórico efetivo: {model.n_effective:,.0f} linhas")
+
+    artifact_path = save_online_artifact(model, base_manifest, threshold, auc_pr)
+    print(f"Artefato salvo em: {artifact_path}")
+    print(f"Pico de memória (RSS): {peak_rss_mb():.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--input', help='CSV com novas transações (padrão: normais da validação)')
+    parser.add_argument('--processed', action='store_true',
+                        help='o --input já está normalizado (formato X_*_processed)')
+    parser.add_argument('--version', default=None,
+                        help='versão do artefato gmm de partida (padrão: LATEST)')
+    parser.add_argument('--forgetting', type=float, default=FORGETTING_FACTOR)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    main(parser.parse_args())
@@ -0,0 +1,282 @@
+"""Executor do pipeline completo, com cache das etapas por hash do conteúdo.
+
+As etapas formam um DAG:
+
+    preprocessing ─┬─> gmm ─────────┬─> evaluation
+                   ├─> dbscan ──────┤
+                   └─> autoencoder ─┴─> cascade (gmm + autoencoder)
+
+Cada etapa roda o script correspondente em um subprocesso, com a pasta de
+trabalho (`--workdir`, padrão: raiz do repositório) como diretório atual. A
+chave da etapa é o hash de:
+
+* código: o script e os módulos locais importados por ele (inclui as
+  configurações, que são variáveis dos próprios scripts);
+* entradas: o conteúdo do `creditcard.csv` (preprocessing);
+* dependências: a chave e o hash das saídas declaradas de cada etapa anterior.
+
+Uma etapa é pulada quando a chave é a mesma da última execução bem-sucedida e
+as saídas declaradas continuam iguais em disco. O hash de um arquivo só é
+recalculado quando o tamanho ou a data de modificação mudam, então uma
+reexecução sem mudanças não lê os dados. Os três modelos rodam em paralelo
+(`--jobs`), e o log de cada etapa fica em `.pipeline/logs/<etapa>.log`.
+
+Uso (a partir da raiz do repositório):
+    python src/pipeline.py [etapas ...] [--force gmm] [--jobs 3] [--streaming]
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+MODULE_DIRS = [SRC, os.path.join(SRC, 'models')]
+
+PIPELINE_DIR = '.pipeline'
+STATE_FILE = 'state.json'
+RAW_DATA = 'data/raw/creditcard.csv'
+
+HASH_BLOCK_BYTES = 1 << 20
+
+
+class Stage:
+    def __init__(self, name, script, deps=(), inputs=(), outputs=()):
+        self.name = name
+        self.script = script
+        self.deps = tuple(deps)
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+
+
+def build_stages(streaming=False):
+    preprocessing = 'src/preprocessing_streaming.py' if streaming else 'src/preprocessing.py'
+    return {stage.name: stage for stage in [
+        Stage('preprocessing', preprocessing, inputs=[RAW_DATA],
+              outputs=['data/processed/schema.json',
+                       'data/processed/feature_store/manifest.json']),
+        Stage('gmm', 'src/models/gmm.py', deps=['preprocessing'],
+              outputs=['outputs/gmm_predictions.csv', 'artifacts/gmm/LATEST']),
+        Stage('dbscan', 'src/models/dbscan.py', deps=['preprocessing'],
+              outputs=['outputs/dbscan_predictions.csv', 'artifacts/dbscan/LATEST']),
+        Stage('autoencoder', 'src/models/autoencoder.py', deps=['preprocessing'],
+              outputs=['outputs/autoencoder_predictions.csv', 'artifacts/autoencoder/LATEST']),
+        Stage('evaluation', 'src/evaluation.py', deps=['gmm', 'dbscan', 'autoencoder'],
+              outputs=['outputs/evaluation_metrics.csv']),
+        Stage('cascade', 'src/models/cascade.py', deps=['gmm', 'autoencoder'],
+              outputs=['outputs/cascade_predictions.csv', 'artifacts/cascade/LATEST']),
+    ]}
+
+
+# =========================================================
+# 1. HASHES
+# =========================================================
+
+class HashCache:
+    """Hash dos arquivos, reaproveitado enquanto tamanho e mtime não mudam."""
+
+    def __init__(self, entries, lock):
+        self.entries = entries
+        self._lock = lock
+
+    def file_hash(self, path):
+        """Hash do conteúdo, ou None se o arquivo não existe."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = os.path.abspath(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        with self._lock:
+            cached = self.entries.get(key)
+        if cached is not None and cached[:2] == signature:
+            return cached[2]
+
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b''):
+                digest.update(block)
+        with self._lock:
+            self.entries[key] = signature + [digest.hexdigest()]
+        return digest.hexdigest()
+
+
+def local_imports(path):
+    """Módulos do próprio repositório importados por um script (recursivo)."""
+    found, pending = [], [path]
+    while pending:
+        current = pending.pop()
+        if current in found:
+            continue
+        found.append(current)
+        with open(current, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), current)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                for directory in [os.path.dirname(current)] + MODULE_DIRS:
+                    candidate = os.path.join(directory, name.split('.')[0] + '.py')
+                    if os.path.exists(candidate):
+                        pending.append(candidate)
+                        break
+    return sorted(found)
+
+
+def stage_key(stage, hashes, upstream):
+    script = os.path.join(ROOT, stage.script)
+    payload = {
+        'stage': stage.name,
+        'command': stage.script,
+        'python': sys.version.split()[0],
+        'code': {os.path.relpath(p, ROOT): hashes.file_hash(p) for p in local_imports(script)},
+        'inputs': {p: hashes.file_hash(p) for p in stage.inputs},
+        'upstream': upstream,
+    }
+    encoded = json.dumps(payload, sort_keys=True).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+# =========================================================
+# 2. EXECUÇÃO
+# =========================================================
+
+class PipelineRunner:
+    def __init__(self, stages, jobs=3, force=()):
+        self.stages = stages
+        self.jobs = jobs
+        self.force = set(force)
+        self.state_path = os.path.join(PIPELINE_DIR, STATE_FILE)
+        self.log_dir = os.path.join(PIPELINE_DIR, 'logs')
+        self.state = {'files': {}, 'stages': {}}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        # Um só lock para o estado e o cache de hashes (etapas em threads)
+        self._lock = threading.RLock()
+        self.hashes = HashCache(self.state['files'], self._lock)
+        self.results = {}
+
+    def _save_state(self):
+        os.makedirs(PIPELINE_DIR, exist_ok=True)
+        with self._lock:
+            tmp_path = self.state_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.state_path)
+
+    def _output_hashes(self, stage):
+        return {p: self.hashes.file_hash(p) for p in stage.outputs}
+
+    def _run_stage(self, stage):
+        start = time.perf_counter()
+        upstream = {dep: self.state['stages'][dep] for dep in stage.deps}
+        upstream = {dep: {'key': entry['key'], 'outputs': entry['outputs']}
+                    for dep, entry in upstream.items()}
+        key = stage_key(stage, self.hashes, upstream)
+
+        previous = self.state['stages'].get(stage.name)
+        if (stage.name not in self.force and previous is not None
+                and previous['key'] == key
+                and previous['outputs'] == self._output_hashes(stage)
+                and None not in previous['outputs'].values()):
+            return 'em cache', time.perf_counter() - start, None
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        log_path = os.path.join(self.log_dir, f'{stage.name}.log')
+        env = dict(os.environ, MPLBACKEND='Agg', PYTHONUNBUFFERED='1')
+        with open(log_path, 'w', encoding='utf-8') as log:
+            proc = subprocess.run([sys.executable, os.path.join(ROOT, stage.script)],
+                                  stdout=log, stderr=subprocess.STDOUT, env=env)
+        seconds = time.perf_counter() - start
+
+        outputs = self._output_hashes(stage)
+        missing = [p for p, h in outputs.items() if h is None]
+        if proc.returncode != 0 or missing:
+            reason = (f'código de saída {proc.returncode}' if proc.returncode != 0
+                      else f'saídas ausentes: {missing}')
+            return 'falhou', seconds, f'{reason} (log: {log_path})'
+
+        with self._lock:
+            self.state['stages'][stage.name] = {'key': key, 'outputs': outputs,
+                                                'seconds': round(seconds, 3)}
+        self._save_state()
+        return 'executado', seconds, None
+
+    def run(self, targets):
+        # Etapas pedidas + tudo de que elas dependem
+        selected, pending = set(), list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.stages[name].deps)
+        order = [name for name in self.stages if name in selected]
+
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while len(self.results) < len(order):
+                for name in order:
+                    if name in self.results or name in running.values():
+                        continue
+                    deps = [self.results.get(dep) for dep in self.stages[name].deps]
+                    if any(d is not None and d[0] in ('falhou', 'pulado') for d in deps):
+                        self.results[name] = ('pulado', 0.0, 'dependência falhou')
+                        self._report(name)
+                    elif all(d is not None for d in deps):
+                        running[executor.submit(self._run_stage, self.stages[name])] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    self.results[name] = future.result()
+                    self._report(name)
+        self._save_state()
+        return all(self.results[name][0] in ('executado', 'em cache') for name in order)
+
+    def _report(self, name):
+        status, seconds, detail = self.results[name]
+        line = f"[{name:<13s}] {status:<10s} {seconds:8.2f}s"
+        print(line + (f"  {detail}" if detail else ''), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('stages', nargs='*',
+                        help='etapas a executar, com as dependências (padrão: todas)')
+    parser.add_argument('--force', nargs='+', default=[], metavar='ETAPA',
+                        help='reexecuta as etapas mesmo com o cache válido')
+    parser.add_argument('--jobs', type=int, default=3, help='etapas em paralelo')
+    parser.add_argument('--streaming', action='store_true',
+                        help='usa o preprocessing_streaming.py (out-of-core)')
+    parser.add_argument('--workdir', default=ROOT,
+                        help='pasta com data/, outputs/ e artifacts/ (padrão: raiz do repositório)')
+    args = parser.parse_args()
+
+    stages = build_stages(args.streaming)
+    unknown = [s for s in args.stages + args.force if s not in stages]
+    if unknown:
+        parser.error(f"etapas desconhecidas: {unknown} (disponíveis: {list(stages)})")
+
+    start = time.perf_counter()
+    os.chdir(args.workdir)
+    runner = PipelineRunner(stages, args.jobs, args.force)
+    ok = runner.run(args.stages or list(stages))
+    print(f"Pipeline {'concluído' if ok else 'com falhas'} em {time.perf_counter() - start:.2f}s")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,33 @@
-# importação de bibliotecas e config. de visualização
+"""Pré-processamento do creditcard.csv: split, escalonamento e gravação do contrato.
+
+Uso (a partir da raiz do repositório):
+    python src/preprocessing.py
+"""
 
 import os
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
+
+from artifacts import save_scaler
+from data_contract import save_table, set_artifact_version
+from feature_store import write_feature_store
+from telemetry import RunTelemetry
+
+# Caminhos relativos à raiz do repositório (como nos scripts dos modelos)
+RAW_PATH = 'data/raw/creditcard.csv'
+PROCESSED_PATH = 'data/processed'
+OUTPUT_PATH = 'outputs'
+
+RANDOM_SEED = 42
 
 
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
-pd.set_option('display.max_columns', None)
-pd.set_option('display.max_rows', 100)
+def load_raw(raw_path=RAW_PATH):
+    df = pd.read_csv(raw_path)
+
+    # criar um identificador da transação usando o índice como ID.
+    df = df.copy()
+    df['id'] = df.index
+    return df
 
-print("Bibliotecas importadas com sucesso!")
-df = pd.read_csv('data/raw/creditcard.csv')
 
 """## SPLIT DOS DADOS EM TREINO, VALIDAÇÃO E TESTE
 
@@ -26,39 +38,25 @@ Primeiro split: 70% treino, 30% temporário (val+test)
 Segundo split: dividir o temporário em validação (15%) e teste (15%).
 """
 
-# criar um identificador da transação usando o índice como ID.
-df = df.copy()
-df['id'] = df.index
-
-y = df['Class'] #target
-
-# Features: remover Class e id (id não deve entrar no modelo)
-X = df.drop(columns=['Class', 'id'])
-
-X_train, X_temp, y_train, y_temp = train_test_split(
-    X, y,
-    test_size=0.30,
-    random_state=42,
-    stratify=y
-)
+def split_data(X, y, random_state=RANDOM_SEED):
+    """Split estratificado 70-15-15: (X_train, X_val, X_test, y_train, y_val, y_test)."""
+    from sklearn.model_selection import train_test_split
 
-X_val, X_test, y_val, y_test = train_test_split(
-    X_temp, y_temp,
-    test_size=0.50,
-    random_state=42,
-    stratify=y_temp
-)
+    X_train, X_temp, y_train, y_temp = train_test_split(
+        X, y,
+        test_size=0.30,
+        random_state=random_state,
+        stratify=y
+    )
 
-print(f"Treino: {X_train.shape[0]} amostras ({X_train.shape[0]/len(X)*100:.1f}%)")
-print(f"Validação: {X_val.shape[0]} amostras ({X_val.shape[0]/len(X)*100:.1f}%)")
-print(f"Teste: {X_test.shape[0]} amostras ({X_test.shape[0]/len(X)*100:.1f}%)")
-print("\nDistribuição do target por conjunto:")
-print(f"Treino: {y_train.value_counts(normalize=True).to_dict()}")
-print(f"Validação: {y_val.value_counts(normalize=True).to_dict()}")
-print(f"Teste: {y_test.value_counts(normalize=True).to_dict()}")
+    X_val, X_test, y_val, y_test = train_test_split(
+        X_temp, y_temp,
+        test_size=0.50,
+        random_state=random_state,
+        stratify=y_temp
+    )
+    return X_train, X_val, X_test, y_train, y_val, y_test
 
-# Separar os IDs do conjunto de teste (para salvar ids_test.csv depois)
-ids_test = df.loc[X_test.index, 'id']
 
 """## Engenharia de features
 
@@ -66,42 +64,15 @@ Apesar de poder capturar padrões temporais, o uso direto de Time pode introduzi
 A aplicação de transformações adicionais poderia introduzir redundância, aumentar a complexidade do espaço de atributos e elevar o risco de overfitting, especialmente em um cenário de dados altamente desbalanceados e com foco em detecção de anomalias. Dessa forma, foi priorizada uma maior manutenção da estrutura original das features, garantindo maior robustez, interpretabilidade e alinhamento com os modelos adotados no projeto.
 """
 
-if 'Time' in X_train.columns:
-    X_train = X_train.drop(columns=['Time'])
-    X_val   = X_val.drop(columns=['Time'])
-    X_test  = X_test.drop(columns=['Time'])
+def drop_time(*frames):
+    if 'Time' not in frames[0].columns:
+        return frames
+    return tuple(X.drop(columns=['Time']) for X in frames)
 
-"""## Escalonamento"""
 
-scaler = StandardScaler()
-scaler.fit(X_train)     #apenas no conjunto de treino
+"""## Escalonamento
 
-# Aplicação da normalização
-X_train_scaled = scaler.transform(X_train)
-X_val_scaled   = scaler.transform(X_val)
-X_test_scaled  = scaler.transform(X_test)
-
-X_train_scaled = pd.DataFrame(
-    X_train_scaled,
-    columns=X_train.columns,
-    index=X_train.index
-)
-
-X_val_scaled = pd.DataFrame(
-    X_val_scaled,
-    columns=X_val.columns,
-    index=X_val.index
-)
-
-X_test_scaled = pd.DataFrame(
-    X_test_scaled,
-    columns=X_test.columns,
-    index=X_test.index
-)
-
-X_train_scaled.describe().loc[['mean', 'std']] #verificação
-
-"""Após a divisão dos dados em conjuntos de treino, validação e teste, foi aplicado o
+Após a divisão dos dados em conjuntos de treino, validação e teste, foi aplicado o
 escalonamento das variáveis por meio do método de padronização (StandardScaler).
 O scaler foi ajustado exclusivamente sobre o conjunto de treino, evitando vazamento
 de informação, e posteriormente aplicado aos conjuntos de validação e teste.
@@ -109,29 +80,110 @@ de informação, e posteriormente aplicado aos conjuntos de validação e teste.
 A padronização é essencial neste projeto, uma vez que os modelos utilizados são
 sensíveis à escala das variáveis, garantindo que nenhuma feature domine as demais
 por diferenças de magnitude.
-
-## Output
 """
 
-os.makedirs('data/processed', exist_ok=True)
+def fit_scaler(X_train):
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    scaler.fit(X_train)     #apenas no conjunto de treino
+    return scaler
 
-# features
-X_train_scaled.to_csv('data/processed/X_train_processed.csv', index=False)
-X_test_scaled.to_csv('data/processed/X_test_processed.csv', index=False)
 
-# targets
-y_train.to_csv('data/processed/y_train.csv', index=False)
-y_test.to_csv('data/processed/y_test.csv', index=False)
+def scale(scaler, X):
+    return pd.DataFrame(
+        scaler.transform(X),
+        columns=X.columns,
+        index=X.index
+    )
 
-# ids dos testes
-ids_test.to_csv('data/processed/ids_test.csv', index=False)
 
-os.listdir('data/processed')
+"""## Output
 
-"""Ao final do pré-processamento, os conjuntos de dados foram exportados para arquivos
-CSV, seguindo o contrato de dados definido no projeto. Os arquivos gerados incluem
+Ao final do pré-processamento, os conjuntos de dados foram exportados para arquivos
+CSV, seguindo o contrato de dados definido no projeto, e também para o formato
+binário (.npy tipado + schema.json), lido preferencialmente pelos modelos. Os arquivos gerados incluem
 as features normalizadas para treino e teste, os respectivos rótulos e os
 identificadores das amostras de teste, garantindo compatibilidade com as etapas
 posteriores de modelagem e avaliação.
+"""
+
+def main():
+    # Telemetria da execução (tempo/memória por etapa) em outputs/telemetry/
+    run = RunTelemetry('preprocessing', OUTPUT_PATH)
+
+    with run.stage('load') as stage:
+        df = load_raw(RAW_PATH)
+        stage.rows = len(df)
+
+    y = df['Class'] #target
+
+    # Features: remover Class e id (id não deve entrar no modelo)
+    X = df.drop(columns=['Class', 'id'])
+
+    with run.stage('split', rows=len(X)):
+        X_train, X_val, X_test, y_train, y_val, y_test = split_data(X, y)
+
+    print(f"Treino: {X_train.shape[0]} amostras ({X_train.shape[0]/len(X)*100:.1f}%)")
+    print(f"Validação: {X_val.shape[0]} amostras ({X_val.shape[0]/len(X)*100:.1f}%)")
+    print(f"Teste: {X_test.shape[0]} amostras ({X_test.shape[0]/len(X)*100:.1f}%)")
+    print("\nDistribuição do target por conjunto:")
+    print(f"Treino: {y_train.value_counts(normalize=True).to_dict()}")
+    print(f"Validação: {y_val.value_counts(normalize=True).to_dict()}")
+    print(f"Teste: {y_test.value_counts(normalize=True).to_dict()}")
+
+    # Separar os IDs do conjunto de teste (para salvar ids_test.csv depois)
+    ids_test = df.loc[X_test.index, 'id']
+
+    X_train, X_val, X_test = drop_time(X_train, X_val, X_test)
+
+    with run.stage('fit', rows=len(X_train)):
+        scaler = fit_scaler(X_train)
+
+    # Aplicação da normalização
+    with run.stage('score', rows=len(X)):
+        X_train_scaled = scale(scaler, X_train)
+        X_val_scaled   = scale(scaler, X_val)
+        X_test_scaled  = scale(scaler, X_test)
+
+    # Artefato versionado do scaler (usado no --score-only dos modelos)
+    with run.stage('write_artifact'):
+        scaler_path = save_scaler(scaler, X_train.columns)
+
+    os.makedirs(PROCESSED_PATH, exist_ok=True)
+
+    # Cada tabela é gravada em CSV e em binário (.npy tipado + schema.json)
+    with run.stage('write', rows=len(X)):
+        # features
+        save_table(X_train_scaled, PROCESSED_PATH, 'X_train_processed')
+        save_table(X_test_scaled, PROCESSED_PATH, 'X_test_processed')
+
+        # targets
+        save_table(y_train, PROCESSED_PATH, 'y_train')
+        save_table(y_test, PROCESSED_PATH, 'y_test')
+
+        # ids dos testes
+        save_table(ids_test, PROCESSED_PATH, 'ids_test')
+
+        # versão do scaler que gerou os dados (usada pelos artefatos dos modelos)
+        set_artifact_version(PROCESSED_PATH, 'scaler', os.path.basename(scaler_path))
+
+    # Feature store float32 (lido via np.memmap pelos modelos).
+    # Treino é separado em normais/anomalias preservando a ordem original, para que
+    # o treino apenas com normais seja uma fatia contígua, sem cópia.
+    with run.stage('write_feature_store', rows=len(X)):
+        mask_normal = (y_train == 0).values
+        write_feature_store(PROCESSED_PATH, X_train_scaled.columns, [
+            ('train_normal', X_train_scaled.values[mask_normal], y_train.values[mask_normal],
+             df.loc[X_train.index[mask_normal], 'id']),
+            ('train_anomaly', X_train_scaled.values[~mask_normal], y_train.values[~mask_normal],
+             df.loc[X_train.index[~mask_normal], 'id']),
+            ('val', X_val_scaled, y_val, df.loc[X_val.index, 'id']),
+            ('test', X_test_scaled, y_test, ids_test),
+        ])
+
+    run.finish(n_features=X_train.shape[1])
+
 
-"""
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""Pré-processamento out-of-core (em blocos) do creditcard.csv.
+
+Versão em streaming do `preprocessing.py`, para arquivos brutos que não cabem
+em memória. O CSV é lido em blocos de `--chunksize` linhas, em três passadas:
+
+1. rótulos: lê apenas a coluna `Class` e define o split 70/15/15 de cada linha;
+2. escalonamento: ajusta o `StandardScaler` com `partial_fit` nas linhas de treino;
+3. escrita: transforma cada bloco e grava as linhas diretamente nos arquivos de
+   saída (tabelas .npy do contrato + feature store), pré-alocados em disco.
+   Os CSVs do contrato são exportados ao final a partir dos binários.
+
+Modos de split (`--split`):
+
+* `exact` (padrão): reproduz exatamente os dois `train_test_split`
+  estratificados do `preprocessing.py` (mesmas linhas e mesma ordem em cada
+  split), a partir dos rótulos. Guarda alguns bytes por linha do arquivo
+  (rótulo e posições), ainda muito menos que as features.
+* `hash`: cada linha vai para treino/validação/teste pelo hash do seu id
+  (70/15/15). A memória fica limitada ao tamanho do bloco, mas o split é
+  outro e não é estratificado: a atribuição não depende da classe, então a
+  taxa de fraude de cada split só é a mesma em expectativa e, em arquivos
+  pequenos, varia de um split para o outro.
+
+Uso (a partir da raiz do repositório):
+    python src/preprocessing_streaming.py [--split exact|hash] [--chunksize N]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from artifacts import save_scaler
+from data_contract import create_table, export_csv, register_table, set_artifact_version
+from feature_store import FeatureStoreWriter
+from telemetry import peak_rss_mb
+
+RAW_PATH = 'data/raw/creditcard.csv'
+OUTPUT_PATH = 'data/processed'
+CHUNK_SIZE = 100_000
+RANDOM_SEED = 42
+
+TRAIN, VAL, TEST = 0, 1, 2
+# Fração acumulada de cada split no modo hash (70/15/15)
+HASH_CUTS = (0.70, 0.85)
+
+
+# =========================================================
+# LEITURA EM BLOCOS
+# =========================================================
+
+def read_chunks(raw_path, chunk_size, usecols=None):
+    """Itera sobre (id_inicial, bloco) do CSV bruto. O id é o índice da linha."""
+    start = 0
+    for chunk in pd.read_csv(raw_path, chunksize=chunk_size, usecols=usecols):
+        yield start, chunk
+        start += len(chunk)
+
+
+def feature_columns(raw_path):
+    """Features do modelo: todas as colunas menos Class e Time (como no preprocessing)."""
+    header = pd.read_csv(raw_path, nrows=0).columns
+    return [c for c in header if c not in ('Class', 'Time')]
+
+
+# =========================================================
+# ATRIBUIÇÃO DOS SPLITS
+# =========================================================
+
+def hash_unit(ids, seed=RANDOM_SEED):
+    """Hash (splitmix64) dos ids mapeado para [0, 1)."""
+    z = np.asarray(ids, dtype=np.uint64) + np.uint64((seed * 0x9E3779B97F4A7C15) % 2 ** 64)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+class HashSplitPlan:
+    """Split pelo hash do id; as linhas entram em cada split na ordem do arquivo."""
+
+    def __init__(self, raw_path, chunk_size, seed=RANDOM_SEED):
+        self.seed = seed
+        # contagem por (split, classe) para pré-alocar os arquivos
+        self.counts = np.zeros((3, 2), dtype=np.int64)
+        for start, chunk in read_chunks(raw_path, chunk_size, usecols=['Class']):
+            split = self.assign(start, len(chunk))
+            np.add.at(self.counts, (split, chunk['Class'].to_numpy()), 1)
+
+        self._split_cursor = np.zeros(3, dtype=np.int64)
+        self._class_cursor = np.zeros(2, dtype=np.int64)
+
+    def assign(self, start, n):
+        u = hash_unit(np.arange(start, start + n), self.seed)
+        return np.searchsorted(HASH_CUTS, u, side='right').astype(np.int8)
+
+    def locate(self, start, split, y):
+        """Posição de cada linha na tabela do split e no segmento do feature store."""
+        pos = np.empty(len(split), dtype=np.int64)
+        seg_pos = np.empty(len(split), dtype=np.int64)
+        for s in (TRAIN, VAL, TEST):
+            m = split == s
+            pos[m] = self._split_cursor[s] + np.arange(m.sum())
+            self._split_cursor[s] += m.sum()
+        for c in (0, 1):
+            m = (split == TRAIN) & (y == c)
+            seg_pos[m] = self._class_cursor[c] + np.arange(m.sum())
+            self._class_cursor[c] += m.sum()
+        seg_pos[split != TRAIN] = pos[split != TRAIN]
+        return pos, seg_pos
+
+
+class ExactSplitPlan:
+    """Reproduz os `train_test_split` estratificados do preprocessing.py.
+
+    O split estratificado depende apenas do número de linhas e dos rótulos,
+    então basta a coluna Class para obter os mesmos índices e a mesma ordem.
+    """
+
+    def __init__(self, raw_path, chunk_size, seed=RANDOM_SEED):
+        y = np.concatenate([chunk['Class'].to_numpy(np.int8) for _, chunk
+                            in read_chunks(raw_path, chunk_size, usecols=['Class'])])
+        idx = np.arange(len(y))
+
+        idx_train, idx_temp = train_test_split(idx, test_size=0.30, random_state=seed, stratify=y)
+        idx_val, idx_test = train_test_split(idx_temp, test_size=0.50, random_state=seed,
+                                             stratify=y[idx_temp])
+
+        self.split = np.empty(len(y), dtype=np.int8)
+        self.pos = np.empty(len(y), dtype=np.int64)
+        self.seg_pos = np.empty(len(y), dtype=np.int64)
+        self.counts = np.zeros((3, 2), dtype=np.int64)
+        for s, rows in ((TRAIN, idx_train), (VAL, idx_val), (TEST, idx_test)):
+            self.split[rows] = s
+            self.pos[rows] = np.arange(len(rows))
+            self.seg_pos[rows] = np.arange(len(rows))
+            self.counts[s] = np.bincount(y[rows], minlength=2)
+        # no treino, a posição no segmento é contada por classe (normais | anomalias)
+        for c in (0, 1):
+            rows = idx_train[y[idx_train] == c]
+            self.seg_pos[rows] = np.arange(len(rows))
+
+    def assign(self, start, n):
+        return self.split[start:start + n]
+
+    def locate(self, start, split, y):
+        return self.pos[start:start + len(split)], self.seg_pos[start:start + len(split)]
+
+
+# =========================================================
+# PIPELINE EM STREAMING
+# =========================================================
+
+def fit_scaler(raw_path, chunk_size, columns, plan):
+    """Ajusta o StandardScaler incrementalmente, só com as linhas de treino."""
+    scaler = StandardScaler()
+    for start, chunk in read_chunks(raw_path, chunk_size, usecols=columns):
+        train = plan.assign(start, len(chunk)) == TRAIN
+        if train.any():
+            scaler.partial_fit(chunk.loc[train, columns])
+    return scaler
+
+
+def stream_preprocess(raw_path=RAW_PATH, output_path=OUTPUT_PATH, chunk_size=CHUNK_SIZE,
+                      split_mode='exact'):
+    columns = feature_columns(raw_path)
+
+    print(f"[1/3] Definindo splits (modo '{split_mode}')...")
+    plan_cls = ExactSplitPlan if split_mode == 'exact' else HashSplitPlan
+    plan = plan_cls(raw_path, chunk_size)
+    n_train, n_val, n_test = plan.counts.sum(axis=1)
+    n_total = plan.counts.sum()
+    for name, n, s in (('Treino', n_train, TRAIN), ('Validação', n_val, VAL), ('Teste', n_test, TEST)):
+        print(f"{name}: {n} amostras ({n / n_total * 100:.1f}%), "
+              f"fraude: {plan.counts[s, 1] / max(n, 1):.5f}")
+
+    print("[2/3] Ajustando o StandardScaler (partial_fit)...")
+    scaler = fit_scaler(raw_path, chunk_size, columns, plan)
+    scaler_path = save_scaler(scaler, columns)
+    print(f"Scaler salvo em: {scaler_path}")
+
+    print("[3/3] Transformando e gravando em blocos...")
+    table_specs = {
+        'X_train_processed': (columns, n_train),
+        'X_test_processed': (columns, n_test),
+        'y_train': (['Class'], n_train),
+        'y_test': (['Class'], n_test),
+        'ids_test': (['id'], n_test),
+    }
+    tables = {name: create_table(output_path, name, cols, n)
+              for name, (cols, n) in table_specs.items()}
+    store = FeatureStoreWriter(output_path, columns, [
+        ('train_normal', plan.counts[TRAIN, 0]),
+        ('train_anomaly', plan.counts[TRAIN, 1]),
+        ('val', n_val),
+        ('test', n_test),
+    ])
+
+    for start, chunk in read_chunks(raw_path, chunk_size):
+        ids = np.arange(start, start + len(chunk))
+        y = chunk['Class'].to_numpy(np.int8)
+        X = scaler.transform(chunk[columns]).astype(np.float32)
+
+        split = plan.assign(start, len(chunk))
+        pos, seg_pos = plan.locate(start, split, y)
+
+        m = split == TRAIN
+        tables['X_train_processed'][pos[m]] = X[m]
+        tables['y_train'][pos[m], 0] = y[m]
+        for c, segment in ((0, 'train_normal'), (1, 'train_anomaly')):
+            mc = m & (y == c)
+            store.write(segment, seg_pos[mc], X[mc], y[mc], ids[mc])
+
+        m = split == VAL
+        store.write('val', seg_pos[m], X[m], y[m], ids[m])
+
+        m = split == TEST
+        tables['X_test_processed'][pos[m]] = X[m]
+        tables['y_test'][pos[m], 0] = y[m]
+        tables['ids_test'][pos[m], 0] = ids[m]
+        store.write('test', seg_pos[m], X[m], y[m], ids[m])
+
+    store.close()
+    for name, values in tables.items():
+        values.flush()
+        register_table(output_path, name, table_specs[name][0], values)
+    del tables
+    set_artifact_version(output_path, 'scaler', os.path.basename(scaler_path))
+
+    print("Exportando CSVs do contrato...")
+    for name in table_specs:
+        export_csv(output_path, name, chunk_size)
+
+    return scaler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--input', default=RAW_PATH)
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--split', choices=['exact', 'hash'], default='exact')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stream_preprocess(args.input, args.output, args.chunksize, args.split)
+    print(f"\nConcluído em {time.perf_counter() - start:.1f}s. "
+          f"Pico de memória (RSS): {peak_rss_mb():.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,368 @@
+"""Servidor HTTP de pontuação em tempo real, com micro-batching.
+
+Carrega uma única vez o scaler e os modelos (GMM e/ou autoencoder) a partir de
+`artifacts/` e pontua transações conforme chegam:
+
+* `POST /score` — corpo JSON com uma transação (objeto com as colunas do
+  `creditcard.csv` e `id` opcional), uma lista de transações ou
+  `{"transactions": [...]}`. Responde, por transação e por modelo,
+  `anomaly_score` e `is_anomaly` (pelo threshold salvo no artefato);
+* `GET /stats` — latência p50/p99 (ms), requisições por segundo e tamanho
+  médio dos micro-lotes;
+* `GET /health` — modelos carregados.
+
+As requisições que chegam dentro da janela `--max-wait-ms` são agrupadas em um
+único micro-lote (até `--max-batch` transações) e pontuadas com uma chamada
+por modelo, trocando um pouco de latência por throughput.
+
+Uso (a partir da raiz do repositório, depois de treinar os modelos):
+    python src/serving.py [--models gmm autoencoder] [--port 8000]
+        [--max-wait-ms 2] [--max-batch 256] [--processed]
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+from artifacts import load_artifact
+from thresholds import flag_anomalies
+
+MAX_WAIT_MS = 2.0
+MAX_BATCH = 256
+
+# Janela das métricas: últimas N latências e últimos N segundos para o RPS
+LATENCY_WINDOW = 10_000
+RPS_WINDOW_S = 10.0
+
+
+# =========================================================
+# 1. MODELOS
+# =========================================================
+
+def _load_gmm():
+    import gmm
+    from gmm_kernel import GMMKernel
+    manifest, arrays = load_artifact('gmm')
+    kernel = GMMKernel.from_artifact(manifest, arrays, gmm.SCORE_DTYPE)
+    return manifest, lambda X: -kernel.score_samples(X)
+
+
+def _load_autoencoder():
+    import autoencoder
+    if autoencoder.SCORING_ENGINE == 'numpy':
+        # Kernel NumPy (autoencoder_kernel.py), sem TensorFlow no processo; com
+        # PRODUCTION_SCORER, o aluno destilado aprovado substitui o professor
+        return autoencoder.production_scorer()
+
+    manifest, arrays = load_artifact('autoencoder')
+    tf = autoencoder.import_tensorflow()
+    model = autoencoder.autoencoder_from_artifact(manifest, arrays)
+
+    # Grafo único para qualquer tamanho de lote: evita o custo fixo do
+    # predict/predict_on_batch (~20 ms por chamada) em lotes pequenos
+    @tf.function(input_signature=[tf.TensorSpec([None, manifest['input_dim']], tf.float32)])
+    def reconstruct(X):
+        return model(X, training=False)
+
+    def score(X):
+        reconstructions = reconstruct(X).numpy()
+        return np.mean(np.square(X - reconstructions), axis=1)
+
+    return manifest, score
+
+
+MODEL_LOADERS = {'gmm': _load_gmm, 'autoencoder': _load_autoencoder}
+
+
+class ModelScorer:
+    """Scaler + modelos carregados dos artefatos (LATEST)."""
+
+    def __init__(self, models, processed=False):
+        self.models = {}
+        scaler_versions = {}
+        for name in models:
+            manifest, score_fn = MODEL_LOADERS[name]()
+            self.models[name] = (score_fn, manifest)
+            scaler_versions[name] = manifest.get('scaler_version')
+
+        # Uma única normalização para todos os modelos: todos precisam ter sido
+        # treinados com dados da mesma versão do scaler
+        if len(set(scaler_versions.values())) > 1:
+            raise ValueError(f"Modelos treinados com versões diferentes do scaler: {scaler_versions}")
+        scaler_version = next(iter(scaler_versions.values()), None)
+
+        manifest, arrays = load_artifact('scaler', scaler_version)
+        self.columns = manifest['feature_columns']
+        self.processed = processed
+        self.mean = arrays['mean'].astype(np.float32)
+        self.scale = arrays['scale'].astype(np.float32)
+
+    def parse(self, transactions):
+        """Lista de dicts -> (ids, X float32 normalizado)."""
+        if not isinstance(transactions, list) or not all(isinstance(t, dict) for t in transactions):
+            raise ValueError("O lote deve ser uma lista de transações (objetos JSON)")
+        if not transactions:
+            raise ValueError("Nenhuma transação no lote")
+        ids = [t.get('id', i) for i, t in enumerate(transactions)]
+        try:
+            X = np.array([[t[c] for c in self.columns] for t in transactions],
+                         dtype=np.float32).reshape(-1, len(self.columns))
+        except KeyError as e:
+            raise ValueError(f"Coluna ausente na transação: {e.args[0]}")
+        if not self.processed:
+            X = (X - self.mean) / self.scale
+        return ids, X
+
+    def score(self, X):
+        """Pontua um lote: {modelo: (scores, is_anomaly)}."""
+        results = {}
+        for name, (score_fn, manifest) in self.models.items():
+            scores = score_fn(X)
+            results[name] = (scores, flag_anomalies(scores, manifest))
+        return results
+
+
+# =========================================================
+# 2. MICRO-BATCHING E MÉTRICAS
+# =========================================================
+
+class ServingStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)  # (instante, latência)
+        self.started = time.perf_counter()
+        self.n_requests = 0
+        self.n_transactions = 0
+        self.n_batches = 0
+        self.n_errors = 0
+
+    def record_request(self, latency_s, n_transactions):
+        with self._lock:
+            self._latencies.append((time.perf_counter(), latency_s))
+            self.n_requests += 1
+            self.n_transactions += n_transactions
+
+    def record_batch(self):
+        with self._lock:
+            self.n_batches += 1
+
+    def record_error(self):
+        with self._lock:
+            self.n_errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            now = time.perf_counter()
+            window = np.array(self._latencies) if self._latencies else np.empty((0, 2))
+            uptime = now - self.started
+            recent = window[window[:, 0] >= now - RPS_WINDOW_S]
+            p50, p99 = (np.percentile(window[:, 1], [50, 99]) * 1000
+                        if len(window) else (0.0, 0.0))
+            return {
+                'uptime_s': uptime,
+                'requests': self.n_requests,
+                'transactions': self.n_transactions,
+                'errors': self.n_errors,
+                'batches': self.n_batches,
+                'mean_batch_transactions': self.n_transactions / max(self.n_batches, 1),
+                'latency_p50_ms': float(p50),
+                'latency_p99_ms': float(p99),
+                'rps_total': self.n_requests / uptime,
+                'rps_recent': len(recent) / min(RPS_WINDOW_S, uptime),
+            }
+
+
+class _Pending:
+    __slots__ = ('X', 'event', 'result', 'error')
+
+    def __init__(self, X):
+        self.X = X
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Agrupa as requisições em micro-lotes pontuados por uma única thread."""
+
+    def __init__(self, scorer, stats, max_wait_ms=MAX_WAIT_MS, max_batch=MAX_BATCH):
+        self.scorer = scorer
+        self.stats = stats
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, X):
+        """Bloqueia até o lote que contém X ser pontuado."""
+        pending = _Pending(X)
+        self._queue.put(pending)
+        pending.event.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        n_rows = len(batch[0].X)
+        deadline = time.perf_counter() + self.max_wait
+        while n_rows < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            n_rows += len(pending.X)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self.scorer.score(np.concatenate([p.X for p in batch]))
+                start = 0
+                for pending in batch:
+                    stop = start + len(pending.X)
+                    pending.result = {name: (scores[start:stop], flags[start:stop])
+                                      for name, (scores, flags) in results.items()}
+                    start = stop
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            self.stats.record_batch()
+            for pending in batch:
+                pending.event.set()
+
+
+# =========================================================
+# 3. SERVIDOR HTTP
+# =========================================================
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self._send_json(200, self.server.stats.snapshot())
+        elif self.path == '/health':
+            self._send_json(200, {'status': 'ok', 'models': list(self.server.scorer.models)})
+        else:
+            self._send_json(404, {'error': 'rota não encontrada'})
+
+    def do_POST(self):
+        if self.path != '/score':
+            self._send_json(404, {'error': 'rota não encontrada'})
+            return
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length < 0:
+                raise ValueError
+        except ValueError:
+            # sem saber o tamanho do corpo, a conexão não pode ser reaproveitada
+            self.close_connection = True
+            self.server.stats.record_error()
+            self._send_json(400, {'error': 'Content-Length inválido'})
+            return
+        body = self.rfile.read(length)
+        try:
+            payload = json.loads(body)
+            single = isinstance(payload, dict) and 'transactions' not in payload
+            transactions = [payload] if single else (
+                payload['transactions'] if isinstance(payload, dict) else payload)
+            ids, X = self.server.scorer.parse(transactions)
+        except (ValueError, TypeError, KeyError) as e:
+            self.server.stats.record_error()
+            self._send_json(400, {'error': str(e)})
+            return
+
+        try:
+            results = self.server.batcher.submit(X)
+        except Exception as e:
+            self.server.stats.record_error()
+            self._send_json(500, {'error': str(e)})
+            return
+
+        out = [{'id': tx_id} for tx_id in ids]
+        for name, (scores, flags) in results.items():
+            for row, score, flag in zip(out, scores.tolist(), flags.tolist()):
+                row[name] = {'anomaly_score': score, 'is_anomaly': flag}
+
+        self._send_json(200, out[0] if single else {'results': out})
+        self.server.stats.record_request(time.perf_counter() - start, len(ids))
+
+    def log_message(self, format, *args):
+        pass  # sem log por requisição (as métricas ficam em /stats)
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, scorer, max_wait_ms=MAX_WAIT_MS, max_batch=MAX_BATCH):
+        super().__init__(address, ScoringHandler)
+        self.scorer = scorer
+        self.stats = ServingStats()
+        self.batcher = MicroBatcher(scorer, self.stats, max_wait_ms, max_batch)
+
+
+def _log_stats(stats, interval):
+    while True:
+        time.sleep(interval)
+        s = stats.snapshot()
+        print(f"[stats] {s['requests']} req | {s['rps_recent']:.0f} req/s | "
+              f"p50 {s['latency_p50_ms']:.2f} ms | p99 {s['latency_p99_ms']:.2f} ms | "
+              f"lote médio {s['mean_batch_transactions']:.1f}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--models', nargs='+', default=['gmm'], choices=list(MODEL_LOADERS))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--processed', action='store_true',
+                        help='as transações já chegam normalizadas (formato X_*_processed)')
+    parser.add_argument('--log-every', type=float, default=10.0,
+                        help='intervalo (s) do log de métricas; 0 desativa')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    scorer = ModelScorer(args.models, args.processed)
+    server = ScoringServer((args.host, args.port), scorer, args.max_wait_ms, args.max_batch)
+    print(f"Modelos {args.models} carregados em {time.perf_counter() - start:.2f}s. "
+          f"Servindo em http://{args.host}:{args.port} "
+          f"(janela {args.max_wait_ms} ms, lote máx. {args.max_batch})", flush=True)
+
+    if args.log_every > 0:
+        threading.Thread(target=_log_stats, args=(server.stats, args.log_every), daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Escolha do threshold de decisão, comum aos três detectores.
+
+Os scores rotulados são ordenados uma única vez (`ThresholdCurve`), e TP/FP
+acumulados são calculados em cada score distinto. Cada política é uma busca
+vetorizada nessas contagens, sem refazer a curva:
+
+* `target_recall`: o maior threshold com recall >= alvo (menos alertas para o
+  recall pedido);
+* `target_precision`: o menor threshold com precision >= alvo (maior recall);
+* `alert_budget`: o menor threshold com no máximo `alerts_per_day` alertas por
+  dia (empates não são divididos). O volume diário `transactions_per_day` é
+  obrigatório na política: depende dos dados, e `daily_volume` o calcula a
+  partir da coluna Time (linhas / dias cobertos);
+* `min_cost`: o threshold de menor custo `fn_cost · FN + fp_cost · FP`.
+
+Regra única de decisão: `is_anomaly = anomaly_score >= threshold`. O threshold
+escolhido e o resumo da política vão para o manifest do artefato, e a
+pontuação só aplica `flag_anomalies`.
+
+`select_threshold` guarda as curvas das últimas `CURVE_CACHE_SIZE` entradas
+(chave: hash dos scores e rótulos), então trocar a política sobre os mesmos
+scores não reordena nada.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+THRESHOLD_RULE = 'anomaly_score >= threshold'
+
+SECONDS_PER_DAY = 86_400
+
+CURVE_CACHE_SIZE = 8
+
+DEFAULT_POLICY = {'name': 'target_recall', 'recall': 0.80}
+
+
+class ThresholdCurve:
+    """TP/FP acumulados em cada score distinto (ordem decrescente)."""
+
+    def __init__(self, y_true, y_score):
+        y_true = np.asarray(y_true).astype(bool)
+        y_score = np.asarray(y_score, dtype=np.float64)
+        order = np.argsort(y_score, kind='stable')[::-1]
+        scores = y_score[order]
+        labels = y_true[order]
+
+        # Última posição de cada grupo de scores empatados
+        ends = np.append(np.flatnonzero(scores[1:] != scores[:-1]), len(scores) - 1)
+        self.thresholds = scores[ends]
+        self.tp = np.cumsum(labels)[ends]
+        self.fp = ends + 1 - self.tp
+        self.n_pos = int(labels.sum())
+        self.n_rows = len(scores)
+
+    def _summary(self, idx, policy):
+        """Resumo do threshold no índice `idx` (-1 = nenhum alerta)."""
+        if idx < 0:
+            threshold = float(np.nextafter(self.thresholds[0], np.inf))
+            tp = fp = 0
+        else:
+            threshold = float(self.thresholds[idx])
+            tp, fp = int(self.tp[idx]), int(self.fp[idx])
+        return {
+            'threshold': threshold,
+            'policy': policy,
+            'alerts': tp + fp,
+            'recall': tp / self.n_pos if self.n_pos else 0.0,
+            'precision': tp / (tp + fp) if tp + fp else 0.0,
+            'tp': tp,
+            'fp': fp,
+        }
+
+    def target_recall(self, recall):
+        idx = int(np.searchsorted(self.tp, recall * self.n_pos - 1e-9))
+        return self._summary(min(idx, len(self.tp) - 1),
+                             {'name': 'target_recall', 'recall': recall})
+
+    def target_precision(self, precision):
+        with np.errstate(invalid='ignore'):
+            ok = np.flatnonzero(self.tp / (self.tp + self.fp) >= precision)
+        return self._summary(int(ok[-1]) if len(ok) else -1,
+                             {'name': 'target_precision', 'precision': precision})
+
+    def alert_budget(self, alerts_per_day, transactions_per_day=None):
+        if transactions_per_day is None or not transactions_per_day > 0:
+            raise ValueError("A política alert_budget precisa de transactions_per_day > 0 "
+                             "(ex.: daily_volume(df['Time']) dos dados brutos)")
+        budget = alerts_per_day * self.n_rows / transactions_per_day
+        idx = int(np.searchsorted(self.tp + self.fp, budget, side='right')) - 1
+        return self._summary(idx, {'name': 'alert_budget', 'alerts_per_day': alerts_per_day,
+                                   'transactions_per_day': transactions_per_day})
+
+    def min_cost(self, fn_cost, fp_cost):
+        # custo com 0 alertas na posição 0, depois cada threshold distinto
+        cost = np.concatenate([[fn_cost * self.n_pos],
+                               fn_cost * (self.n_pos - self.tp) + fp_cost * self.fp])
+        return self._summary(int(np.argmin(cost)) - 1,
+                             {'name': 'min_cost', 'fn_cost': fn_cost, 'fp_cost': fp_cost})
+
+    def at_threshold(self, threshold):
+        """Resumo de um threshold fixo (ex.: a regra de eps do DBSCAN)."""
+        idx = int(np.searchsorted(-self.thresholds, -threshold, side='right')) - 1
+        summary = self._summary(idx, {'name': 'fixed'})
+        summary['threshold'] = float(threshold)
+        return summary
+
+    def select(self, policy):
+        """Aplica uma política no formato {'name': ..., **parâmetros}."""
+        params = dict(policy)
+        name = params.pop('name')
+        if name not in POLICIES:
+            raise ValueError(f"Política de threshold desconhecida: {name} "
+                             f"(disponíveis: {list(POLICIES)})")
+        if name == 'fixed':
+            return self.at_threshold(params['threshold'])
+        return getattr(self, name)(**params)
+
+
+POLICIES = ('target_recall', 'target_precision', 'alert_budget', 'min_cost', 'fixed')
+
+_curve_cache = OrderedDict()
+
+
+def _fingerprint(y_true, y_score):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(y_score, dtype=np.float64).data)
+    digest.update(np.ascontiguousarray(y_true, dtype=np.int8).data)
+    return digest.hexdigest()
+
+
+def threshold_curve(y_true, y_score):
+    """Curva dos scores, reaproveitada do cache quando já foi calculada."""
+    key = _fingerprint(y_true, y_score)
+    if key in _curve_cache:
+        _curve_cache.move_to_end(key)
+        return _curve_cache[key]
+    curve = ThresholdCurve(y_true, y_score)
+    _curve_cache[key] = curve
+    if len(_curve_cache) > CURVE_CACHE_SIZE:
+        _curve_cache.popitem(last=False)
+    return curve
+
+
+def daily_volume(time_seconds):
+    """Transações por dia de uma coluna Time (segundos desde a 1ª transação)."""
+    time_seconds = np.asarray(time_seconds, dtype=np.float64)
+    span = time_seconds.max() - time_seconds.min() if len(time_seconds) else 0.0
+    if not span > 0:
+        raise ValueError("A coluna Time não cobre nenhum intervalo; informe transactions_per_day")
+    return len(time_seconds) * SECONDS_PER_DAY / span
+
+
+def select_threshold(y_true, y_score, policy=None):
+    """Threshold da política (padrão: `DEFAULT_POLICY`) e o resumo dele."""
+    return threshold_curve(y_true, y_score).select(policy or DEFAULT_POLICY)
+
+
+def describe(summary):
+    """Linha de log do threshold escolhido."""
+    policy = {k: v for k, v in summary['policy'].items() if k != 'name'}
+    return (f"🎯 Threshold escolhido: {summary['threshold']:.6f} "
+            f"[{summary['policy']['name']} {policy}] -> recall {summary['recall']:.2f}, "
+            f"precision {summary['precision']:.2f}, {summary['alerts']} alertas")
+
+
+def flag_anomalies(scores, manifest):
+    """is_anomaly (0/1) com o threshold e a regra gravados no artefato.
+
+    Artefatos antigos gravavam a regra `anomaly_score > threshold`.
+    """
+    scores = np.asarray(scores)
+    rule = manifest.get('threshold_rule', THRESHOLD_RULE)
+    compare = np.greater_equal if '>=' in rule else np.greater
+    return compare(scores, manifest['threshold']).astype(int)